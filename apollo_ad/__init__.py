@@ -1,3 +1,12 @@
 from .apollo_ad import *
+from .compiler import compile, compile_cache
+from .products import jvp, vjp, hvp, colored_jacobian
+from .cost import Cost_Model
+from .sparse import Sparse_Tangent, Sparse_Jacobian
+from .sparsity import Sparsity_Pattern
+from .checkpoint import Checkpointed
+from .parallel import batch_jacobian
+from .batch import stream, batch_evaluate
+from .tape import Tape, Tape_Variable, Taped_Function
 from .UI import UI
 from .demo import demo
\ No newline at end of file
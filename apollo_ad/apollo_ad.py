@@ -1,15 +1,23 @@
 import numpy as np
-import re
 
 
 class auto_diff:
-    def __init__(self, var, fct, seed = None):
+    def __init__(self, var, fct, seed = None, mode = 'auto', hessian = False, taylor = None, workers = None):
         """Initiate a function variable.
          INPUTS
          =======
          self: Variable object
          var: float/int, the value of this variable
          seed: int/list/array, the seed vector (derivative from the parents)
+         mode: str, 'forward', 'reverse' or 'auto'. 'auto' uses the mode of the seed if one is given (a dict
+            for forward, a list for reverse), otherwise the mode with the lower predicted cost (see explain())
+         hessian: bool, whether to also compute the Hessian of each function (`hes`) in one second-order
+            forward pass. Meant for a few variables, the cost grows with the square of their number
+         taylor: int, if given, compute the derivatives of orders 1 to `taylor` along the direction `seed`
+            (a dict, default 1 for every variable) in one Taylor-mode pass instead of the gradients: `der` then
+            has shape (num_fct, taylor) and `coef` holds the Taylor coefficients
+         workers: int, the number of processes the functions are shared between (default one process,
+            see Forward and Reverse)
 
          RETURNS
          ========
@@ -30,7 +38,7 @@ class auto_diff:
          Function F1: [-0.47942554  8.        ]
          Function F2: [-0.23570226  0.5       ]
          Function F3: [0.23570226 0.        ]
-         Function F4: [-1.23592426 -4.61880215]
+         Function F4: [-1.23592426  0.        ]
 
          # reverse mode
          vars = {'x': 3, 'y': 4, 'z': 5}
@@ -56,29 +64,126 @@ class auto_diff:
          -- Gradients -- 
          Function F1: [-0.14112001 16.        ]
          Function F2: [-0.09622504  1.        ]
+
+         If a variable is an array of N points, the functions are evaluated at all the points at once:
+
+         vars = {'x': np.array([0.5, 1., 2.]), 'y': 4}
+         fcts = ['x * y', 'exp(x)']
+         z = auto_diff(vars, fcts)
+         z.var.shape, z.der.shape
+         ((3, 2), (3, 2, 2))
+
+         The first 4 derivatives of each function along the direction (1, 0):
+
+         z = auto_diff({'x': 0, 'y': 1}, ['exp(x * y)'], {'x': 1, 'y': 0}, taylor=4)
+         z.der
+         array([[1., 1., 1., 1.]])
+
+         The Hessians of the functions, of shape (num_fct, num_var, num_var):
+
+         z = auto_diff({'x': 3, 'y': 4}, ['x ** 2 * y'], hessian=True)
+         z.hes
+         array([[[8., 6.],
+                 [6., 0.]]])
          """
 
-        forward_mode = True
-        if len(var) < len(fct):
-            print('# of variables < # of functions ====> automatically use the forward mode!')
-        elif len(var) > len(fct):
-            print('# of variables > # of functions ====> automatically use the reverse mode!')
-            forward_mode = False
-        else:
-            print('# of variables = # of functions ====> automatically use the forward mode!')
+        if mode not in ('auto', 'forward', 'reverse'):
+            raise ValueError("The mode should be 'auto', 'forward' or 'reverse'.")
+        check = [1 if isinstance(i, str) else 0 for i in fct]
+        if len(check) != sum(check):
+            raise TypeError('Each function should be a string!')
+        if not isinstance(var, dict):
+            raise TypeError('The variable should be a dictionary!')
+
+        # the cost model is only built when it decides the mode, or when it is asked for
+        self._var, self._fct = var, fct
+        self._cost = None
+
+        if hessian and taylor is not None:
+            raise ValueError('The Hessian and the Taylor coefficients cannot be computed together.')
+        if workers is not None and (hessian or taylor is not None):
+            raise ValueError('Only the gradients are computed on several processes.')
+        if taylor is not None:
+            if mode == 'reverse':
+                raise ValueError('The Taylor coefficients are computed in the forward mode.')
+            if (seed is not None) and (not isinstance(seed, dict)):
+                raise AttributeError('Forward mode requires the seed to be a dict with variable: seed.')
+            print('Taylor coefficients requested ====> use the Taylor mode!')
+            mode = 'forward'
+        elif hessian:
+            if mode == 'reverse':
+                raise ValueError('The Hessian is computed in the forward mode.')
+            if (seed is not None) and (not isinstance(seed, dict)):
+                raise AttributeError('Forward mode requires the seed to be a dict with variable: seed.')
+            print('Hessian requested ====> use the second-order forward mode!')
+            mode = 'forward'
+        elif mode == 'auto':
+            if isinstance(seed, dict):
+                mode = 'forward'
+                print('seed for each variable ====> automatically use the forward mode!')
+            elif isinstance(seed, list):
+                mode = 'reverse'
+                print('seed for each function ====> automatically use the reverse mode!')
+            else:
+                mode = self.cost.mode
+                print('predicted cost: forward %.0f us, reverse %.0f us ====> automatically use the %s mode!'
+                    % (self.cost.forward_time, self.cost.reverse_time, mode))
+        self.mode = mode
 
-        if forward_mode:
+        if mode == 'forward':
             if (seed is not None) and (not isinstance(seed, dict)):
                 raise AttributeError('Forward mode requires the seed to be a dict with variable: seed.')
-            out = Forward(var, fct, seed)
+            if taylor is not None:
+                out = Taylor(var, fct, taylor, seed)
+            elif hessian:
+                out = Hessian(var, fct, seed)
+            else:
+                out = Forward(var, fct, seed, workers=workers)
         else:
             if (seed is not None) and (not isinstance(seed, list)):
                 raise AttributeError('Reverse mode requires the seed to be a list with the seed for each function.')
-            out = Reverse(var, fct, seed)
+            out = Reverse(var, fct, seed, workers)
 
         self.out = out
         self.var = out.var
         self.der = out.der
+        if hessian:
+            self.hes = out.hes
+        if taylor is not None:
+            self.coef = out.coef
+
+    @property
+    def cost(self):
+        """The Cost_Model of the functions, which predicts the cost of each mode from the parsed functions."""
+        if self._cost is None:
+            from .compiler import compile_cache
+            from .cost import Cost_Model
+            compiled = compile_cache.get(self._fct, list(self._var.keys()))
+            values = compiled.point(self._var)
+            num_points = len(values[0]) if values and np.ndim(values[0]) else 1
+            self._cost = Cost_Model(compiled.expression, len(self._var), num_points)
+        return self._cost
+
+    def explain(self):
+        """Report the predicted cost of the forward and the reverse mode, and the mode that was used.
+         INPUTS
+         =======
+         self: auto_diff object
+
+         RETURNS
+         ========
+         output: str
+
+         EXAMPLES
+         =========
+         z = auto_diff({'x': 3, 'y': 4}, ['cos(x) + y ** 2'])
+         print(z.explain())
+         -- Graph -- 
+         Variables: 2, Functions: 1, Points: 1
+         ...
+         Used mode: reverse
+        """
+        return self.cost.explain() + 'Used mode: ' + self.mode + '\n'
 
     def __repr__(self): 
         return self.out.__repr__()
@@ -87,13 +192,17 @@ class auto_diff:
         return self.out.__str__()
 
 class Forward:
-    def __init__(self, var, fct, seed = None):
+    def __init__(self, var, fct, seed = None, sparse = False, workers = None):
         """Initiate a function variable.
          INPUTS
          =======
          self: Variable object
          var: float/int, the value of this variable
          seed: int/list/array, the seed vector (derivative from the parents)
+         sparse: bool, whether `der` is returned as a Sparse_Jacobian (COO/CSR arrays) instead of a
+            dense array. Sparse derivative vectors are used internally from 1000 variables on anyway
+         workers: int, if given, the functions are split into chunks of balanced predicted cost and
+            evaluated on a persistent pool of this many processes (see parallel.evaluate)
 
          RETURNS
          ========
@@ -123,6 +232,15 @@ class Forward:
          -- Gradients -- 
          Function F1: [-0.14112001 16.        ]
          Function F2: [-0.09622504  1.        ]
+
+         Arrays of N points give values of shape (N, num_fct) and gradients of shape (N, num_fct, num_var):
+
+         vars = {'x': np.array([1., 2., 3.]), 'y': np.array([4., 5., 6.])}
+         fcts = ['cos(x) + y ** 2', 'x * y']
+         z = Forward(vars, fcts)
+         z.der[1]
+         array([[-0.90929743, 10.        ],
+                [ 5.        ,  2.        ]])
          """
 
         check = [1 if isinstance(i, str) else 0 for i in fct]
@@ -134,30 +252,21 @@ class Forward:
                     # default seed
                     seed = {var_name: 1 for var_name in list(var.keys())}
                 
-                # initializing all variables
                 num_var = len(var)
                 self.var2idx = dict(zip(list(var.keys()), list(range(num_var))))
-                for var_name, var_value in var.items():
-                    der_ = np.zeros((num_var,))
-                    der_[self.var2idx[var_name]] = float(seed[var_name])
-                    exec(f'{var_name} = Variable(float(var_value), der_)')
-                # initializing all functions
-                
-                # static methods
-                static_methods = ['log', 'sqrt', 'exp', 'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh']
-
-                all_fcts = []
-                num_fct = len(fct)
-                for function in fct:
-                    for i in static_methods:
-                        if i in function:
-                            # for multiple but same static methods 
-                            function = re.sub(i + r'\(', 'Variable.' + i + '(', function)
-                            function = re.sub('arcVariable.', 'arc', function)
-                    all_fcts.append(eval(function))
-
-                self.var = np.array([i.var for i in all_fcts])
-                self.der = np.array([i.der for i in all_fcts])
+
+                if _parallel(workers, fct):
+                    from .parallel import evaluate
+                    self.var, self.der = evaluate('forward', var, fct, seed, workers, sparse)
+                    return
+
+                # the function strings are parsed once into an expression graph
+                from .compiler import compile_cache
+                compiled = compile_cache.get(fct, list(var.keys()))
+                if sparse:
+                    self.var, self.der = compiled.sparse_jacobian(var, seed)
+                else:
+                    self.var, self.der = compiled(var, seed)
 
             else: 
                 raise TypeError('The variable should be a dictionary!')
@@ -165,36 +274,40 @@ class Forward:
     
     def __repr__(self):
         output_string = '-- Values -- \n'
-        for var_idx in range(self.var.shape[0]):
-            output_string =  output_string + 'Function F' + str(var_idx + 1) + ': ' + str(self.var[var_idx]) + '\n'
+        for var_idx in range(self.var.shape[-1]):
+            output_string =  output_string + 'Function F' + str(var_idx + 1) + ': ' + str(self.var[..., var_idx]) + '\n'
 
         output_string = output_string + '-- Gradients -- \n'
 
-        for fct_idx in range(self.der.shape[0]):
-            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.der[fct_idx]) + '\n'
+        der = self.der.toarray() if hasattr(self.der, 'toarray') else self.der
+        for fct_idx in range(der.shape[-2]):
+            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(der[..., fct_idx, :]) + '\n'
 
         return output_string
 
     def __str__(self):
         output_string = '-- Values -- \n'
-        for var_idx in range(self.var.shape[0]):
-            output_string =  output_string + 'Function F' + str(var_idx + 1) + ': ' + str(self.var[var_idx]) + '\n'
+        for var_idx in range(self.var.shape[-1]):
+            output_string =  output_string + 'Function F' + str(var_idx + 1) + ': ' + str(self.var[..., var_idx]) + '\n'
 
         output_string = output_string + '-- Gradients -- \n'
 
-        for fct_idx in range(self.der.shape[0]):
-            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.der[fct_idx]) + '\n'
+        der = self.der.toarray() if hasattr(self.der, 'toarray') else self.der
+        for fct_idx in range(der.shape[-2]):
+            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(der[..., fct_idx, :]) + '\n'
 
         return output_string
 
 class Reverse:
-    def __init__(self, var, fct, seed = None):
+    def __init__(self, var, fct, seed = None, workers = None):
         """Initiate a function variable.
          INPUTS
          =======
          self: Variable object
          var: float/int, the value of this variable
          seed: int/list/array, the seed vector (derivative from the parents)
+         workers: int, if given, the functions are split into chunks of balanced predicted cost and
+            each chunk is recorded and swept on a persistent pool of this many processes
 
          RETURNS
          ========
@@ -224,6 +337,16 @@ class Reverse:
          -- Gradients -- 
          Function F1: [16.7781122  8.3890561]
          Function F2: [2. 6.]
+
+         Arrays of N points are swept once per function for all the points, giving values of
+         shape (N, num_fct) and gradients of shape (N, num_fct, num_var):
+
+         var = {'x': np.array([1., 2.]), 'y': 2}
+         fcts = ['x * y + exp(x * y)']
+         z = Reverse(var, fcts)
+         z.der[:, 0]
+         array([[ 16.7781122 ,   8.3890561 ],
+                [111.19630007, 111.19630007]])
          """
         check = [1 if isinstance(i, str) else 0 for i in fct]
         if len(check) != sum(check):
@@ -236,62 +359,207 @@ class Reverse:
                 
                 num_var = len(var)
                 self.var2idx = dict(zip(list(var.keys()), list(range(num_var))))
-                                
-                # static methods
-                static_methods = ['log', 'sqrt', 'exp', 'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh']
 
-                num_fct = len(fct)
-                self.der = []
-                self.var = []
-                for idx, func in enumerate(fct):
-                    # reset variables for each functions
-                    for var_name, var_value in var.items():
-                        exec(f'{var_name} = Reverse_Mode(float(var_value))')
+                if _parallel(workers, fct):
+                    from .parallel import evaluate
+                    self.var, self.der = evaluate('reverse', var, fct, seed, workers)
+                    return
+
+                # the function strings are parsed once into an expression graph
+                from .compiler import compile_cache
+                compiled = compile_cache.get(fct, list(var.keys()))
+                values = compiled.point(var)
 
-                    # update functions naming
+                # one forward pass records a single graph for all the functions
+                inputs = [Reverse_Mode(value) for value in values]
+                outputs = compiled.expression.evaluate(inputs, Reverse_Mode)
+                graph = Reverse_Mode.graph(inputs)
 
-                    for i in static_methods:
-                        if i in func:
-                            # for multiple but same static methods 
-                            func = re.sub(i + r'\(', 'Reverse_Mode.' + i + '(', func)
-                            func = re.sub('arcReverse_Mode.', 'arc', func)
+                # () for a single point, (N,) for N points
+                shape = np.shape(values[0]) if values else ()
 
-                    f1 = eval(func)
-                    out1, out2 = eval(f'f1.derivative(' + str(list(var.keys())).replace('\'','') + ', seed[idx])')
+                self.der = []
+                self.var = []
+                for idx, f1 in enumerate(outputs):
+                    if isinstance(f1, Reverse_Mode):
+                        # clear the gradients of the previous sweep
+                        for node in graph:
+                            node.der = None
+                        f1.der = seed[idx]
+                        Reverse_Mode.sweep(graph)
+                        out1, out2 = f1.var, [i.der for i in inputs]
+                    else:
+                        # constant function
+                        out1, out2 = float(f1), [0.] * num_var
+                    if shape:
+                        # inputs that do not reach the function keep a scalar gradient of 0
+                        out1 = np.broadcast_to(out1, shape)
+                        out2 = [np.broadcast_to(der, shape) for der in out2]
                     # update the two attributes
                     self.var.append(out1)
-                    self.der.append(out2)
-            
-                self.der = np.array(self.der)
-                self.var = np.array(self.var)
+                    self.der.append(np.stack(out2, axis=-1) if shape else np.array(out2))
+
+                if shape:
+                    # the points come first, as in Forward
+                    self.der = np.stack(self.der, axis=-2)
+                    self.var = np.stack(self.var, axis=-1)
+                else:
+                    self.der = np.array(self.der)
+                    self.var = np.array(self.var)
 
             else: 
                 raise TypeError('The variable should be a dictionary!')
 
     def __repr__(self):
         output_string = '-- Values -- \n'
-        for var_idx in range(self.var.shape[0]):
-            output_string =  output_string + 'Function F' + str(var_idx + 1) + ': ' + str(self.var[var_idx]) + '\n'
+        for var_idx in range(self.var.shape[-1]):
+            output_string =  output_string + 'Function F' + str(var_idx + 1) + ': ' + str(self.var[..., var_idx]) + '\n'
 
         output_string = output_string + '-- Gradients -- \n'
 
-        for fct_idx in range(self.der.shape[0]):
-            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.der[fct_idx]) + '\n'
+        for fct_idx in range(self.der.shape[-2]):
+            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.der[..., fct_idx, :]) + '\n'
 
         return output_string
 
     def __str__(self):
         output_string = '-- Values -- \n'
-        for var_idx in range(self.var.shape[0]):
-            output_string =  output_string + 'Function F' + str(var_idx + 1) + ': ' + str(self.var[var_idx]) + '\n'
+        for var_idx in range(self.var.shape[-1]):
+            output_string =  output_string + 'Function F' + str(var_idx + 1) + ': ' + str(self.var[..., var_idx]) + '\n'
 
         output_string = output_string + '-- Gradients -- \n'
 
-        for fct_idx in range(self.der.shape[0]):
-            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.der[fct_idx]) + '\n'
+        for fct_idx in range(self.der.shape[-2]):
+            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.der[..., fct_idx, :]) + '\n'
+
+        return output_string
+
+class Hessian:
+    def __init__(self, var, fct, seed = None):
+        """Compute the values, gradients and Hessians of the functions in one second-order forward pass.
+         INPUTS
+         =======
+         self: Hessian object
+         var: dict, variable name: value (or an array with the values at N points)
+         fct: list of str, the functions
+         seed: dict, variable name: seed (default 1 for every variable)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Each variable is a Hyper_Dual, so the Hessian of every function is obtained in one evaluation
+         instead of 2n + 1 evaluations of the gradient. `hes` has shape (num_fct, num_var, num_var),
+         with N first for N points.
+
+         EXAMPLES
+         =========
+
+         z = Hessian({'x': 3, 'y': 4}, ['x ** 2 * y'])
+         -- Values -- 
+         Function F1: 36.0
+         -- Gradients -- 
+         Function F1: [24.  9.]
+         -- Hessians -- 
+         Function F1: [[8. 6.]
+         [6. 0.]]
+         """
+        check = [1 if isinstance(i, str) else 0 for i in fct]
+        if len(check) != sum(check):
+            raise TypeError('Each function should be a string!')
+        if not isinstance(var, dict):
+            raise TypeError('The variable should be a dictionary!')
+
+        from .compiler import compile_cache
+        compiled = compile_cache.get(fct, list(var.keys()))
+        self.var, self.der, self.hes = compiled.hessian(var, seed)
+
+    def __repr__(self):
+        output_string = Forward.__repr__(self)
+        output_string = output_string + '-- Hessians -- \n'
+        for fct_idx in range(self.hes.shape[-3]):
+            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.hes[..., fct_idx, :, :]) + '\n'
+        return output_string
+
+    def __str__(self):
+        return self.__repr__()
+
+class Taylor:
+    def __init__(self, var, fct, order, seed = None):
+        """Compute the first `order` derivatives of the functions along a direction in one Taylor-mode pass.
+         INPUTS
+         =======
+         self: Taylor object
+         var: dict, variable name: value (or an array with the values at N points)
+         fct: list of str, the functions
+         order: int, the number k of derivatives
+         seed: dict, variable name: direction v (default 1 for every variable)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Each variable is a Taylor_Variable x + v t. `coef` holds the Taylor coefficients of f(x + v t) in t,
+         of shape (num_fct, k + 1), and `der` the derivatives d^j/dt^j f(x + v t) for j = 1, ..., k, of shape
+         (num_fct, k). N comes first for N points.
+
+         EXAMPLES
+         =========
+
+         z = Taylor({'x': 0}, ['exp(x)', 'sin(x)'], 4)
+         -- Values -- 
+         Function F1: 1.0
+         Function F2: 0.0
+         -- Derivatives 1 to 4 -- 
+         Function F1: [1. 1. 1. 1.]
+         Function F2: [ 1.  0. -1.  0.]
+         """
+        check = [1 if isinstance(i, str) else 0 for i in fct]
+        if len(check) != sum(check):
+            raise TypeError('Each function should be a string!')
+        if not isinstance(var, dict):
+            raise TypeError('The variable should be a dictionary!')
+        if not isinstance(order, int) or isinstance(order, bool) or order < 1:
+            raise ValueError('The order should be a positive integer.')
+
+        from .compiler import compile_cache
+        compiled = compile_cache.get(fct, list(var.keys()))
+        self.coef = compiled.taylor(var, order, seed)
+        factorial = np.cumprod(np.arange(1., order + 1))
+        self.var = self.coef[..., 0]
+        self.der = self.coef[..., 1:] * factorial
 
+    def __repr__(self):
+        output_string = '-- Values -- \n'
+        for fct_idx in range(self.var.shape[-1]):
+            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.var[..., fct_idx]) + '\n'
+
+        output_string = output_string + '-- Derivatives 1 to ' + str(self.der.shape[-1]) + ' -- \n'
+        for fct_idx in range(self.der.shape[-2]):
+            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.der[..., fct_idx, :]) + '\n'
         return output_string
 
+    def __str__(self):
+        return self.__repr__()
+
+def _parallel(workers, fct):
+    """Whether the functions are evaluated on a pool of `workers` processes."""
+    if workers is None:
+        return False
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError('The number of workers should be a positive integer.')
+    return workers > 1 and len(fct) > 1
+
+
+def _column(value):
+    """Returns `value` as a column when it holds one value per point, so that it broadcasts
+        against a derivative array of shape (N, num_var). Scalars are returned unchanged."""
+    if isinstance(value, np.ndarray):
+        return value[..., None]
+    return value
+
 class Variable:
     """Summary
     
@@ -303,13 +571,16 @@ class Variable:
         Description
     """
 
+    # no per-instance __dict__, millions of intermediate variables can be created
+    __slots__ = ('var', 'der')
+
     def __init__(self, var, seed = np.array([1])):
         """Initiate a auto diff variable.
          INPUTS
          =======
          self: Variable object
-         var: float/int, the value of this variable
-         seed: int/list/array, the seed vector (derivative from the parents)
+         var: float/int/array, the value of this variable, or an array of shape (N,) with its value at N points
+         seed: int/list/array, the seed vector (derivative from the parents), or an array of shape (N, num_var)
 
          RETURNS
          ========
@@ -320,6 +591,10 @@ class Variable:
          >>> x = Variable(3, 1)
          Variable(3, [1])
 
+         # the same variable at three points
+         >>> x = Variable(np.array([1., 2., 3.]), [1, 0])
+         Variable([1. 2. 3.], [[1 0] [1 0] [1 0]])
+
          # single var with der list
          >>> x = Variable(3, [1])
          Variable(3, [1])
@@ -342,14 +617,39 @@ class Variable:
          """
         if isinstance(var, (int, float)):
             self.var = var
+        elif isinstance(var, np.ndarray) and var.ndim == 1:
+            # a batch of points
+            self.var = var.astype(float)
         else:
-            raise TypeError('You did not enter a valid integer or float.')
+            raise TypeError('You did not enter a valid integer, float or one-dimensional array.')
         if isinstance(seed, (int, float)):
             seed = np.array([seed])
         elif isinstance(seed, list):
             seed = np.array(seed)
+        if isinstance(self.var, np.ndarray) and seed.ndim == 1:
+            # the same seed vector at every point
+            seed = np.tile(seed, (self.var.shape[0], 1))
         self.der = seed
 
+    @staticmethod
+    def _new(var, der):
+        """Create a Variable without validating the inputs. Used by the operators, whose
+            results are always a valid value and derivative array.
+
+         INPUTS
+         =======
+         var: float/int, the value of the new variable
+         der: array, the derivative of the new variable
+
+         RETURNS
+         ========
+         output: Variable
+        """
+        self = object.__new__(Variable)
+        self.var = var
+        self.der = der
+        return self
+
     def __add__(self, other):
         """Dunder method for adding another variable or scalar/vector
          INPUTS
@@ -379,9 +679,9 @@ class Variable:
          Variable(6, [1, 1])
         """
         try:
-            return Variable(self.var + other.var, self.der + other.der)
+            return Variable._new(self.var + other.var, self.der + other.der)
         except AttributeError:
-            return Variable(self.var + other, self.der)
+            return Variable._new(self.var + other, self.der)
 
     def __radd__(self, other):
         """Dunder method for adding another variable or scalar/vector from left
@@ -443,9 +743,9 @@ class Variable:
 
         """
         try:
-            return Variable(self.var * other.var, self.var * other.der + self.der * other.var)
+            return Variable._new(self.var * other.var, _column(self.var) * other.der + self.der * _column(other.var))
         except AttributeError:
-            return Variable(self.var * other, self.der * other)
+            return Variable._new(self.var * other, self.der * other)
 
     def __rmul__(self, other):
         """Dunder method for multiplying another variable or scalar/vector from left
@@ -567,9 +867,9 @@ class Variable:
          Variable(3/4, [1/4, -3/16])
         """
         try:
-            return Variable(self.var / other.var, (self.der * other.var - self.var * other.der)/(other.var**2))
+            return Variable._new(self.var / other.var, (self.der * _column(other.var) - _column(self.var) * other.der) / _column(other.var**2))
         except AttributeError:
-            return Variable(self.var / other, self.der / other)
+            return Variable._new(self.var / other, self.der / other)
 
     def __rtruediv__(self, other):
         """Dunder method for being divided by another variable or scalar/vector
@@ -600,9 +900,9 @@ class Variable:
          Variable(3/4, [1/4, -3/16])
         """
         try:
-            return Variable(other.var / self.var, (other.der * self.var - other.var * self.der)/(self.var**2))
+            return Variable._new(other.var / self.var, (other.der * _column(self.var) - _column(other.var) * self.der) / _column(self.var**2))
         except AttributeError:
-            return Variable(other / self.var, other * (-self.var**(-2)) * self.der)
+            return Variable._new(other / self.var, _column(other * (-self.var**(-2))) * self.der)
 
     def __neg__(self):
         """Dunder method for taking the negative
@@ -621,7 +921,7 @@ class Variable:
          >>> -x
          Variable(-3, [-1])
         """
-        return Variable(-self.var, -self.der)
+        return Variable._new(-self.var, -self.der)
 
     def __eq__(self, other):
         """Dunder method for checking equality
@@ -645,7 +945,7 @@ class Variable:
          True
         """
         try:
-            out = (self.var == other.var) and np.array_equal(self.der, other.der)
+            out = np.array_equal(self.var, other.var) and np.array_equal(self.der, other.der)
         except AttributeError:
             # a scalar is not equal to a variable
             out = False
@@ -794,8 +1094,8 @@ class Variable:
          Variable(3, [1])
         """
         var = abs(self.var)
-        der = np.abs(self.der)
-        return Variable(var, der) 
+        der = _column(np.sign(self.var)) * self.der
+        return Variable._new(var, der) 
 
     def __pow__(self, exponent):
         """Returns the power of the Variable object to the exponent.
@@ -820,17 +1120,17 @@ class Variable:
          """
         # `self` ^ other
         # check domain
-        if self.var <= 0 and exponent < 1:
+        if np.any(np.logical_and(self.var <= 0, exponent < 1)):
             raise ValueError('Base has to be > 0, and the exponent has to be >= 1')
         try:
             var = self.var ** exponent.var
-            der = exponent.var * (self.var ** (exponent.var - 1)) * self.der + \
-                (self.var ** exponent.var) * np.log(self.var) * exponent.der
-            return Variable(var, der)
+            der = _column(exponent.var * (self.var ** (exponent.var - 1))) * self.der + \
+                _column((self.var ** exponent.var) * np.log(self.var)) * exponent.der
+            return Variable._new(var, der)
         except AttributeError:
             var = self.var ** exponent
-            der = self.der * exponent * (self.var ** (exponent - 1))
-            return Variable(var, der)
+            der = self.der * _column(exponent * (self.var ** (exponent - 1)))
+            return Variable._new(var, der)
 
     def __rpow__(self, other):
         """Returns the power of the `other` object to `self`.
@@ -853,11 +1153,11 @@ class Variable:
          Variable(8, [5.545])
          """
         # `other` ^ `self`
-        if other < 0 and self.var < 1:
+        if np.any(np.logical_and(other < 0, self.var < 1)):
             raise ValueError('Please input a non-negative value for the base. The exponent has to be >= 1')
         var = other ** self.var
-        der = (other ** self.var) * np.log(other) * self.der
-        return Variable(var, der)
+        der = _column((other ** self.var) * np.log(other)) * self.der
+        return Variable._new(var, der)
 
     @staticmethod
     def sqrt(variable):
@@ -876,7 +1176,7 @@ class Variable:
          >>> Variable.sqrt(x)
          Variable(1.732, [0.289])
          """
-        if variable < 0:
+        if np.any(variable < 0):
             raise ValueError('Cannot take sqrt of a negative value')
         return variable ** (1/2)
 
@@ -899,8 +1199,8 @@ class Variable:
          """
         try:
             var = np.exp(variable.var)
-            der = np.exp(variable.var) * variable.der
-            return Variable(var, der)
+            der = _column(var) * variable.der
+            return Variable._new(var, der)
 
         except AttributeError:
             return np.exp(variable)
@@ -922,12 +1222,12 @@ class Variable:
          >>> Variable.log(x)
          Variable(1.732, [0.289])
          """
-        if variable <= 0:
+        if np.any(variable <= 0):
             raise ValueError('Please input a positive number')
         try:
             var = np.log(variable.var)
-            der = (1.0 / variable.var) * variable.der
-            return Variable(var, der)
+            der = _column(1.0 / variable.var) * variable.der
+            return Variable._new(var, der)
         except AttributeError:
             return np.log(variable)
 
@@ -953,8 +1253,8 @@ class Variable:
         try:
             var = np.sin(variable.var)
             b = np.cos(variable.var)
-            der = variable.der * b
-            return Variable(var, der)
+            der = variable.der * _column(b)
+            return Variable._new(var, der)
         except AttributeError:
             return np.sin(variable)
 
@@ -983,9 +1283,9 @@ class Variable:
         try:
             var = np.cos(variable.var)
             b = -np.sin(variable.var)
-            der = variable.der * b
+            der = variable.der * _column(b)
 
-            return Variable(var, der)
+            return Variable._new(var, der)
         except AttributeError:
             return np.cos(variable)
 
@@ -1011,16 +1311,16 @@ class Variable:
         # would typically do try-except, but due to machine precision this won't work
         try:
             check_domain = variable.var % np.pi == (np.pi/2)
-            if check_domain:
+            if np.any(check_domain):
                 raise ValueError(
                     'Cannot take the tangent of this value since it is a multiple of pi/2 + (pi * n), where n is a positive integer')
 
             new_var = np.tan(variable.var)
 
             tan_derivative = 1 / np.power(np.cos(variable.var), 2)
-            new_der = variable.der * tan_derivative
+            new_der = variable.der * _column(tan_derivative)
 
-            tan = Variable(new_var, new_der)
+            tan = Variable._new(new_var, new_der)
 
             return tan
 
@@ -1047,15 +1347,15 @@ class Variable:
         Variable(0.0, [1.])        
         """
         try:
-            if variable.var>1 or variable.var <-1:
+            if np.any(np.logical_or(variable.var > 1, variable.var < -1)):
                 raise ValueError('Please input -1 <= x <=1')
 
             else:
                 var = np.arcsin(variable.var)
-                der = 1 / np.sqrt(1 - (variable.var ** 2))
+                der = variable.der * _column(1 / np.sqrt(1 - (variable.var ** 2)))
 
 
-            return Variable(var, der) 
+            return Variable._new(var, der)
         except AttributeError:
             return np.arcsin(variable)
 
@@ -1076,16 +1376,16 @@ class Variable:
         ========= 
         >>> x = Variable(0)
         >>> Variable.arccos(x)
-        Variable(0.0, [-1.])
+        Variable(1.5707963267948966, [-1.])
         """
         try:
-            if variable.var>1 or variable.var <-1:
+            if np.any(np.logical_or(variable.var > 1, variable.var < -1)):
                 raise ValueError('Please input -1 <= x <=1')
 
             else:
-                var = np.arcsin(variable.var)
-                der = -1 / np.sqrt(1 - (variable.var ** 2))
-            return Variable(var, der)
+                var = np.arccos(variable.var)
+                der = variable.der * _column(-1 / np.sqrt(1 - (variable.var ** 2)))
+            return Variable._new(var, der)
         except AttributeError:
             return np.arccos(variable)
 
@@ -1112,9 +1412,9 @@ class Variable:
             new_var = np.arctan(variable.var)
 
             arctan_derivative = 1 / (1 + np.power(variable.var, 2))
-            new_der = variable.der * arctan_derivative
+            new_der = variable.der * _column(arctan_derivative)
 
-            arctan = Variable(new_var, new_der)
+            arctan = Variable._new(new_var, new_der)
 
             return arctan
 
@@ -1146,9 +1446,9 @@ class Variable:
             new_var = np.sinh(variable.var)
 
             sinh_derivative = np.cosh(variable.var)
-            new_der = variable.der * sinh_derivative
+            new_der = variable.der * _column(sinh_derivative)
 
-            sinh = Variable(new_var, new_der)
+            sinh = Variable._new(new_var, new_der)
 
             return sinh
 
@@ -1180,9 +1480,9 @@ class Variable:
             new_var = np.cosh(variable.var)
 
             cosh_derivative = np.sinh(variable.var)
-            new_der = variable.der * cosh_derivative
+            new_der = variable.der * _column(cosh_derivative)
 
-            cosh = Variable(new_var, new_der)
+            cosh = Variable._new(new_var, new_der)
 
             return cosh
 
@@ -1213,9 +1513,9 @@ class Variable:
             new_var = np.tanh(variable.var)
 
             tanh_derivative = 1 / np.power(np.cosh(variable.var), 2)
-            new_der = variable.der * tanh_derivative
+            new_der = variable.der * _column(tanh_derivative)
 
-            tanh = Variable(new_var, new_der)
+            tanh = Variable._new(new_var, new_der)
             return tanh
 
         except AttributeError:
@@ -1231,12 +1531,15 @@ class Variable:
 
 class Reverse_Mode:
 
+    # no per-instance __dict__, every operation creates a node of the graph
+    __slots__ = ('var', 'child', 'der')
+
     def __init__(self, var):
         """Initiate a auto diff variable in the Reverse Mode.
           INPUTS
           =======
           self: Variable object
-          var: float/int, the value of this variable
+          var: float/int/array, the value of this variable, or an array of shape (N,) with its value at N points
 
           RETURNS
           ========
@@ -1245,19 +1548,44 @@ class Reverse_Mode:
           =========
           # single var with der int
           >>> x = Reverse_Mode(3)
+
+          # the same variable at three points, every node of the graph then holds three values
+          >>> x = Reverse_Mode(np.array([1., 2., 3.]))
           """
 
         if isinstance(var, (int, float)):
             self.var = var
+        elif isinstance(var, np.ndarray) and var.ndim == 1:
+            # a batch of points
+            self.var = var.astype(float)
         else:
-            raise TypeError('You did not enter a valid integer or float.')
+            raise TypeError('You did not enter a valid integer, float or one-dimensional array.')
 
         # need this because we need to store a form of the computational graph
         self.child = []
         self.der = None
 
+    @staticmethod
+    def _new(var):
+        """Create a Reverse_Mode node without validating the value. Used by the operators.
+
+          INPUTS
+          =======
+          var: float/int, the value of the new node
+
+          RETURNS
+          ========
+          output: Reverse_Mode
+          """
+
+        self = object.__new__(Reverse_Mode)
+        self.var = var
+        self.child = []
+        self.der = None
+        return self
+
     def gradient(self):
-        """Calculate the gradient down the computation graph recursively. Should not be called seperately. Used inside
+        """Calculate the gradient down the computation graph. Should not be called seperately. Used inside
             self.derivative(*args)
 
           INPUTS
@@ -1267,17 +1595,94 @@ class Reverse_Mode:
           RETURNS
           ========
           self.der: the gradient of the current variable
+
+          NOTES
+          =====
+          The graph is swept iteratively in reverse topological order, so very deep graphs do not
+          hit the recursion limit.
           """
 
         if self.der is None:
-            # I'm using this based on the equation for lecture 12 we had in class
-            df_dui = 0
-            for duj_dui, df_duj in self.child:
-                # I need this += so that I can handle when the node has more than one child
-                df_dui += duj_dui * df_duj.gradient()
-            self.der = df_dui
+            # iterative depth first search: a node is finished once all its children are
+            stack = [(self, iter(self.child))]
+            while stack:
+                node, children = stack[-1]
+                for _, child in children:
+                    if child.der is None:
+                        stack.append((child, iter(child.child)))
+                        break
+                else:
+                    stack.pop()
+                    df_dui = 0
+                    for duj_dui, df_duj in node.child:
+                        # sum over the children, not in place: the terms may broadcast to a larger shape
+                        df_dui = df_dui + duj_dui * df_duj.der
+                    node.der = df_dui
         return self.der
 
+    @staticmethod
+    def graph(inputs):
+        """Collect every node of the computational graph that depends on `inputs`, in topological order.
+
+          INPUTS
+          =======
+          inputs: list of Reverse_Mode, the input variables
+
+          RETURNS
+          ========
+          nodes: list of Reverse_Mode, the inputs and all the nodes computed from them, where every
+          node comes before its children
+
+          EXAMPLES
+          =========
+          >>> x = Reverse_Mode(3), y = Reverse_Mode(4)
+          >>> f = x * y + x
+          >>> len(Reverse_Mode.graph([x, y]))
+          4
+          """
+
+        # iterative depth first search, the reversed post-order is a topological order
+        order = []
+        visited = set()
+        for root in inputs:
+            if id(root) in visited:
+                continue
+            visited.add(id(root))
+            stack = [(root, iter(root.child))]
+            while stack:
+                node, children = stack[-1]
+                for _, child in children:
+                    if id(child) not in visited:
+                        visited.add(id(child))
+                        stack.append((child, iter(child.child)))
+                        break
+                else:
+                    stack.pop()
+                    order.append(node)
+        order.reverse()
+        return order
+
+    @staticmethod
+    def sweep(graph):
+        """Accumulate the gradients of a topologically ordered graph from the last node to the first.
+            Nodes whose `der` is already set (e.g. the seeded output) are kept as they are.
+
+          INPUTS
+          =======
+          graph: list of Reverse_Mode, as returned by Reverse_Mode.graph
+
+          RETURNS
+          ========
+          """
+
+        for node in reversed(graph):
+            if node.der is None:
+                der = 0
+                for weight, child in node.child:
+                    # sum over the children, not in place: the terms may broadcast to a larger shape
+                    der = der + weight * child.der
+                node.der = der
+
     def derivative(self, inputs, seed=1):
         """Calcuate the gradients from the final function respect to each input variable.
 
@@ -1303,7 +1708,11 @@ class Reverse_Mode:
 
         self.der = seed
         value = self.var
-        derivatives = np.array([i.gradient() for i in inputs])
+        if isinstance(value, np.ndarray):
+            # one gradient per point, of shape (N, len(inputs))
+            derivatives = np.stack(np.broadcast_arrays(value, *[i.gradient() for i in inputs])[1:], axis=-1)
+        else:
+            derivatives = np.array([i.gradient() for i in inputs])
 
         return value, derivatives
 
@@ -1333,11 +1742,11 @@ class Reverse_Mode:
          """
 
         try:
-            f = Reverse_Mode(self.var + other.var)
+            f = Reverse_Mode._new(self.var + other.var)
             other.child.append((1.0, f))
             self.child.append((1.0, f))
         except AttributeError:
-            f = Reverse_Mode(self.var + other)
+            f = Reverse_Mode._new(self.var + other)
             self.child.append((1.0, f))
         return f
 
@@ -1379,7 +1788,7 @@ class Reverse_Mode:
          Reverse_Mode(-4)
         """
 
-        f = Reverse_Mode(-self.var)
+        f = Reverse_Mode._new(-self.var)
         self.child.append((-1, f))
         return f
 
@@ -1409,11 +1818,11 @@ class Reverse_Mode:
          """
 
         try:
-            f = Reverse_Mode(self.var * other.var)
+            f = Reverse_Mode._new(self.var * other.var)
             self.child.append((other.var, f))
             other.child.append((self.var, f))
         except AttributeError:
-            f = Reverse_Mode(self.var * other)
+            f = Reverse_Mode._new(self.var * other)
             self.child.append((other, f))
         return f
 
@@ -1518,12 +1927,12 @@ class Reverse_Mode:
         """
 
         try:
-            other_new = Reverse_Mode(1 / other.var)
+            other_new = Reverse_Mode._new(1 / other.var)
             other.child.append((-other.var ** -2, other_new))
             return self * other_new
 
         except AttributeError:
-            f = Reverse_Mode(self.var / other)
+            f = Reverse_Mode._new(self.var / other)
             der = 1 / other
             self.child.append((der, f))
 
@@ -1548,7 +1957,7 @@ class Reverse_Mode:
          Reverse_Mode(2/3)
         """
 
-        f = Reverse_Mode(other / self.var)
+        f = Reverse_Mode._new(other / self.var)
         der = other * (-self.var ** (-2)) * 1
         self.child.append((der, f))
 
@@ -1577,7 +1986,7 @@ class Reverse_Mode:
         """
 
         try:
-            out = (self.var == other.var)
+            out = np.array_equal(self.var, other.var)
         except AttributeError:
             print('A scalar and a Variable type does not equal')
             out = False
@@ -1731,11 +2140,8 @@ class Reverse_Mode:
          Reverse_Mode(3)
         """
 
-        f = Reverse_Mode(abs(self.var))
-        multiplier = 1
-        if self.var < 0 :
-            multiplier = -1
-        der = self.var / abs(self.var) * multiplier
+        f = Reverse_Mode._new(abs(self.var))
+        der = np.sign(self.var)
         self.child.append((der, f))
         return f
 
@@ -1764,13 +2170,13 @@ class Reverse_Mode:
 
         # `self` ^ other
         # check domain
-        if self.var <= 0 and exponent < 1:
+        if np.any(np.logical_and(self.var <= 0, exponent < 1)):
             raise ValueError('Base has to be > 0, and the exponent has to be >= 1')
 
         if isinstance(exponent, Reverse_Mode):
             raise AttributeError('The exponent cannot be a Reverse_Mode object')
 
-        f = Reverse_Mode(self.var ** exponent)
+        f = Reverse_Mode._new(self.var ** exponent)
         der = 1 * exponent * (self.var ** (exponent - 1))
         self.child.append((der, f))
         return f
@@ -1797,9 +2203,9 @@ class Reverse_Mode:
          """
 
         # `other` ^ `self`
-        if other < 0 and self.var < 1:
+        if np.any(np.logical_and(other < 0, self.var < 1)):
             raise ValueError('Please input a non-negative value for the base. The exponent has to be >= 1')
-        f = Reverse_Mode(other ** self.var)
+        f = Reverse_Mode._new(other ** self.var)
         der = (other ** self.var) * np.log(other) * 1
         self.child.append((der, f))
         return f
@@ -1825,7 +2231,7 @@ class Reverse_Mode:
          1.732
          """
 
-        if variable < 0:
+        if np.any(variable < 0):
             raise ValueError('Cannot take sqrt of a negative value')
         return variable ** (1 / 2)
 
@@ -1851,7 +2257,7 @@ class Reverse_Mode:
          """
 
         try:
-            f = Reverse_Mode(np.exp(variable.var))
+            f = Reverse_Mode._new(np.exp(variable.var))
             variable.child.append((np.exp(variable.var), f))
         except AttributeError:
             f = np.exp(variable)
@@ -1879,10 +2285,10 @@ class Reverse_Mode:
          1.732
          """
 
-        if variable <= 0:
+        if np.any(variable <= 0):
             raise ValueError('Please input a positive number')
         try:
-            f = Reverse_Mode(np.log(variable.var))
+            f = Reverse_Mode._new(np.log(variable.var))
             der = (1.0 / variable.var) * 1
             variable.child.append((der, f))
             return f
@@ -1909,7 +2315,7 @@ class Reverse_Mode:
          """
 
         try:
-            f = Reverse_Mode(np.sin(variable.var))
+            f = Reverse_Mode._new(np.sin(variable.var))
             variable.child.append((np.cos(variable.var), f))
         except AttributeError:
             f = np.sin(variable)
@@ -1935,7 +2341,7 @@ class Reverse_Mode:
          =========
          """
         try:
-            f = Reverse_Mode(np.cos(variable.var))
+            f = Reverse_Mode._new(np.cos(variable.var))
             variable.child.append((-np.sin(variable.var), f))
         except AttributeError:
             f = np.cos(variable)
@@ -1963,12 +2369,12 @@ class Reverse_Mode:
         # would typically do try-except, but due to machine precision this won't work
         try:
             check_domain = variable.var % np.pi == (np.pi / 2)
-            if check_domain:
+            if np.any(check_domain):
                 raise ValueError(
                     'Cannot take the tangent of this value since it is a multiple of pi/2 + (pi * n), where n is a positive integer')
 
             new_var = np.tan(variable.var)
-            f = Reverse_Mode(new_var)
+            f = Reverse_Mode._new(new_var)
 
             der = 1 / np.power(np.cos(variable.var), 2) * 1
             variable.child.append((der, f))
@@ -1999,11 +2405,11 @@ class Reverse_Mode:
         """
 
         try:
-            if variable.var > 1 or variable.var < -1:
+            if np.any(np.logical_or(variable.var > 1, variable.var < -1)):
                 raise ValueError('Please input -1 <= x <=1')
 
             else:
-                f = Reverse_Mode(np.arcsin(variable.var))
+                f = Reverse_Mode._new(np.arcsin(variable.var))
                 der = 1 / np.sqrt(1 - (variable.var ** 2))
                 variable.child.append((der, f))
 
@@ -2028,15 +2434,15 @@ class Reverse_Mode:
         =========
         >>> x = Reverse_Mode(0)
         >>> Reverse_Mode.arccos(x)
-        Reverse_Mode(0.0)
+        Reverse_Mode(1.5707963267948966)
         """
 
         try:
-            if variable.var > 1 or variable.var < -1:
+            if np.any(np.logical_or(variable.var > 1, variable.var < -1)):
                 raise ValueError('Please input -1 <= x <=1')
 
             else:
-                f = Reverse_Mode(np.arcsin(variable.var))
+                f = Reverse_Mode._new(np.arccos(variable.var))
                 der = -1 / np.sqrt(1 - (variable.var ** 2))
                 variable.child.append((der, f))
 
@@ -2064,7 +2470,7 @@ class Reverse_Mode:
 
         # no need to check for a value error
         try:
-            f = Reverse_Mode(np.arctan(variable.var))
+            f = Reverse_Mode._new(np.arctan(variable.var))
             der = 1 / (1 + np.power(variable.var, 2)) * 1
             variable.child.append((der, f))
             return f
@@ -2094,7 +2500,7 @@ class Reverse_Mode:
 
         # don't need to check for domain values
         try:
-            f = Reverse_Mode(np.sinh(variable.var))
+            f = Reverse_Mode._new(np.sinh(variable.var))
             der = np.cosh(variable.var) * 1
             variable.child.append((der, f))
             return f
@@ -2124,7 +2530,7 @@ class Reverse_Mode:
         # don't need to check for domain values
 
         try:
-            f = Reverse_Mode(np.cosh(variable.var))
+            f = Reverse_Mode._new(np.cosh(variable.var))
             der = np.sinh(variable.var) * 1
             variable.child.append((der, f))
             return f
@@ -2153,7 +2559,7 @@ class Reverse_Mode:
 
         # don't need to check for domain values
         try:
-            f = Reverse_Mode(np.tanh(variable.var))
+            f = Reverse_Mode._new(np.tanh(variable.var))
             der = 1 / np.power(np.cosh(variable.var), 2)
             variable.child.append((der, f))
         except AttributeError:
@@ -2166,3 +2572,726 @@ class Reverse_Mode:
 
     def __str__(self):
         return 'Value: ' + str(self.var) + ' , Der: ' + str(self.der)
+
+
+def _matrix(value):
+    """Returns `value` with two trailing axes when it holds one value per point, so that it broadcasts
+        against a Hessian array of shape (N, num_var, num_var). Scalars are returned unchanged."""
+    if isinstance(value, np.ndarray):
+        return value[..., None, None]
+    return value
+
+def _outer(a, b):
+    """Returns the outer product of two derivative arrays, for each point if they have shape (N, num_var)."""
+    return a[..., :, None] * b[..., None, :]
+
+class Hyper_Dual:
+    # numpy scalars defer to our operators instead of broadcasting over the object
+    __array_ufunc__ = None
+    # no per-instance __dict__, as for Variable
+    __slots__ = ('var', 'der', 'hes')
+
+    def __init__(self, var, seed = np.array([1])):
+        """Initiate a second-order auto diff variable, which carries its value, gradient and Hessian.
+         INPUTS
+         =======
+         self: Hyper_Dual object
+         var: float/int/array, the value of this variable, or an array of shape (N,) with its value at N points
+         seed: int/list/array, the seed vector (derivative from the parents)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Every operation applies the chain rule to the second order: for f(u),
+         der = f'(u) du and hes = f'(u) d2u + f''(u) du du^T. The Hessian of an input is 0.
+         The whole Hessian of a function is therefore obtained in one evaluation, at a cost
+         growing with the square of the number of variables, so it is meant for small problems.
+
+         EXAMPLES
+         =========
+         >>> x = Hyper_Dual(3, [1, 0])
+         >>> y = Hyper_Dual(4, [0, 1])
+         >>> f = x ** 2 * y
+         >>> f.hes
+         array([[8., 6.],
+                [6., 0.]])
+        """
+        if isinstance(var, (int, float)):
+            self.var = var
+        elif isinstance(var, np.ndarray) and var.ndim == 1:
+            # a batch of points
+            self.var = var.astype(float)
+        else:
+            raise TypeError('You did not enter a valid integer, float or one-dimensional array.')
+        if isinstance(seed, (int, float)):
+            seed = np.array([seed])
+        seed = np.array(seed, dtype=float)
+        if isinstance(self.var, np.ndarray) and seed.ndim == 1:
+            # the same seed vector at every point
+            seed = np.tile(seed, (self.var.shape[0], 1))
+        self.der = seed
+        self.hes = np.zeros(seed.shape + seed.shape[-1:])
+
+    @staticmethod
+    def _new(var, der, hes):
+        """Create a Hyper_Dual without validating the inputs. Used by the operators.
+
+         INPUTS
+         =======
+         var: float/array, the value of the new variable
+         der: array, the gradient of the new variable
+         hes: array, the Hessian of the new variable
+
+         RETURNS
+         ========
+         output: Hyper_Dual
+        """
+        self = object.__new__(Hyper_Dual)
+        self.var = var
+        self.der = der
+        self.hes = hes
+        return self
+
+    def _chain(self, var, d1, d2):
+        """Returns f(self) given its value `var`, first derivative `d1` and second derivative `d2`."""
+        return Hyper_Dual._new(var, _column(d1) * self.der,
+            _matrix(d1) * self.hes + _matrix(d2) * _outer(self.der, self.der))
+
+    def __add__(self, other):
+        """Dunder method for adding another Hyper_Dual or scalar
+         INPUTS
+         =======
+         self: Hyper_Dual object
+         other: int/float/Hyper_Dual
+
+         RETURNS
+         ========
+         output: Hyper_Dual object
+
+         EXAMPLES
+         =========
+         >>> Hyper_Dual(3, [1]) + 2
+         Value: 5 , Der: [1.] , Hes: [[0.]]
+        """
+        if isinstance(other, Hyper_Dual):
+            return Hyper_Dual._new(self.var + other.var, self.der + other.der, self.hes + other.hes)
+        return Hyper_Dual._new(self.var + other, self.der, self.hes)
+
+    def __radd__(self, other):
+        """Dunder method for adding a scalar from left"""
+        return self.__add__(other)
+
+    def __neg__(self):
+        """Dunder method for taking the negative"""
+        return Hyper_Dual._new(-self.var, -self.der, -self.hes)
+
+    def __sub__(self, other):
+        """Dunder method for subtracting another Hyper_Dual or scalar"""
+        return self.__add__(-other)
+
+    def __rsub__(self, other):
+        """Dunder method for being subtracted from a scalar"""
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        """Dunder method for multiplying another Hyper_Dual or scalar
+         INPUTS
+         =======
+         self: Hyper_Dual object
+         other: int/float/Hyper_Dual
+
+         RETURNS
+         ========
+         output: Hyper_Dual object
+
+         EXAMPLES
+         =========
+         >>> x = Hyper_Dual(3, [1, 0])
+         >>> y = Hyper_Dual(4, [0, 1])
+         >>> (x * y).hes
+         array([[0., 1.],
+                [1., 0.]])
+        """
+        if isinstance(other, Hyper_Dual):
+            var = self.var * other.var
+            der = _column(self.var) * other.der + _column(other.var) * self.der
+            hes = _matrix(self.var) * other.hes + _matrix(other.var) * self.hes + \
+                _outer(self.der, other.der) + _outer(other.der, self.der)
+            return Hyper_Dual._new(var, der, hes)
+        return Hyper_Dual._new(self.var * other, self.der * other, self.hes * other)
+
+    def __rmul__(self, other):
+        """Dunder method for multiplying a scalar from left"""
+        return self.__mul__(other)
+
+    def _reciprocal(self):
+        """Returns 1 / self."""
+        if np.any(self.var == 0):
+            raise ZeroDivisionError('division by zero')
+        return self._chain(1 / self.var, -1 / self.var ** 2, 2 / self.var ** 3)
+
+    def __truediv__(self, other):
+        """Dunder method for dividing by another Hyper_Dual or scalar"""
+        if isinstance(other, Hyper_Dual):
+            return self * other._reciprocal()
+        return Hyper_Dual._new(self.var / other, self.der / other, self.hes / other)
+
+    def __rtruediv__(self, other):
+        """Dunder method for dividing a scalar by self"""
+        return self._reciprocal() * other
+
+    def __pow__(self, exponent):
+        """Returns the power of the Hyper_Dual object to the exponent.
+         INPUTS
+         =======
+         self: Hyper_Dual object
+         exponent: Hyper_Dual/int/float, to the power of
+
+         RETURNS
+         ========
+         power: a new Hyper_Dual object after raising `self` to the power of `exponent`
+
+         NOTES
+         =====
+         As for Variable, the base has to be > 0 unless the exponent is >= 1.
+
+         EXAMPLES
+         =========
+         >>> (Hyper_Dual(3, 1) ** 3).hes
+         array([[18.]])
+        """
+        if isinstance(exponent, Hyper_Dual):
+            if np.any(self.var <= 0):
+                raise ValueError('Base has to be > 0, and the exponent has to be >= 1')
+            return Hyper_Dual.exp(exponent * Hyper_Dual.log(self))
+        if np.any(np.logical_and(self.var <= 0, exponent < 1)):
+            raise ValueError('Base has to be > 0, and the exponent has to be >= 1')
+        # x ** 1 has no second derivative, and 0 ** -1 would give nan
+        d2 = 0 if exponent == 1 else exponent * (exponent - 1) * self.var ** (exponent - 2)
+        return self._chain(self.var ** exponent, exponent * self.var ** (exponent - 1), d2)
+
+    def __rpow__(self, other):
+        """Returns the power of the scalar `other` to `self`."""
+        if np.any(np.logical_and(other < 0, self.var < 1)):
+            raise ValueError('Please input a non-negative value for the base. The exponent has to be >= 1')
+        var = other ** self.var
+        return self._chain(var, var * np.log(other), var * np.log(other) ** 2)
+
+    def __abs__(self):
+        """Dunder method for absolute value"""
+        return self._chain(abs(self.var), np.sign(self.var), 0)
+
+    def __eq__(self, other):
+        """Dunder method for checking equality of the values and the derivatives"""
+        if not isinstance(other, Hyper_Dual):
+            return False
+        return np.array_equal(self.var, other.var) and np.array_equal(self.der, other.der) and \
+            np.array_equal(self.hes, other.hes)
+
+    def __ne__(self, other):
+        """Dunder method for checking inequality"""
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        """Dunder method for less than, compares the values"""
+        return self.var < getattr(other, 'var', other)
+
+    def __le__(self, other):
+        """Dunder method for less than or equal to, compares the values"""
+        return self.var <= getattr(other, 'var', other)
+
+    def __gt__(self, other):
+        """Dunder method for greater than, compares the values"""
+        return self.var > getattr(other, 'var', other)
+
+    def __ge__(self, other):
+        """Dunder method for greater than or equal to, compares the values"""
+        return self.var >= getattr(other, 'var', other)
+
+    @staticmethod
+    def sqrt(variable):
+        """Returns the square root of `variable` (Hyper_Dual object/int/float)."""
+        if np.any(variable < 0):
+            raise ValueError('Cannot take sqrt of a negative value')
+        return variable ** (1/2)
+
+    @staticmethod
+    def exp(variable):
+        """Returns e to the `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.exp(variable)
+        var = np.exp(variable.var)
+        return variable._chain(var, var, var)
+
+    @staticmethod
+    def log(variable):
+        """Returns the natural log of `variable` (Hyper_Dual object/int/float)."""
+        if np.any(variable <= 0):
+            raise ValueError('Please input a positive number')
+        if not isinstance(variable, Hyper_Dual):
+            return np.log(variable)
+        return variable._chain(np.log(variable.var), 1 / variable.var, -1 / variable.var ** 2)
+
+    @staticmethod
+    def sin(variable):
+        """Returns the sine of `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.sin(variable)
+        var = np.sin(variable.var)
+        return variable._chain(var, np.cos(variable.var), -var)
+
+    @staticmethod
+    def cos(variable):
+        """Returns the cosine of `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.cos(variable)
+        var = np.cos(variable.var)
+        return variable._chain(var, -np.sin(variable.var), -var)
+
+    @staticmethod
+    def tan(variable):
+        """Returns the tangent of `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.tan(variable)
+        if np.any(variable.var % np.pi == (np.pi/2)):
+            raise ValueError(
+                'Cannot take the tangent of this value since it is a multiple of pi/2 + (pi * n), where n is a positive integer')
+        var = np.tan(variable.var)
+        d1 = 1 + var ** 2
+        return variable._chain(var, d1, 2 * var * d1)
+
+    @staticmethod
+    def arcsin(variable):
+        """Returns the arcsine of `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.arcsin(variable)
+        if np.any(np.logical_or(variable.var > 1, variable.var < -1)):
+            raise ValueError('Please input -1 <= x <=1')
+        d1 = 1 / np.sqrt(1 - variable.var ** 2)
+        return variable._chain(np.arcsin(variable.var), d1, variable.var * d1 ** 3)
+
+    @staticmethod
+    def arccos(variable):
+        """Returns the arccosine of `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.arccos(variable)
+        if np.any(np.logical_or(variable.var > 1, variable.var < -1)):
+            raise ValueError('Please input -1 <= x <=1')
+        d1 = 1 / np.sqrt(1 - variable.var ** 2)
+        return variable._chain(np.arccos(variable.var), -d1, -variable.var * d1 ** 3)
+
+    @staticmethod
+    def arctan(variable):
+        """Returns the arctangent of `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.arctan(variable)
+        d1 = 1 / (1 + variable.var ** 2)
+        return variable._chain(np.arctan(variable.var), d1, -2 * variable.var * d1 ** 2)
+
+    @staticmethod
+    def sinh(variable):
+        """Returns the hyperbolic sine of `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.sinh(variable)
+        var = np.sinh(variable.var)
+        return variable._chain(var, np.cosh(variable.var), var)
+
+    @staticmethod
+    def cosh(variable):
+        """Returns the hyperbolic cosine of `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.cosh(variable)
+        var = np.cosh(variable.var)
+        return variable._chain(var, np.sinh(variable.var), var)
+
+    @staticmethod
+    def tanh(variable):
+        """Returns the hyperbolic tangent of `variable` (Hyper_Dual object/int/float)."""
+        if not isinstance(variable, Hyper_Dual):
+            return np.tanh(variable)
+        var = np.tanh(variable.var)
+        d1 = 1 - var ** 2
+        return variable._chain(var, d1, -2 * var * d1)
+
+    def __repr__(self):
+        return 'Value: ' + str(self.var) + ' , Der: ' + str(self.der) + ' , Hes: ' + str(self.hes)
+
+    def __str__(self):
+        return self.__repr__()
+
+
+def _cauchy(a, b, j):
+    """Returns the coefficient j of the product of two truncated Taylor series (coefficients on the last axis)."""
+    return np.sum(a[..., :j + 1] * b[..., j::-1], axis=-1)
+
+class Taylor_Variable:
+    # numpy scalars defer to our operators instead of broadcasting over the object
+    __array_ufunc__ = None
+    __slots__ = ('coef',)
+
+    def __init__(self, var, order, direction = 1.):
+        """Initiate a truncated Taylor polynomial x(t) = var + direction * t, which carries the Taylor
+            coefficients of every function of it up to `order`.
+         INPUTS
+         =======
+         self: Taylor_Variable object
+         var: float/int/array, the value of this variable, or an array of shape (N,) with its value at N points
+         order: int, the number k of derivatives to propagate
+         direction: float, the derivative of the variable along the direction
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         `coef` holds the coefficients f_j = f^(j)(0) / j! for j = 0, ..., k on its last axis. Products,
+         quotients and the elementary functions use the standard recurrences (e.g. for w = exp(u),
+         j w_j = sum_i i u_i w_(j-i)), so all k derivatives cost O(k^2) operations instead of the
+         exponential cost of nesting first-order derivatives.
+
+         EXAMPLES
+         =========
+         >>> x = Taylor_Variable(0, 4)
+         >>> Taylor_Variable.exp(x).coef
+         array([1.        , 1.        , 0.5       , 0.16666667, 0.04166667])
+        """
+        if not isinstance(order, int) or isinstance(order, bool) or order < 0:
+            raise ValueError('The order should be a non-negative integer.')
+        if isinstance(var, (int, float)):
+            coef = np.zeros((order + 1,))
+        elif isinstance(var, np.ndarray) and var.ndim == 1:
+            # a batch of points
+            coef = np.zeros(var.shape + (order + 1,))
+        else:
+            raise TypeError('You did not enter a valid integer, float or one-dimensional array.')
+        coef[..., 0] = var
+        if order > 0:
+            coef[..., 1] = direction
+        self.coef = coef
+
+    @staticmethod
+    def _new(coef):
+        """Create a Taylor_Variable from its coefficients without validating them. Used by the operators."""
+        self = object.__new__(Taylor_Variable)
+        self.coef = coef
+        return self
+
+    @property
+    def var(self):
+        """The value of the polynomial, its coefficient 0."""
+        return self.coef[..., 0]
+
+    @property
+    def order(self):
+        """The number of propagated derivatives."""
+        return self.coef.shape[-1] - 1
+
+    def derivatives(self):
+        """Returns the derivatives f^(j) for j = 0, ..., k, i.e. the coefficients times j!."""
+        factorial = np.cumprod(np.concatenate(([1.], np.arange(1., self.order + 1))))
+        return self.coef * factorial
+
+    def _integrate(self, value, derivative):
+        """Returns the series w with w_0 = value and w' = derivative (coefficients 0 ... k-1 of w')."""
+        coef = np.empty(self.coef.shape)
+        coef[..., 0] = value
+        coef[..., 1:] = derivative / np.arange(1., self.order + 1)
+        return Taylor_Variable._new(coef)
+
+    def _derivative(self):
+        """Returns u' truncated to the coefficients 0 ... k-1."""
+        return Taylor_Variable._new(self.coef[..., 1:] * np.arange(1., self.order + 1))
+
+    def __add__(self, other):
+        """Dunder method for adding another Taylor_Variable or scalar"""
+        if isinstance(other, Taylor_Variable):
+            return Taylor_Variable._new(self.coef + other.coef)
+        coef = self.coef.copy()
+        coef[..., 0] = coef[..., 0] + other
+        return Taylor_Variable._new(coef)
+
+    def __radd__(self, other):
+        """Dunder method for adding a scalar from left"""
+        return self.__add__(other)
+
+    def __neg__(self):
+        """Dunder method for taking the negative"""
+        return Taylor_Variable._new(-self.coef)
+
+    def __sub__(self, other):
+        """Dunder method for subtracting another Taylor_Variable or scalar"""
+        return self.__add__(-other)
+
+    def __rsub__(self, other):
+        """Dunder method for being subtracted from a scalar"""
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        """Dunder method for multiplying another Taylor_Variable or scalar
+         INPUTS
+         =======
+         self: Taylor_Variable object
+         other: int/float/Taylor_Variable
+
+         RETURNS
+         ========
+         output: Taylor_Variable object, the Cauchy product truncated to the order
+
+         EXAMPLES
+         =========
+         >>> x = Taylor_Variable(2, 2)
+         >>> (x * x).coef
+         array([4., 4., 1.])
+        """
+        if not isinstance(other, Taylor_Variable):
+            return Taylor_Variable._new(self.coef * other)
+        a, b = np.broadcast_arrays(self.coef, other.coef)
+        coef = np.empty(a.shape)
+        for j in range(a.shape[-1]):
+            coef[..., j] = _cauchy(a, b, j)
+        return Taylor_Variable._new(coef)
+
+    def __rmul__(self, other):
+        """Dunder method for multiplying a scalar from left"""
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        """Dunder method for dividing by another Taylor_Variable or scalar"""
+        if not isinstance(other, Taylor_Variable):
+            return Taylor_Variable._new(self.coef / other)
+        if np.any(other.var == 0):
+            raise ZeroDivisionError('division by zero')
+        # w b = a, so w_j = (a_j - sum_{i>=1} b_i w_(j-i)) / b_0
+        a, b = np.broadcast_arrays(self.coef, other.coef)
+        coef = np.zeros(a.shape)
+        for j in range(a.shape[-1]):
+            coef[..., j] = (a[..., j] - _cauchy(b[..., 1:], coef[..., :j], j - 1)) / b[..., 0]
+        return Taylor_Variable._new(coef)
+
+    def __rtruediv__(self, other):
+        """Dunder method for dividing a scalar by self"""
+        one = np.zeros(self.coef.shape)
+        one[..., 0] = other
+        return Taylor_Variable._new(one) / self
+
+    def __pow__(self, exponent):
+        """Returns the power of the Taylor_Variable object to the exponent.
+         INPUTS
+         =======
+         self: Taylor_Variable object
+         exponent: Taylor_Variable/int/float, to the power of
+
+         RETURNS
+         ========
+         power: a new Taylor_Variable object after raising `self` to the power of `exponent`
+
+         NOTES
+         =====
+         As for Variable, the base has to be > 0 unless the exponent is >= 1. A non-negative integer
+         exponent is computed by repeated products, so the base may be 0. At a zero base, a non-integer
+         exponent p gives zero coefficients up to the order floor(p), and the higher ones do not exist.
+
+         EXAMPLES
+         =========
+         >>> (Taylor_Variable(1, 3) ** 0.5).coef
+         array([ 1.    ,  0.5   , -0.125 ,  0.0625])
+        """
+        if isinstance(exponent, Taylor_Variable):
+            if np.any(self.var <= 0):
+                raise ValueError('Base has to be > 0, and the exponent has to be >= 1')
+            return Taylor_Variable.exp(exponent * Taylor_Variable.log(self))
+        if np.any(np.logical_and(self.var <= 0, exponent < 1)):
+            raise ValueError('Base has to be > 0, and the exponent has to be >= 1')
+        if float(exponent).is_integer() and exponent >= 0 and np.any(self.var == 0):
+            power = Taylor_Variable._new(np.zeros(self.coef.shape))
+            power.coef[..., 0] = 1.
+            for _ in range(int(exponent)):
+                power = power * self
+            return power
+        # the recurrence below divides by u_0: at a zero base, u^p = O(t^p) has no derivative of order > p
+        zero = self.var == 0
+        if np.any(zero) and self.coef.shape[-1] - 1 > exponent:
+            raise ValueError('At a zero base, the derivatives of order > ' + str(exponent) + ' do not exist')
+        # w = u^p, so u w' = p u' w: j u_0 w_j = sum_{i>=1} (p i - (j - i)) u_i w_(j-i)
+        u = self.coef
+        coef = np.zeros(u.shape)
+        coef[..., 0] = u[..., 0] ** exponent
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for j in range(1, u.shape[-1]):
+                i = np.arange(1, j + 1)
+                coef[..., j] = np.sum((exponent * i - (j - i)) * u[..., 1:j + 1] * coef[..., j - 1::-1], axis=-1) / \
+                    (j * u[..., 0])
+        coef[zero] = 0.
+        return Taylor_Variable._new(coef)
+
+    def __rpow__(self, other):
+        """Returns the power of the scalar `other` to `self`. A zero base needs a positive exponent, and
+            gives the zero series."""
+        if np.any(np.logical_and(other < 0, self.var < 1)):
+            raise ValueError('Please input a non-negative value for the base. The exponent has to be >= 1')
+        if other == 0:
+            if np.any(self.var <= 0):
+                raise ValueError('A zero base needs an exponent > 0')
+            return Taylor_Variable._new(np.zeros(self.coef.shape))
+        return Taylor_Variable.exp(self * float(np.log(other)))
+
+    def __abs__(self):
+        """Dunder method for absolute value"""
+        return Taylor_Variable._new(self.coef * _column(np.sign(self.var)))
+
+    def __eq__(self, other):
+        """Dunder method for checking equality of the coefficients"""
+        return isinstance(other, Taylor_Variable) and np.array_equal(self.coef, other.coef)
+
+    def __ne__(self, other):
+        """Dunder method for checking inequality"""
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        """Dunder method for less than, compares the values"""
+        return self.var < getattr(other, 'var', other)
+
+    def __le__(self, other):
+        """Dunder method for less than or equal to, compares the values"""
+        return self.var <= getattr(other, 'var', other)
+
+    def __gt__(self, other):
+        """Dunder method for greater than, compares the values"""
+        return self.var > getattr(other, 'var', other)
+
+    def __ge__(self, other):
+        """Dunder method for greater than or equal to, compares the values"""
+        return self.var >= getattr(other, 'var', other)
+
+    @staticmethod
+    def sqrt(variable):
+        """Returns the square root of `variable` (Taylor_Variable object/int/float)."""
+        if np.any(variable < 0):
+            raise ValueError('Cannot take sqrt of a negative value')
+        return variable ** (1/2)
+
+    @staticmethod
+    def exp(variable):
+        """Returns e to the `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.exp(variable)
+        # w' = u' w
+        u = variable.coef
+        coef = np.zeros(u.shape)
+        coef[..., 0] = np.exp(u[..., 0])
+        for j in range(1, u.shape[-1]):
+            coef[..., j] = np.sum(np.arange(1, j + 1) * u[..., 1:j + 1] * coef[..., j - 1::-1], axis=-1) / j
+        return Taylor_Variable._new(coef)
+
+    @staticmethod
+    def log(variable):
+        """Returns the natural log of `variable` (Taylor_Variable object/int/float)."""
+        if np.any(variable <= 0):
+            raise ValueError('Please input a positive number')
+        if not isinstance(variable, Taylor_Variable):
+            return np.log(variable)
+        # w' = u' / u
+        return variable._integrate(np.log(variable.var), (variable._derivative() / variable._truncated()).coef)
+
+    def _truncated(self):
+        """Returns self truncated to the coefficients 0 ... k-1."""
+        return Taylor_Variable._new(self.coef[..., :-1])
+
+    @staticmethod
+    def _sin_cos(variable, sign):
+        """Returns the series of (sin, cos) for sign = -1, or (sinh, cosh) for sign = 1."""
+        u = variable.coef
+        s = np.zeros(u.shape)
+        c = np.zeros(u.shape)
+        s[..., 0] = np.sin(u[..., 0]) if sign < 0 else np.sinh(u[..., 0])
+        c[..., 0] = np.cos(u[..., 0]) if sign < 0 else np.cosh(u[..., 0])
+        for j in range(1, u.shape[-1]):
+            iu = np.arange(1, j + 1) * u[..., 1:j + 1]
+            s[..., j] = np.sum(iu * c[..., j - 1::-1], axis=-1) / j
+            c[..., j] = sign * np.sum(iu * s[..., j - 1::-1], axis=-1) / j
+        return Taylor_Variable._new(s), Taylor_Variable._new(c)
+
+    @staticmethod
+    def sin(variable):
+        """Returns the sine of `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.sin(variable)
+        return Taylor_Variable._sin_cos(variable, -1)[0]
+
+    @staticmethod
+    def cos(variable):
+        """Returns the cosine of `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.cos(variable)
+        return Taylor_Variable._sin_cos(variable, -1)[1]
+
+    @staticmethod
+    def tan(variable):
+        """Returns the tangent of `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.tan(variable)
+        if np.any(variable.var % np.pi == (np.pi/2)):
+            raise ValueError(
+                'Cannot take the tangent of this value since it is a multiple of pi/2 + (pi * n), where n is a positive integer')
+        s, c = Taylor_Variable._sin_cos(variable, -1)
+        return s / c
+
+    @staticmethod
+    def arcsin(variable):
+        """Returns the arcsine of `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.arcsin(variable)
+        if np.any(np.logical_or(variable.var > 1, variable.var < -1)):
+            raise ValueError('Please input -1 <= x <=1')
+        # w' = u' / sqrt(1 - u^2)
+        u = variable._truncated()
+        return variable._integrate(np.arcsin(variable.var), (variable._derivative() / (1 - u * u) ** 0.5).coef)
+
+    @staticmethod
+    def arccos(variable):
+        """Returns the arccosine of `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.arccos(variable)
+        if np.any(np.logical_or(variable.var > 1, variable.var < -1)):
+            raise ValueError('Please input -1 <= x <=1')
+        u = variable._truncated()
+        return variable._integrate(np.arccos(variable.var), -(variable._derivative() / (1 - u * u) ** 0.5).coef)
+
+    @staticmethod
+    def arctan(variable):
+        """Returns the arctangent of `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.arctan(variable)
+        # w' = u' / (1 + u^2)
+        u = variable._truncated()
+        return variable._integrate(np.arctan(variable.var), (variable._derivative() / (1 + u * u)).coef)
+
+    @staticmethod
+    def sinh(variable):
+        """Returns the hyperbolic sine of `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.sinh(variable)
+        return Taylor_Variable._sin_cos(variable, 1)[0]
+
+    @staticmethod
+    def cosh(variable):
+        """Returns the hyperbolic cosine of `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.cosh(variable)
+        return Taylor_Variable._sin_cos(variable, 1)[1]
+
+    @staticmethod
+    def tanh(variable):
+        """Returns the hyperbolic tangent of `variable` (Taylor_Variable object/int/float)."""
+        if not isinstance(variable, Taylor_Variable):
+            return np.tanh(variable)
+        s, c = Taylor_Variable._sin_cos(variable, 1)
+        return s / c
+
+    def __repr__(self):
+        return 'Value: ' + str(self.var) + ' , Coef: ' + str(self.coef)
+
+    def __str__(self):
+        return self.__repr__()
@@ -0,0 +1,153 @@
+import numpy as np
+
+from .compiler import compile_cache
+
+# the points evaluated together in one vectorized pass
+CHUNK = 4096
+
+# the end of an iterator of points, which cannot be mistaken for a point
+_END = object()
+
+
+def _points_error(e, start, stop):
+    """Returns a ValueError for the exception `e` raised by the points start + 1 to stop (counted from 1)."""
+    return ValueError('Points ' + str(start + 1) + ' to ' + str(stop) + ': ' + type(e).__name__ + ': ' + str(e))
+
+
+def stream(fct, points, var_names = None, chunk = CHUNK, seed = None):
+    """Evaluate the functions and their Jacobians lazily over an iterator of points, one chunk at a time.
+     INPUTS
+     =======
+     fct: list of str, the functions
+     points: iterable of points, each a dict (variable name: value) or a sequence of values in the
+        order of `var_names`. It is consumed as the results are requested, and can be endless
+     var_names: list of str, the variable names (default the keys of the first point)
+     chunk: int, the number of points evaluated together
+     seed: dict, variable name: seed (default 1 for every variable)
+
+     RETURNS
+     ========
+     output: generator of (values, jacobian) per chunk, of shapes (n, num_fct) and (n, num_fct, num_var)
+        with n = chunk, except maybe for the last one
+
+     NOTES
+     =====
+     The functions are compiled once. Each chunk is gathered into one array of points and evaluated
+     in one vectorized forward pass, so only one chunk of points and its results are held at a time.
+     An error in the evaluation of a chunk is raised as a ValueError with the positions of its points
+     (counted from 1), from the original exception.
+
+     EXAMPLES
+     =========
+     >>> points = ({'x': i / 10, 'y': 2.} for i in range(10000))
+     >>> for values, jacobian in stream(['x * y', 'sin(x)'], points, chunk=4096):
+     ...     print(values.shape, jacobian.shape)
+     (4096, 2) (4096, 2, 2)
+     (4096, 2) (4096, 2, 2)
+     (1808, 2) (1808, 2, 2)
+    """
+    if not isinstance(chunk, int) or chunk < 1:
+        raise ValueError('The chunk size should be a positive integer.')
+    points = iter(points)
+    first = next(points, _END)
+    if first is _END:
+        return
+    if var_names is None:
+        if not isinstance(first, dict):
+            raise ValueError('The variable names are needed for points that are not dictionaries.')
+        var_names = list(first.keys())
+    compiled = compile_cache.get(fct, var_names)
+    num_var = len(var_names)
+
+    # the rows of a chunk are gathered in a list, which is faster to fill than an array
+    rows = []
+    size = 0
+    point = first
+    while point is not _END:
+        if isinstance(point, dict):
+            try:
+                rows.append([point[name] for name in var_names])
+            except KeyError as e:
+                raise KeyError('Missing value for variable ' + str(e))
+        else:
+            if np.ndim(point) != 1 or len(point) != num_var:
+                raise ValueError('Expected ' + str(num_var) + ' variable values.')
+            rows.append(point)
+        point = next(points, _END)
+        if len(rows) == chunk or point is _END:
+            try:
+                values, jacobian = compiled(list(np.array(rows, dtype=float).reshape(-1, num_var).T), seed)
+            except Exception as e:
+                raise _points_error(e, size, size + len(rows)) from e
+            size += len(rows)
+            rows = []
+            yield values, jacobian
+
+
+def _output(out, shape):
+    """Returns an output array: `out` itself, or a new .npy file of that shape mapped in memory if it is a path."""
+    if isinstance(out, str):
+        return np.lib.format.open_memmap(out, mode='w+', dtype=float, shape=shape)
+    if out.shape != shape:
+        raise ValueError('Expected an output array of shape ' + str(shape) + '.')
+    return out
+
+
+def batch_evaluate(fct, points, var_names, out = None, chunk = CHUNK, seed = None):
+    """Evaluate the functions and their Jacobians at an array of points, chunk by chunk, into output arrays.
+     INPUTS
+     =======
+     fct: list of str, the functions
+     points: array of shape (N, num_var), e.g. an np.memmap, or the path of a .npy file (mapped in memory)
+     var_names: list of str, the variable of each column of `points`
+     out: (values, jacobian), the output arrays of shapes (N, num_fct) and (N, num_fct, num_var), e.g.
+        np.memmap objects, or the paths of the .npy files to create (default new arrays in memory)
+     chunk: int, the number of points evaluated together
+     seed: dict, variable name: seed (default 1 for every variable)
+
+     RETURNS
+     ========
+     values: the values array of `out`
+     jacobian: the Jacobian array of `out`
+
+     NOTES
+     =====
+     Each chunk of points is read from `points`, evaluated in one vectorized forward pass and
+     written in place into the outputs before the next one is read, so with memory-mapped inputs
+     and outputs only one chunk is in memory, whatever the number of points. Memory-mapped outputs
+     are flushed to their files at the end. An error in a chunk is raised as in stream.
+
+     EXAMPLES
+     =========
+     >>> np.save('points.npy', np.random.rand(10 ** 7, 2))
+     >>> values, jacobian = batch_evaluate(['x * y', 'sin(x)'], 'points.npy', ['x', 'y'],
+     ...     out=('values.npy', 'jacobian.npy'))
+     >>> jacobian.shape
+     (10000000, 2, 2)
+    """
+    if not isinstance(chunk, int) or chunk < 1:
+        raise ValueError('The chunk size should be a positive integer.')
+    if isinstance(points, str):
+        points = np.load(points, mmap_mode='r')
+    num_var, num_fct = len(var_names), len(fct)
+    if np.ndim(points) != 2 or points.shape[1] != num_var:
+        raise ValueError('Expected an array of points of shape (N, ' + str(num_var) + ').')
+    compiled = compile_cache.get(fct, var_names)
+
+    num_points = points.shape[0]
+    if out is None:
+        out = (np.empty((num_points, num_fct)), np.empty((num_points, num_fct, num_var)))
+    values = _output(out[0], (num_points, num_fct))
+    jacobian = _output(out[1], (num_points, num_fct, num_var))
+
+    for start in range(0, num_points, chunk):
+        stop = min(num_points, start + chunk)
+        block = np.asarray(points[start:stop], dtype=float)
+        try:
+            values[start:stop], jacobian[start:stop] = compiled(list(block.T), seed)
+        except Exception as e:
+            raise _points_error(e, start, stop) from e
+    for array in (values, jacobian):
+        if isinstance(array, np.memmap):
+            array.flush()
+    return values, jacobian
@@ -0,0 +1,107 @@
+import sys
+import time
+import tracemalloc
+import numpy as np
+from .apollo_ad import Variable, Reverse_Mode
+
+
+class _Dict_Node:
+    """A node with a per-instance __dict__, the layout Variable and Reverse_Mode had before __slots__."""
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+def _object_size(node):
+    """Returns the bytes of an object, including its __dict__ if it has one."""
+    size = sys.getsizeof(node)
+    if hasattr(node, '__dict__'):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+
+def _timeit(fct, number):
+    """Returns the seconds taken by calling fct number times."""
+    start = time.perf_counter()
+    for _ in range(number):
+        fct()
+    return time.perf_counter() - start
+
+
+def _chain(cls, n):
+    """Builds n steps of f = sin(f * x + 0.1) and keeps every intermediate node alive."""
+    if cls is Variable:
+        x = Variable(0.5, np.array([1., 0.]))
+        sin = Variable.sin
+    else:
+        x = Reverse_Mode(0.5)
+        sin = Reverse_Mode.sin
+    f = x
+    nodes = []
+    for _ in range(n):
+        f = sin(f * x + 0.1)
+        nodes.append(f)
+    return nodes
+
+
+def benchmark(n = 100000, verbose = True):
+    """Compares the per-object size and the construction cost of the slotted Variable and Reverse_Mode
+        objects, and measures the time and the memory to build a graph of 3 * n operations.
+
+     INPUTS
+     =======
+     n: int, the number of steps of the chain f = sin(f * x + 0.1)
+     verbose: bool, whether to print the report
+
+     RETURNS
+     ========
+     output: dictionary with the measured bytes, seconds and MB
+
+     EXAMPLES
+     =========
+     >>> from apollo_ad.benchmark import benchmark
+     >>> report = benchmark(100000)
+     ---- Object size (bytes) ----
+     Variable: 48 (with __dict__: 152)
+     ...
+    """
+    der = np.array([1., 0.])
+    report = {}
+
+    report['Variable bytes'] = _object_size(Variable(0.5, der))
+    report['Variable __dict__ bytes'] = _object_size(_Dict_Node(var = 0.5, der = der))
+    report['Reverse_Mode bytes'] = _object_size(Reverse_Mode(0.5))
+    report['Reverse_Mode __dict__ bytes'] = _object_size(_Dict_Node(var = 0.5, child = [], der = None))
+
+    number = max(n, 1)
+    report['Variable() seconds'] = _timeit(lambda: Variable(0.5, [1., 0.]), number)
+    report['Variable._new() seconds'] = _timeit(lambda: Variable._new(0.5, der), number)
+    report['Reverse_Mode() seconds'] = _timeit(lambda: Reverse_Mode(0.5), number)
+    report['Reverse_Mode._new() seconds'] = _timeit(lambda: Reverse_Mode._new(0.5), number)
+
+    for cls in [Variable, Reverse_Mode]:
+        name = cls.__name__
+        start = time.perf_counter()
+        nodes = _chain(cls, n)
+        report[name + ' graph seconds'] = time.perf_counter() - start
+        del nodes
+        tracemalloc.start()
+        nodes = _chain(cls, n)
+        report[name + ' graph MB'] = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        del nodes
+
+    if verbose:
+        print('---- Object size (bytes) ----')
+        for name in ['Variable', 'Reverse_Mode']:
+            print(name + ': ' + str(report[name + ' bytes']) + ' (with __dict__: ' + str(report[name + ' __dict__ bytes']) + ')')
+        print('---- Construction of ' + str(number) + ' objects (seconds) ----')
+        for name in ['Variable', 'Reverse_Mode']:
+            print(name + '(): %.3f, ' % report[name + '() seconds'] + name + '._new(): %.3f' % report[name + '._new() seconds'])
+        print('---- Graph of ' + str(3 * n) + ' operations ----')
+        for name in ['Variable', 'Reverse_Mode']:
+            print(name + ': %.3f seconds, %.1f MB' % (report[name + ' graph seconds'], report[name + ' graph MB']))
+    return report
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,215 @@
+import numpy as np
+
+from .apollo_ad import Reverse_Mode
+from .compiler import compile_cache, _pullback
+from .cost import Cost_Model, NODE_BYTES, FLOAT_BYTES
+
+# bytes of a stored state besides its floats: the list and the entry of the schedule, and each value
+# (a float object, or an array header for N points)
+CHECKPOINT_BYTES = 120
+VALUE_BYTES = 24
+ARRAY_BYTES = 120
+
+def _split(n, free):
+    """Returns the length of the first part of n steps in the binomial (revolve) schedule with `free` checkpoints.
+     INPUTS
+     =======
+     n: int, the number of steps of the segment, at least 2
+     free: int, the number of free checkpoints, at least 1
+
+     RETURNS
+     ========
+     output: int, between 1 and n - 1
+
+     NOTES
+     =====
+     With s checkpoints and each step advanced at most t times, at most beta(s, t) = C(s + t, s) steps
+     can be reversed, and beta(s, t) = beta(s - 1, t) + beta(s, t - 1): after a checkpoint, the last
+     part has one checkpoint less and the first part one repetition less.
+    """
+    def beta(t):
+        # C(free + t, free) = prod_{i=1..free} (t + i) / i, exact in integers (math.comb is Python 3.8+)
+        out = 1
+        for i in range(1, free + 1):
+            out = out * (t + i) // i
+        return out
+
+    t = 1
+    while beta(t) < n:
+        t += 1
+    return max(1, min(beta(t - 1), n - 1))
+
+
+class Checkpointed:
+    def __init__(self, var, step, steps, fct = None, budget = None):
+        """Differentiate an iterative computation in reverse mode within a memory budget.
+         INPUTS
+         =======
+         self: Checkpointed object
+         var: dict, state variable name: initial value (or an array with the values at N points)
+         step: list of str, the next value of each state variable, in the order of `var`, e.g.
+            ['x + 0.1 * y', 'y - 0.1 * sin(x)']. A parameter is a state variable that stays the same ('a')
+         steps: int, the number of times `step` is applied
+         fct: list of str, the functions of the final state to differentiate (default the final state)
+         budget: int, the memory budget of the tape and the checkpoints in bytes (default no limit)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Without a budget (or if it holds the whole tape), every step is recorded in one Reverse_Mode
+         graph and swept once. Otherwise the graph of a single step is recorded at a time, and the
+         states stored in the remaining budget are placed by the binomial (revolve) schedule: a segment
+         is advanced without recording up to a checkpoint, the part after it is reversed first, and the
+         part before it afterwards. Each step is reversed with a cotangent per function of `fct`.
+
+         `var` holds the values of `fct` and `der` their gradients with respect to the initial state, as
+         in Reverse. `checkpoints` is the number of stored states, `recomputed` the number of steps
+         advanced again, `overhead` the evaluated steps per step (1 for the whole tape), and `memory`
+         and `tape_memory` the predicted bytes with the checkpoints and with the whole tape.
+
+         EXAMPLES
+         =========
+         z = Checkpointed({'x': 1., 'y': 0.}, ['x + 0.01 * y', 'y - 0.01 * sin(x)'], 10000,
+             ['x'], budget=100000)
+         z.checkpoints, z.overhead, z.tape_memory / z.memory
+         (534, 3.0, 157.1)
+        """
+        check = [1 if isinstance(i, str) else 0 for i in step]
+        if len(check) != sum(check):
+            raise TypeError('Each function should be a string!')
+        if not isinstance(var, dict):
+            raise TypeError('The variable should be a dictionary!')
+        if len(step) != len(var):
+            raise ValueError('Expected one step function per state variable (' + str(len(var)) + ').')
+        if not isinstance(steps, int) or steps < 1:
+            raise ValueError('The number of steps should be a positive integer.')
+
+        names = list(var.keys())
+        self._step = compile_cache.get(step, names)
+        self._fct = compile_cache.get(names if fct is None else fct, names)
+        state = self._step.point(var)
+        # () for a single point, (N,) for N points
+        self._shape = np.shape(state[0]) if state else ()
+        num_points = self._shape[0] if self._shape else 1
+        num_fct = len(self._fct.fct)
+
+        # a recorded step holds its graph with adjoints of one entry per function, a checkpoint one state
+        step_tape = Cost_Model(self._step.expression, len(names), num_points).graph_nodes * \
+            (NODE_BYTES + (2 + num_fct) * num_points * FLOAT_BYTES)
+        state_bytes = CHECKPOINT_BYTES + len(names) * ((ARRAY_BYTES if self._shape else VALUE_BYTES) +
+            num_points * FLOAT_BYTES)
+        self.tape_memory = steps * step_tape
+        self.evaluations = 0
+
+        if budget is None or self.tape_memory <= budget:
+            self.checkpoints = 0
+            self.memory = self.tape_memory
+            self.var, U = self._taped(state, steps)
+        else:
+            if budget < step_tape:
+                raise ValueError('The memory budget is too small for the tape of one step (' + str(step_tape) +
+                    ' bytes).')
+            self.checkpoints = int(min((budget - step_tape) // state_bytes, steps - 1))
+            self.memory = step_tape + self.checkpoints * state_bytes
+            U = self._reverse(state, steps, self.checkpoints)
+
+        self.recomputed = self.evaluations - steps
+        self.overhead = self.evaluations / steps
+        self.der = U if not self._shape else np.moveaxis(U, 0, 1)
+
+    def _advance(self, state, steps):
+        """Apply the step `steps` times without recording, returns the new state."""
+        expression = self._step.expression
+        for _ in range(steps):
+            # plain values: the elementary functions are the numpy functions of the same name
+            state = expression.evaluate(state, np)
+        self.evaluations += steps
+        return state
+
+    def _pullback(self, state, U):
+        """Record one step from `state` and sweep it with the cotangents U, returns U J of that step.
+            U is None for the last step: the cotangents are then the gradients of `fct` at the final state."""
+        if U is None:
+            self.var, jacobian = self._fct(self._advance(state, 1))
+            # one cotangent per function, the points after it
+            U = np.moveaxis(jacobian, -2, 0)
+        inputs = [Reverse_Mode(value) for value in state]
+        outputs = self._step.expression.evaluate(inputs, Reverse_Mode)
+        self.evaluations += 1
+        return _pullback(inputs, outputs, U, self._shape)
+
+    def _reverse(self, state, steps, free):
+        """Propagate the cotangents of the final state back through the steps with `free` checkpoints.
+         INPUTS
+         =======
+         self: Checkpointed object
+         state: list, the initial state
+         steps: int, the number of steps
+         free: int, the number of checkpoints
+
+         RETURNS
+         ========
+         output: the cotangents with respect to the initial state
+
+         NOTES
+         =====
+         The segments still to reverse are kept on a stack, the last one on top, with the state at
+         their start. A segment with free checkpoints is split at the checkpoint of the binomial
+         schedule. The stack holds at most `free` checkpoints besides the initial state.
+        """
+        U = None
+        stack = [(state, steps, free)]
+        while stack:
+            state, n, free = stack.pop()
+            if free == 0 or n == 1:
+                # no checkpoint left: advance from the start to every step
+                for i in range(n - 1, -1, -1):
+                    U = self._pullback(self._advance(state, i), U)
+                continue
+            m = _split(n, free)
+            stack.append((state, m, free))
+            stack.append((self._advance(state, m), n - m, free - 1))
+        return U
+
+    def _taped(self, state, steps):
+        """Record every step in one graph and sweep it once from each function of the final state."""
+        inputs = [Reverse_Mode(value) for value in state]
+        state = inputs
+        for _ in range(steps):
+            state = self._step.expression.evaluate(state, Reverse_Mode)
+        self.evaluations += steps
+        outputs = self._fct.expression.evaluate(state, Reverse_Mode)
+        values = np.stack([np.broadcast_to(getattr(i, 'var', i), self._shape) for i in outputs], axis=-1)
+        return values, _pullback(inputs, outputs, np.eye(len(outputs)), self._shape)
+
+    def explain(self):
+        """Report the checkpoints, the recomputation and the memory.
+         INPUTS
+         =======
+         self: Checkpointed object
+
+         RETURNS
+         ========
+         output: str
+        """
+        output_string = '-- Checkpointing -- \n'
+        output_string = output_string + 'Checkpoints: ' + str(self.checkpoints) + ', recomputed steps: ' + \
+            str(self.recomputed) + ', evaluations per step: %.2f\n' % self.overhead
+        output_string = output_string + 'Memory: %.1f kB (whole tape: %.1f kB)\n' % (self.memory / 1e3,
+            self.tape_memory / 1e3)
+        return output_string
+
+    def __repr__(self):
+        output_string = '-- Values -- \n'
+        for fct_idx in range(self.var.shape[-1]):
+            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.var[..., fct_idx]) + '\n'
+
+        output_string = output_string + '-- Gradients -- \n'
+        for fct_idx in range(self.der.shape[-2]):
+            output_string = output_string + 'Function F' + str(fct_idx + 1) + ': ' + str(self.der[..., fct_idx, :]) + '\n'
+        return output_string + self.explain()
+
+    def __str__(self):
+        return self.__repr__()
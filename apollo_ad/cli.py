@@ -0,0 +1,248 @@
+"""Evaluate functions and their Jacobians over a stream of points, without prompts.
+
+    apollo_ad --spec job.json --input points.csv --output results.jsonl
+    cat points.jsonl | apollo_ad --spec job.json --input-format jsonl --output-format csv
+    apollo_ad -f 'x * y' -f 'sin(x)' -v x,y --input points.csv --output results --output-format npy
+
+The job spec is a JSON object {"variables": ["x", "y"], "functions": ["x * y"], "seed": {"x": 1, "y": 1}}
+(seed optional). "variables" can also map each name to a default value, used for the points that
+do not give it.
+"""
+import io
+import sys
+import csv
+import json
+import struct
+import argparse
+import numpy as np
+
+from .batch import stream, CHUNK as BATCH
+
+# bytes reserved for the header of a streamed .npy file, whose shape is only known at the end
+NPY_HEADER = 128
+
+
+def read_spec(spec):
+    """Read a job spec.
+     INPUTS
+     =======
+     spec: dict, with "variables" (a list of names, or name: default value), "functions" (a list of
+        strings) and optionally "seed" (name: seed)
+
+     RETURNS
+     ========
+     var_names: list of str
+     defaults: dict, name: default value of the variables that have one
+     fct: list of str
+     seed: dict or None
+    """
+    if not isinstance(spec, dict) or 'variables' not in spec or 'functions' not in spec:
+        raise ValueError('The job spec should have "variables" and "functions".')
+    variables = spec['variables']
+    if isinstance(variables, dict):
+        var_names = list(variables.keys())
+        defaults = dict((name, value) for name, value in variables.items() if value is not None)
+    else:
+        var_names = list(variables)
+        defaults = {}
+    fct = spec['functions']
+    check = [1 if isinstance(i, str) else 0 for i in fct]
+    if len(check) != sum(check):
+        raise TypeError('Each function should be a string!')
+    return var_names, defaults, fct, spec.get('seed')
+
+
+def read_points(source, fmt, var_names, defaults):
+    """Read the points incrementally.
+     INPUTS
+     =======
+     source: text file, the points
+     fmt: str, 'csv' (with a header row of variable names) or 'jsonl' (one object per line)
+     var_names: list of str, the order of the columns
+     defaults: dict, name: value of the variables that may be missing
+
+     RETURNS
+     ========
+     output: generator of lists with the value of each variable, one per point, read as they are requested
+    """
+    if fmt == 'csv':
+        rows = csv.reader(source)
+        header = [name.strip() for name in next(rows, [])]
+        missing = [name for name in var_names if name not in header and name not in defaults]
+        if missing:
+            raise ValueError('Missing column for variable ' + ', '.join(missing))
+        columns = [header.index(name) if name in header else None for name in var_names]
+
+        def point(row):
+            if len(row) != len(header):
+                raise ValueError('Line ' + str(rows.line_num) + ': expected ' + str(len(header)) + ' values, got ' +
+                                 str(len(row)) + '.')
+            return [float(row[col]) if col is not None else float(defaults[name])
+                    for name, col in zip(var_names, columns)]
+        return (point(row) for row in rows if row)
+    elif fmt == 'jsonl':
+        def point(num, line):
+            values = json.loads(line)
+            if not isinstance(values, dict):
+                raise ValueError('Line ' + str(num) + ': expected a JSON object of variable values.')
+            try:
+                return [float(values[name]) if name in values else float(defaults[name]) for name in var_names]
+            except KeyError as e:
+                raise KeyError('Missing value for variable ' + str(e))
+        return (point(num, line) for num, line in enumerate(source, 1) if line.strip())
+    raise ValueError("The input format should be 'csv' or 'jsonl'.")
+
+
+class _CSV_Writer:
+    def __init__(self, output, fct, var_names):
+        self.output = output
+        self.writer = csv.writer(output, lineterminator='\n')
+        self.writer.writerow(['F' + str(i + 1) for i in range(len(fct))] +
+                             ['dF' + str(i + 1) + '/d' + name for i in range(len(fct)) for name in var_names])
+
+    def write(self, values, jacobian):
+        self.writer.writerows(np.concatenate((values, jacobian.reshape(values.shape[0], -1)), axis=1).tolist())
+
+    def close(self):
+        self.output.flush()
+
+
+class _JSONL_Writer:
+    def __init__(self, output, fct, var_names):
+        self.output = output
+
+    def write(self, values, jacobian):
+        self.output.write(''.join(json.dumps({'var': v, 'der': d}) + '\n'
+                                  for v, d in zip(values.tolist(), jacobian.tolist())))
+
+    def close(self):
+        self.output.flush()
+
+
+def _npy_header(shape):
+    """Returns a .npy (version 1.0) header of NPY_HEADER bytes for a float array of this shape."""
+    header = repr({'descr': '<f8', 'fortran_order': False, 'shape': tuple(shape)})
+    # magic string, version and header length, then the header padded with spaces up to a newline
+    header = header + ' ' * (NPY_HEADER - 10 - len(header) - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+class _NPY_Writer:
+    def __init__(self, prefix, fct, var_names):
+        """Stream the values and the Jacobians to <prefix>_values.npy and <prefix>_jacobian.npy."""
+        self.files = [open(prefix + '_values.npy', 'wb'), open(prefix + '_jacobian.npy', 'wb')]
+        self.shapes = [(len(fct),), (len(fct), len(var_names))]
+        self.size = 0
+        for f, shape in zip(self.files, self.shapes):
+            f.write(_npy_header((0,) + shape))
+
+    def write(self, values, jacobian):
+        for f, array in zip(self.files, (values, jacobian)):
+            f.write(np.ascontiguousarray(array, dtype='<f8').tobytes())
+        self.size += values.shape[0]
+
+    def close(self):
+        # the number of points is only known now
+        for f, shape in zip(self.files, self.shapes):
+            f.seek(0)
+            f.write(_npy_header((self.size,) + shape))
+            f.close()
+
+
+def run(spec, source, target, input_format = 'csv', output_format = 'jsonl', batch = BATCH):
+    """Evaluate a job over a stream of points.
+     INPUTS
+     =======
+     spec: dict, the job spec (see read_spec)
+     source: text file, the points
+     target: text file for 'csv' and 'jsonl', the path prefix of the two .npy files for 'npy'
+     input_format: str, 'csv' or 'jsonl'
+     output_format: str, 'csv', 'jsonl' or 'npy'
+     batch: int, the number of points evaluated together
+
+     RETURNS
+     ========
+     output: int, the number of points
+
+     NOTES
+     =====
+     The points are read, evaluated in one forward pass (see batch.stream) and written one chunk of
+     `batch` points at a time, so the memory does not grow with the number of points.
+    """
+    var_names, defaults, fct, seed = read_spec(spec)
+    writers = {'csv': _CSV_Writer, 'jsonl': _JSONL_Writer, 'npy': _NPY_Writer}
+    if output_format not in writers:
+        raise ValueError("The output format should be 'csv', 'jsonl' or 'npy'.")
+    # checked before the writer creates its output
+    if not isinstance(batch, int) or batch < 1:
+        raise ValueError('The batch size should be a positive integer.')
+    points = read_points(source, input_format, var_names, defaults)
+
+    writer = writers[output_format](target, fct, var_names)
+    size = 0
+    try:
+        for values, jacobian in stream(fct, points, var_names, batch, seed):
+            writer.write(values, jacobian)
+            size += values.shape[0]
+    finally:
+        writer.close()
+    return size
+
+
+def _format(path, fmt, default):
+    """The format given, or the one of the file extension."""
+    if fmt is not None:
+        return fmt
+    for ext in ('csv', 'jsonl', 'npy'):
+        if path is not None and path.endswith('.' + ext):
+            return ext
+    return default
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog='apollo_ad',
+                                     description='Evaluate functions and their Jacobians over a stream of points.')
+    parser.add_argument('--spec', help='a JSON job spec with "variables", "functions" and "seed"')
+    parser.add_argument('-f', '--function', action='append', help='a function (repeat for several), instead of --spec')
+    parser.add_argument('-v', '--variables', help='the comma-separated variable names, instead of --spec')
+    parser.add_argument('-i', '--input', default='-', help='the file of points (default stdin)')
+    parser.add_argument('-o', '--output', default='-', help='the output file (default stdout), the path prefix for npy')
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], help='default from the extension, else csv')
+    parser.add_argument('--output-format', choices=['csv', 'jsonl', 'npy'], help='default from the extension, else jsonl')
+    parser.add_argument('-b', '--batch', type=int, default=BATCH, help='the points per batch (default %d)' % BATCH)
+    args = parser.parse_args(argv)
+
+    if args.spec is None and not (args.function and args.variables):
+        parser.error('give a job spec (--spec) or the functions (-f) and the variables (-v)')
+    input_format = _format(args.input if args.input != '-' else None, args.input_format, 'csv')
+    output_format = _format(args.output if args.output != '-' else None, args.output_format, 'jsonl')
+    if output_format == 'npy' and args.output == '-':
+        parser.error('the npy output needs a file path prefix (--output)')
+
+    source = target = None
+    try:
+        # a missing file or a malformed function is reported like any other error of the job
+        if args.spec is not None:
+            with open(args.spec) as f:
+                spec = json.load(f)
+        else:
+            spec = {'variables': [name.strip() for name in args.variables.split(',')], 'functions': args.function}
+        source = sys.stdin if args.input == '-' else open(args.input, newline='')
+        if output_format == 'npy':
+            target = args.output[:-len('.npy')] if args.output.endswith('.npy') else args.output
+        else:
+            target = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+        run(spec, source, target, input_format, output_format, args.batch)
+    except (ValueError, TypeError, KeyError, IndexError, NameError, ArithmeticError, SyntaxError, OSError) as e:
+        sys.stderr.write('apollo_ad: ' + str(e) + '\n')
+        return 1
+    finally:
+        if source is not None and source is not sys.stdin:
+            source.close()
+        if isinstance(target, io.IOBase) and target is not sys.stdout:
+            target.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,986 @@
+import ast
+import operator
+import threading
+import numpy as np
+from collections import OrderedDict
+
+from .apollo_ad import Variable, Reverse_Mode, Hyper_Dual, Taylor_Variable
+from .sparse import Sparse_Tangent, Sparse_Jacobian
+from .sparsity import Sparsity_Pattern, _num_colors
+
+
+# elementary functions that can be called inside a function string
+static_methods = ['log', 'sqrt', 'exp', 'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh']
+
+# numpy constants that can be used inside a function string, e.g. 'np.pi * x'
+constants = {'pi': np.pi, 'e': np.e}
+
+# from this number of variables on, a single point is differentiated with sparse derivative vectors
+SPARSE_THRESHOLD = 1000
+
+_binary_ops = {ast.Add: 'add', ast.Sub: 'sub', ast.Mult: 'mul', ast.Div: 'truediv', ast.Pow: 'pow'}
+_binary_fcts = {'add': operator.add, 'sub': operator.sub, 'mul': operator.mul,
+                'truediv': operator.truediv, 'pow': operator.pow}
+_unary_fcts = {'neg': operator.neg, 'abs': abs}
+_symbols = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.Pow: '**'}
+
+
+class Expression:
+    def __init__(self, fct, var2idx):
+        """Parse a list of function strings once into one shared graph of nodes.
+         INPUTS
+         =======
+         self: Expression object
+         fct: str/list of str, the functions, e.g. ['cos(x) + y ** 2', 'sqrt(x)/3']
+         var2idx: dict, variable name: index of the variable
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Each node is a tuple (op, a, b). `op` is 'var' (a is the variable index), 'const'
+         (a is the value), a binary operator (a and b are node indices) or a unary operator /
+         elementary function (a is the node index). Nodes are stored in evaluation order and
+         `roots` holds the node of each function.
+
+         Identical subexpressions are only stored once, also across functions (the operands
+         of + and * are ordered, so 'x * y' and 'y * x' are the same node). Evaluating the
+         graph therefore computes each distinct subexpression exactly once.
+
+         EXAMPLES
+         =========
+         >>> e = Expression(['x * y', 'y * x + 1'], {'x': 0, 'y': 1})
+         >>> e.nodes
+         [('var', 0, None), ('var', 1, None), ('mul', 0, 1), ('const', 1, None), ('add', 2, 3)]
+         >>> e.roots
+         [2, 4]
+        """
+        if isinstance(fct, str):
+            fct = [fct]
+        self.fct = list(fct)
+        self.var2idx = var2idx
+        self.nodes = []
+        self._memo = {}
+        self._cones = {}
+        self._reach = None
+        self.roots = []
+        for function in self.fct:
+            if not isinstance(function, str):
+                raise TypeError('Each function should be a string!')
+            self._fct = function
+            self.roots.append(self._build(ast.parse(function.strip(), mode='eval').body))
+
+    def _add(self, op, a, b=None):
+        if op in ('add', 'mul') and b < a:
+            a, b = b, a
+        key = (op, a, b) if op != 'const' else (op, a, type(a))
+        idx = self._memo.get(key)
+        if idx is None:
+            self.nodes.append((op, a, b))
+            idx = self._memo[key] = len(self.nodes) - 1
+        return idx
+
+    def _build(self, node):
+        if isinstance(node, ast.BinOp):
+            op = _binary_ops.get(type(node.op))
+            if op is None:
+                raise ValueError('Unsupported operator in function ' + repr(self._fct))
+            return self._add(op, self._build(node.left), self._build(node.right))
+
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.USub):
+                return self._add('neg', self._build(node.operand))
+            if isinstance(node.op, ast.UAdd):
+                return self._build(node.operand)
+            raise ValueError('Unsupported operator in function ' + repr(self._fct))
+
+        if isinstance(node, ast.Call):
+            name = node.func.id if isinstance(node.func, ast.Name) else None
+            if (name not in static_methods and name != 'abs') or len(node.args) != 1 or node.keywords:
+                raise ValueError('Unsupported function call in function ' + repr(self._fct))
+            return self._add(name, self._build(node.args[0]))
+
+        if isinstance(node, ast.Name):
+            if node.id not in self.var2idx:
+                raise NameError("name '" + node.id + "' is not defined")
+            return self._add('var', self.var2idx[node.id])
+
+        if isinstance(node, ast.Attribute):
+            if isinstance(node.value, ast.Name) and node.value.id == 'np' and node.attr in constants:
+                return self._add('const', constants[node.attr])
+            raise ValueError('Unsupported attribute in function ' + repr(self._fct))
+
+        value = _constant(node)
+        if value is None:
+            raise ValueError('Unsupported expression in function ' + repr(self._fct))
+        return self._add('const', value)
+
+    def cone(self, output):
+        """The nodes a function depends on, in evaluation order.
+         INPUTS
+         =======
+         self: Expression object
+         output: int, the index of the function
+
+         RETURNS
+         ========
+         output: list of node indices
+        """
+        if output not in self._cones:
+            seen = set()
+            stack = [self.roots[output]]
+            while stack:
+                idx = stack.pop()
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                op, a, b = self.nodes[idx]
+                if op in _binary_fcts:
+                    stack.extend((a, b))
+                elif op not in ('var', 'const'):
+                    stack.append(a)
+            self._cones[output] = sorted(seen)
+        return self._cones[output]
+
+    def reach(self):
+        """The variables each node depends on.
+         INPUTS
+         =======
+         self: Expression object
+
+         RETURNS
+         ========
+         output: list with a frozenset of variable indices per node
+
+         EXAMPLES
+         =========
+         >>> e = Expression(['x * y', 'sin(x) + 1'], {'x': 0, 'y': 1})
+         >>> [sorted(i) for i in e.reach()]
+         [[0], [1], [0, 1], [0], [], [0]]
+        """
+        if self._reach is None:
+            reach = []
+            for op, a, b in self.nodes:
+                if op == 'var':
+                    reach.append(frozenset([a]))
+                elif op == 'const':
+                    reach.append(frozenset())
+                elif op in _binary_fcts:
+                    reach.append(reach[a] | reach[b])
+                else:
+                    reach.append(reach[a])
+            self._reach = reach
+        return self._reach
+
+    def evaluate(self, leaves, cls, outputs=None):
+        """Evaluate the functions with the given leaves.
+         INPUTS
+         =======
+         self: Expression object
+         leaves: list, one Variable/Reverse_Mode object per variable
+         cls: the class whose static methods are used for the elementary functions
+         outputs: list of int, only evaluate these functions (default all of them)
+
+         RETURNS
+         ========
+         output: list with the root of each function, a `cls` object (or a float for a
+            constant function)
+        """
+        if outputs is None:
+            order = range(len(self.nodes))
+            outputs = range(len(self.roots))
+        elif len(outputs) == 1:
+            order = self.cone(outputs[0])
+        else:
+            order = sorted(set().union(*[self.cone(i) for i in outputs]))
+        values = self._values(leaves, cls, order)
+        return [values[self.roots[i]] for i in outputs]
+
+    def _values(self, leaves, cls, order):
+        """Evaluate the nodes in `order` and return the value of each node, node index: value."""
+        nodes = self.nodes
+        values = {}
+        for idx in order:
+            op, a, b = nodes[idx]
+            if op == 'var':
+                values[idx] = leaves[a]
+            elif op == 'const':
+                values[idx] = a
+            elif op in _binary_fcts:
+                values[idx] = _binary_fcts[op](values[a], values[b])
+            elif op in _unary_fcts:
+                values[idx] = _unary_fcts[op](values[a])
+            else:
+                values[idx] = getattr(cls, op)(values[a])
+        return values
+
+
+def _constant(node):
+    # ast.Num is only produced by the parser before Python 3.8
+    if isinstance(node, ast.Constant):
+        value = node.value
+    elif hasattr(ast, 'Num') and isinstance(node, ast.Num):
+        value = node.n
+    else:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+# derivative of each elementary function f = op(a), written with the operators of Variable so that a
+# tangent carried by `a` and `f` also gives the tangent of the derivative
+_unary_partials = {
+    'neg': lambda a, f: -1.,
+    'abs': lambda a, f: Variable._new(np.sign(a.var), 0. * a.der),
+    'sqrt': lambda a, f: 0.5 / f,
+    'exp': lambda a, f: f,
+    'log': lambda a, f: 1. / a,
+    'sin': lambda a, f: Variable.cos(a),
+    'cos': lambda a, f: -Variable.sin(a),
+    'tan': lambda a, f: 1. + f * f,
+    'arcsin': lambda a, f: 1. / Variable.sqrt(1. - a * a),
+    'arccos': lambda a, f: -1. / Variable.sqrt(1. - a * a),
+    'arctan': lambda a, f: 1. / (1. + a * a),
+    'sinh': lambda a, f: Variable.cosh(a),
+    'cosh': lambda a, f: Variable.sinh(a),
+    'tanh': lambda a, f: 1. - f * f,
+}
+
+
+def _binary_partials(op, a, b, f, need_a, need_b):
+    """The derivatives of f = op(a, b) with respect to the operands that depend on a variable,
+        (None when not needed), written with the operators of Variable as in `_unary_partials`."""
+    if op == 'add':
+        return 1., 1.
+    if op == 'sub':
+        return 1., -1.
+    if op == 'mul':
+        return b, a
+    if op == 'truediv':
+        return (1. / b if need_a else None), (-f / b if need_b else None)
+    # pow
+    partial_a = partial_b = None
+    if need_a:
+        # a ** 0 would fail the domain check of Variable for a <= 0
+        partial_a = 1. if not need_b and b == 1 else b * a ** (b - 1)
+    if need_b:
+        # a numpy float has a `var` method that the operators of Variable would pick up
+        partial_b = f * Variable.log(a) if need_a else f * float(np.log(a))
+    return partial_a, partial_b
+
+
+def _pullback(inputs, outputs, U, shape):
+    """Sweep a recorded Reverse_Mode graph once from its outputs weighted by the rows of U.
+     INPUTS
+     =======
+     inputs: list of Reverse_Mode, the leaves of the graph
+     outputs: list of Reverse_Mode/float, the recorded outputs
+     U: array of shape (k, len(outputs)), the cotangents, or (k,) + shape + (len(outputs),) for one
+        cotangent per point
+     shape: tuple, () for a single point, (N,) for N points
+
+     RETURNS
+     ========
+     output: a Numpy array U J of shape (k,) + shape + (len(inputs),)
+
+     NOTES
+     =====
+     The outputs weighted by the columns of U are summed into one extra node whose value has
+     one entry per row of U, so every adjoint of the sweep is an array of k entries.
+    """
+    k = U.shape[0]
+    total = None
+    for idx, f1 in enumerate(outputs):
+        if isinstance(f1, Reverse_Mode):
+            # the cotangent column broadcasts against the N points. The node is linked by
+            # hand since an array operand has a `var` method that the operators would pick up
+            column = U[..., idx]
+            column = column.reshape(column.shape + (1,) * (1 + len(shape) - column.ndim))
+            term = Reverse_Mode._new(f1.var * column)
+            f1.child.append((column, term))
+            total = term if total is None else total + term
+    if total is not None:
+        total.der = 1.
+        Reverse_Mode.sweep(Reverse_Mode.graph(inputs))
+    # inputs that do not reach any output keep a gradient of 0
+    return np.stack([np.broadcast_to(0. if total is None else i.der, (k,) + shape) for i in inputs], axis=-1)
+
+
+class Compiled_Function:
+    def __init__(self, fct, var_names):
+        """Compile a list of function strings once so they can be evaluated at many points.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         fct: list of str, the functions
+         var_names: list of str, the variable names (the order of the Jacobian columns)
+
+         RETURNS
+         ========
+
+         EXAMPLES
+         =========
+         >>> f = Compiled_Function(['cos(x) + y ** 2', 'x * y'], ['x', 'y'])
+         >>> f({'x': 3, 'y': 4})
+         (array([15.01000750, 12.]), array([[-0.14112001, 8.], [4., 3.]]))
+        """
+        check = [1 if isinstance(i, str) else 0 for i in fct]
+        if len(check) != sum(check):
+            raise TypeError('Each function should be a string!')
+
+        self.fct = list(fct)
+        self.var_names = list(var_names)
+        self.var2idx = dict(zip(self.var_names, range(len(self.var_names))))
+        self.expression = Expression(self.fct, self.var2idx)
+        self._sparsity = None
+
+    def point(self, var):
+        """Order the variable values as `var_names`.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         var: dict/list/array, variable name: value, or the values in the order of `var_names`.
+            A value can also be an array with the variable at N points
+
+         RETURNS
+         ========
+         values: list of float, or list of arrays of shape (N,) if any value is an array
+        """
+        if isinstance(var, dict):
+            try:
+                values = [var[var_name] for var_name in self.var_names]
+            except KeyError as e:
+                raise KeyError('Missing value for variable ' + str(e))
+        else:
+            if len(var) != len(self.var_names):
+                raise ValueError('Expected ' + str(len(self.var_names)) + ' variable values.')
+            values = list(var)
+
+        if any(np.ndim(value) > 0 for value in values):
+            # a batch of points, scalars are repeated at every point
+            try:
+                values = np.broadcast_arrays(*[np.asarray(value, dtype=float) for value in values])
+            except ValueError:
+                raise ValueError('Every variable should have the same number of points.')
+            if values[0].ndim != 1:
+                raise ValueError('Expected one-dimensional arrays of points.')
+            return [np.array(value) for value in values]
+        return [float(value) for value in values]
+
+    def __call__(self, var, seed=None, sparse=None):
+        """Evaluate the functions and their Jacobian in forward mode.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         var: dict/list/array, the value of each variable
+         seed: dict, variable name: seed (default 1 for every variable)
+         sparse: bool, whether to carry sparse derivative vectors (only for a single point). By default
+            they are used from SPARSE_THRESHOLD variables on
+
+         RETURNS
+         ========
+         values: a Numpy array with the value of each function, of shape (N, num_fct) for N points
+         jacobian: a Numpy array with the gradient of each function, of shape (N, num_fct, num_var) for N points
+
+         EXAMPLES
+         =========
+         >>> f = Compiled_Function(['x * y'], ['x', 'y'])
+         >>> values, jacobian = f({'x': np.array([1., 2., 3.]), 'y': 4})
+         >>> values
+         array([[ 4.], [ 8.], [12.]])
+        """
+        num_var = len(self.var_names)
+        values = self.point(var)
+        if sparse is None:
+            sparse = num_var >= SPARSE_THRESHOLD and not np.ndim(values[0])
+        if sparse:
+            values, jacobian = self._sparse(values, seed)
+            return values, jacobian.toarray()
+
+        ders = []
+        for idx in range(num_var):
+            der_ = np.zeros((num_var,))
+            der_[idx] = 1. if seed is None else float(seed[self.var_names[idx]])
+            ders.append(der_)
+        return self._evaluate(values, ders, num_var)
+
+    def sparse_jacobian(self, var, seed=None):
+        """Evaluate the functions and their Jacobian in forward mode with sparse derivative vectors,
+            which only hold the variables each intermediate result depends on.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         var: dict/list/array, the value of each variable at a single point
+         seed: dict, variable name: seed (default 1 for every variable)
+
+         RETURNS
+         ========
+         values: a Numpy array with the value of each function
+         jacobian: Sparse_Jacobian, with COO (tocoo), CSR (tocsr) and dense (toarray) accessors
+
+         EXAMPLES
+         =========
+         >>> f = Compiled_Function(['x0 * x1', 'sin(x2)'], ['x0', 'x1', 'x2'])
+         >>> values, jacobian = f.sparse_jacobian([1, 2, 0])
+         >>> jacobian.tocoo()
+         (array([0, 0, 1]), array([0, 1, 2]), array([2., 1., 1.]))
+        """
+        return self._sparse(self.point(var), seed)
+
+    def _sparse(self, values, seed):
+        """Evaluate the functions at a single point with Sparse_Tangent leaves."""
+        if values and np.ndim(values[0]):
+            raise ValueError('Sparse derivatives are only supported at a single point.')
+        num_var = len(self.var_names)
+        leaves = []
+        for idx, value in enumerate(values):
+            seed_ = 1. if seed is None else float(seed[self.var_names[idx]])
+            leaves.append(Variable._new(value, Sparse_Tangent.unit(idx, num_var, seed_)))
+
+        outputs = self.expression.evaluate(leaves, Variable)
+        values = np.array([getattr(i, 'var', i) for i in outputs])
+        jacobian = Sparse_Jacobian.from_tangents([i.der if isinstance(i, Variable) else None for i in outputs], num_var)
+        return values, jacobian
+
+    def sparsity(self):
+        """The structural sparsity pattern of the Jacobian, detected once from the parsed functions.
+         INPUTS
+         =======
+         self: Compiled_Function object
+
+         RETURNS
+         ========
+         output: Sparsity_Pattern
+        """
+        if self._sparsity is None:
+            self._sparsity = Sparsity_Pattern.from_expression(self.expression, len(self.var_names))
+        return self._sparsity
+
+    def colored_jacobian(self, var, mode='auto'):
+        """Evaluate the functions and their sparse Jacobian with one pass per color of its sparsity pattern.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         var: dict/list/array, the value of each variable at a single point
+         mode: str, 'forward' (one forward pass carrying a tangent per column color), 'reverse' (one
+            reverse sweep with a cotangent per row color) or 'auto' (the fewer colors)
+
+         RETURNS
+         ========
+         values: a Numpy array with the value of each function
+         jacobian: Sparse_Jacobian, holding every structural nonzero
+
+         NOTES
+         =====
+         The variables of one column color never appear in the same function, so the product
+         J S with the 0/1 seed matrix S of shape (num_var, colors) is the compressed Jacobian and
+         each nonzero is read back from the column of its color. The reverse mode does the same
+         with the rows. A banded or stencil system needs a handful of colors instead of one
+         direction per variable.
+
+         EXAMPLES
+         =========
+         >>> f = Compiled_Function(['x0 + x1', 'x1 * x2', 'x2 - x3'], ['x0', 'x1', 'x2', 'x3'])
+         >>> values, jacobian = f.colored_jacobian([1, 2, 3, 4])
+         >>> jacobian.toarray()
+         array([[ 1.,  1.,  0.,  0.],
+                [ 0.,  3.,  2.,  0.],
+                [ 0.,  0.,  1., -1.]])
+        """
+        if mode not in ('auto', 'forward', 'reverse'):
+            raise ValueError("mode should be 'auto', 'forward' or 'reverse'!")
+        values = self.point(var)
+        if values and np.ndim(values[0]):
+            raise ValueError('The colored Jacobian is only supported at a single point.')
+
+        pattern = self.sparsity()
+        if mode == 'auto':
+            mode = 'forward' if _num_colors(pattern.column_colors()) <= _num_colors(pattern.row_colors()) else 'reverse'
+
+        num_var = len(self.var_names)
+        if mode == 'forward':
+            colors = pattern.column_colors()
+            S = np.zeros((num_var, _num_colors(colors)))
+            S[np.arange(num_var), colors] = 1.
+            values, compressed = self._evaluate(values, list(S), S.shape[1])
+            data = compressed[pattern.row, colors[pattern.col]]
+        else:
+            colors = pattern.row_colors()
+            W = np.zeros((_num_colors(colors), len(self.fct)))
+            W[colors, np.arange(len(self.fct))] = 1.
+            values, compressed = self.vjp(values, W)
+            data = compressed[colors[pattern.row], pattern.col]
+        return values, Sparse_Jacobian(pattern.row, pattern.col, data, pattern.shape)
+
+    def jvp(self, var, V):
+        """Evaluate the functions and the Jacobian-vector products J V in one forward pass, without
+            forming the Jacobian.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         var: dict/list/array, the value of each variable (arrays for a batch of N points)
+         V: array of shape (num_var, k), the k tangent directions, or of shape (num_var,) for one direction
+
+         RETURNS
+         ========
+         values: a Numpy array with the value of each function
+         product: a Numpy array of shape (num_fct, k), or (num_fct,) for one direction, with N first for N points
+
+         EXAMPLES
+         =========
+         >>> f = Compiled_Function(['x * y', 'x + y'], ['x', 'y'])
+         >>> values, product = f.jvp([3, 4], [[1, 0], [1, 2]])
+         >>> product
+         array([[7., 6.], [2., 2.]])
+        """
+        V = np.asarray(V, dtype=float)
+        if V.ndim not in (1, 2) or V.shape[0] != len(self.var_names):
+            raise ValueError('V should have one row per variable (' + str(len(self.var_names)) + ').')
+        if V.ndim == 1:
+            values, product = self._evaluate(self.point(var), list(V[:, None]), 1)
+            return values, product[..., 0]
+        return self._evaluate(self.point(var), list(V), V.shape[1])
+
+    def vjp(self, var, U):
+        """Evaluate the functions and the vector-Jacobian products U J from one recorded graph and a
+            single reverse sweep, without forming the Jacobian.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         var: dict/list/array, the value of each variable (arrays for a batch of N points)
+         U: array of shape (k, num_fct), the k cotangents, or of shape (num_fct,) for one cotangent
+
+         RETURNS
+         ========
+         values: a Numpy array with the value of each function
+         product: a Numpy array of shape (k, num_var), or (num_var,) for one cotangent, with N first for N points
+
+         NOTES
+         =====
+         The graph is swept once, see `_pullback`.
+
+         EXAMPLES
+         =========
+         >>> f = Compiled_Function(['x * y', 'x + y'], ['x', 'y'])
+         >>> values, product = f.vjp([3, 4], [[1, 0], [1, 2]])
+         >>> product
+         array([[4., 3.], [6., 5.]])
+        """
+        U = np.asarray(U, dtype=float)
+        if U.ndim not in (1, 2) or U.shape[-1] != len(self.fct):
+            raise ValueError('U should have one column per function (' + str(len(self.fct)) + ').')
+        if U.ndim == 1:
+            values, product = self.vjp(var, U[None, :])
+            return values, product[..., 0, :]
+
+        values = self.point(var)
+        # () for a single point, (N,) for N points
+        shape = np.shape(values[0]) if values else ()
+        inputs = [Reverse_Mode(value) for value in values]
+        outputs = self.expression.evaluate(inputs, Reverse_Mode)
+        product = _pullback(inputs, outputs, U, shape)
+
+        if not shape:
+            return np.array([getattr(i, 'var', i) for i in outputs]), product
+        values = np.stack([np.broadcast_to(getattr(i, 'var', i), shape) for i in outputs], axis=-1)
+        # the points come first
+        return values, np.moveaxis(product, 0, 1)
+
+    def hvp(self, var, v):
+        """Evaluate a scalar function, its gradient and the Hessian-vector product H v by forward-over-reverse,
+            without forming the Hessian.
+         INPUTS
+         =======
+         self: Compiled_Function object, with a single function
+         var: dict/list/array, the value of each variable (arrays for a batch of N points)
+         v: array of shape (num_var,), the direction, or of shape (num_var, k) for k directions
+
+         RETURNS
+         ========
+         value: the value of the function (an array of shape (N,) for N points)
+         gradient: a Numpy array of shape (num_var,), with N first for N points
+         product: a Numpy array of shape (num_var,), or (num_var, k) for k directions, with N first for N points
+
+         NOTES
+         =====
+         The function is evaluated in forward mode with v as the tangent of the variables. The reverse
+         sweep then computes each local derivative and each adjoint with the operators of Variable, so
+         every adjoint also carries its tangent: the adjoints of the variables are the gradient and their
+         tangents are H v. The cost is a small multiple of one gradient evaluation, whatever the number
+         of variables.
+
+         EXAMPLES
+         =========
+         >>> f = Compiled_Function(['x ** 2 * y'], ['x', 'y'])
+         >>> value, gradient, product = f.hvp([3, 4], [1, 0])
+         >>> product
+         array([8., 6.])
+        """
+        if len(self.fct) != 1:
+            raise ValueError('The Hessian-vector product is only defined for a single function.')
+        num_var = len(self.var_names)
+        v = np.asarray(v, dtype=float)
+        if v.ndim not in (1, 2) or v.shape[0] != num_var:
+            raise ValueError('v should have one row per variable (' + str(num_var) + ').')
+        if v.ndim == 1:
+            value, gradient, product = self.hvp(var, v[:, None])
+            return value, gradient, product[..., 0]
+
+        values = self.point(var)
+        # () for a single point, (N,) for N points
+        shape = np.shape(values[0]) if values else ()
+        k = v.shape[1]
+        expression = self.expression
+        leaves = [Variable(value, der_) for value, der_ in zip(values, list(v))]
+        order = expression.cone(0)
+        node_values = expression._values(leaves, Variable, order)
+        reach = expression.reach()
+
+        # reverse sweep over the nodes that depend on a variable, the adjoints are Variable objects
+        root = expression.roots[0]
+        adjoints = {root: 1.}
+        gradient = [0.] * num_var
+        for idx in reversed(order):
+            if idx not in adjoints or not reach[idx]:
+                continue
+            adjoint = adjoints.pop(idx)
+            op, a, b = expression.nodes[idx]
+            if op == 'var':
+                gradient[a] = adjoint
+                continue
+            if op in _binary_fcts:
+                partials = _binary_partials(op, node_values[a], node_values[b], node_values[idx],
+                    bool(reach[a]), bool(reach[b]))
+                operands = [(a, partials[0]), (b, partials[1])]
+            else:
+                operands = [(a, _unary_partials[op](node_values[a], node_values[idx]))]
+            for operand, partial in operands:
+                if reach[operand]:
+                    term = adjoint * partial
+                    adjoints[operand] = term if operand not in adjoints else adjoints[operand] + term
+        if not reach[root]:
+            gradient = [0.] * num_var
+
+        value = getattr(node_values[root], 'var', node_values[root])
+        # an adjoint without a tangent is constant: its part of H v is 0
+        product = np.stack([np.broadcast_to(i.der if isinstance(i, Variable) else 0., shape + (k,))
+            for i in gradient], axis=-2)
+        gradient = np.stack([np.broadcast_to(getattr(i, 'var', i), shape) for i in gradient], axis=-1)
+        return np.broadcast_to(value, shape) if shape else value, gradient, product
+
+    def hessian(self, var, seed=None):
+        """Evaluate the functions, their Jacobian and their Hessians in one second-order forward pass.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         var: dict/list/array, the value of each variable (arrays for a batch of N points)
+         seed: dict, variable name: seed (default 1 for every variable)
+
+         RETURNS
+         ========
+         values: a Numpy array with the value of each function, of shape (N, num_fct) for N points
+         jacobian: a Numpy array of shape (num_fct, num_var), (N, num_fct, num_var) for N points
+         hessian: a Numpy array of shape (num_fct, num_var, num_var), (N, num_fct, num_var, num_var) for N points
+
+         EXAMPLES
+         =========
+         >>> f = Compiled_Function(['x ** 2 * y'], ['x', 'y'])
+         >>> values, jacobian, hessian = f.hessian([3, 4])
+         >>> hessian
+         array([[[8., 6.],
+                 [6., 0.]]])
+        """
+        num_var = len(self.var_names)
+        values = self.point(var)
+        # () for a single point, (N,) for N points
+        shape = np.shape(values[0]) if values else ()
+        leaves = []
+        for idx, value in enumerate(values):
+            der_ = np.zeros((num_var,))
+            der_[idx] = 1. if seed is None else float(seed[self.var_names[idx]])
+            leaves.append(Hyper_Dual(value, der_))
+
+        outputs = self.expression.evaluate(leaves, Hyper_Dual)
+        # constant functions are repeated at every point
+        values = np.stack([np.broadcast_to(getattr(i, 'var', i), shape) for i in outputs], axis=-1)
+        jacobian = np.stack([np.broadcast_to(i.der, shape + (num_var,)) if isinstance(i, Hyper_Dual)
+            else np.zeros(shape + (num_var,)) for i in outputs], axis=-2)
+        hessian = np.stack([np.broadcast_to(i.hes, shape + (num_var, num_var)) if isinstance(i, Hyper_Dual)
+            else np.zeros(shape + (num_var, num_var)) for i in outputs], axis=-3)
+        return values.astype(float), jacobian, hessian
+
+    def taylor(self, var, order, seed=None):
+        """Evaluate the Taylor coefficients of the functions along a direction up to `order`, in one pass.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         var: dict/list/array, the value of each variable (arrays for a batch of N points)
+         order: int, the number k of derivatives
+         seed: dict, variable name: direction (default 1 for every variable)
+
+         RETURNS
+         ========
+         coef: a Numpy array of shape (num_fct, k + 1), (N, num_fct, k + 1) for N points, where coef[..., j]
+            is the coefficient f^(j) / j! of t^j in f(x + t * seed)
+
+         EXAMPLES
+         =========
+         >>> f = Compiled_Function(['exp(x * y)'], ['x', 'y'])
+         >>> f.taylor([0, 1], 3, {'x': 1, 'y': 0})
+         array([[1.        , 1.        , 0.5       , 0.16666667]])
+        """
+        values = self.point(var)
+        # () for a single point, (N,) for N points
+        shape = np.shape(values[0]) if values else ()
+        leaves = [Taylor_Variable(value, order, 1. if seed is None else float(seed[var_name]))
+            for value, var_name in zip(values, self.var_names)]
+
+        outputs = self.expression.evaluate(leaves, Taylor_Variable)
+        # a constant function is a constant polynomial
+        coef = []
+        for i in outputs:
+            if isinstance(i, Taylor_Variable):
+                coef.append(np.broadcast_to(i.coef, shape + (order + 1,)))
+            else:
+                constant = np.zeros(shape + (order + 1,))
+                constant[..., 0] = i
+                coef.append(constant)
+        return np.stack(coef, axis=-2)
+
+    def _evaluate(self, values, ders, width):
+        """Evaluate the functions with Variable leaves.
+         INPUTS
+         =======
+         self: Compiled_Function object
+         values: list, the value of each variable as returned by `point`
+         ders: list of arrays of shape (width,), the tangent of each variable
+         width: int, the number of tangent directions
+
+         RETURNS
+         ========
+         values: a Numpy array with the value of each function, of shape (N, num_fct) for N points
+         ders: a Numpy array with the tangents of each function, of shape (N, num_fct, width) for N points
+        """
+        # () for a single point, (N,) for N points
+        shape = np.shape(values[0]) if values else ()
+        leaves = [Variable(value, der_) for value, der_ in zip(values, ders)]
+
+        outputs = self.expression.evaluate(leaves, Variable)
+        if not shape:
+            values = np.array([getattr(i, 'var', i) for i in outputs])
+            jacobian = np.array([i.der if isinstance(i, Variable) else np.zeros((width,)) for i in outputs])
+            return values, jacobian
+
+        # constant functions are repeated at every point
+        values = np.stack([np.broadcast_to(getattr(i, 'var', i), shape) for i in outputs], axis=-1)
+        jacobian = np.stack([np.broadcast_to(i.der, shape + (width,)) if isinstance(i, Variable)
+            else np.zeros(shape + (width,)) for i in outputs], axis=-2)
+        return values, jacobian
+
+
+def compile(fct, var_names):
+    """Parse the function strings once and return a callable that evaluates them.
+     INPUTS
+     =======
+     fct: str/list of str, the functions
+     var_names: list of str, the variable names
+
+     RETURNS
+     ========
+     output: Compiled_Function, call it with the variable values to get (values, jacobian)
+
+     EXAMPLES
+     =========
+     >>> f = compile(['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3'], ['x', 'y'])
+     >>> values, jacobian = f({'x': 3, 'y': 4})
+     >>> values, jacobian = f([0.5, 4])
+    """
+    if isinstance(fct, str):
+        fct = [fct]
+    return Compiled_Function(fct, var_names)
+
+
+def canonicalize(fct):
+    """Return a canonical spelling of a function string.
+     INPUTS
+     =======
+     fct: str, the function
+
+     RETURNS
+     ========
+     output: str, the fully parenthesized function where whitespace, unary plus and the
+        operand order of each + and * no longer matter
+
+     NOTES
+     =====
+     Only the two operands of a single + or * are swapped, so the canonical function
+     evaluates to exactly the same floats as the original one.
+
+     EXAMPLES
+     =========
+     >>> canonicalize('x*y') == canonicalize('y * x')
+     True
+     >>> canonicalize('y * x + 2')
+     '((x * y) + 2.0)'
+    """
+    return _canonical(ast.parse(fct.strip(), mode='eval').body)
+
+
+def _canonical(node):
+    if isinstance(node, ast.BinOp) and type(node.op) in _symbols:
+        left, right = _canonical(node.left), _canonical(node.right)
+        if isinstance(node.op, (ast.Add, ast.Mult)) and right < left:
+            left, right = right, left
+        return '(' + left + ' ' + _symbols[type(node.op)] + ' ' + right + ')'
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return '(-' + _canonical(node.operand) + ')'
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+        return _canonical(node.operand)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        return node.func.id + '(' + ', '.join(_canonical(i) for i in node.args) + ')'
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        return node.value.id + '.' + node.attr
+    value = _constant(node)
+    if value is not None:
+        return repr(float(value))
+    # anything else is rejected when compiling, keep it distinct
+    return ast.dump(node)
+
+
+class Compile_Cache:
+    # a cached function remembers at most this many original spellings
+    max_aliases = 8
+
+    def __init__(self, maxsize=128):
+        """A process-wide LRU cache of compiled functions.
+         INPUTS
+         =======
+         self: Compile_Cache object
+         maxsize: int/None, the maximum number of cached function lists (None for no limit,
+            0 to disable caching)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Entries are keyed on the canonical function strings plus the variable names, so
+         'x*y' and 'y * x' share one entry. The original spellings are remembered as aliases
+         so that a repeated call does not need to parse the strings again.
+
+         EXAMPLES
+         =========
+         >>> cache = Compile_Cache(maxsize=2)
+         >>> f = cache.get(['x*y'], ['x', 'y'])
+         >>> f is cache.get(['y * x'], ['x', 'y'])
+         True
+         >>> cache.info()
+         {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': 2}
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._aliases = {}
+        self._lock = threading.Lock()
+
+    def get(self, fct, var_names):
+        """Return the compiled functions, compiling them on a cache miss.
+         INPUTS
+         =======
+         self: Compile_Cache object
+         fct: str/list of str, the functions
+         var_names: list of str, the variable names
+
+         RETURNS
+         ========
+         output: Compiled_Function
+        """
+        if isinstance(fct, str):
+            fct = [fct]
+        check = [1 if isinstance(i, str) else 0 for i in fct]
+        if len(check) != sum(check):
+            raise TypeError('Each function should be a string!')
+
+        raw = (tuple(fct), tuple(var_names))
+        with self._lock:
+            key = self._aliases.get(raw)
+        if key is None:
+            key = (tuple(canonicalize(i) for i in fct), raw[1])
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                self._alias(raw, key, entry[1])
+                return entry[0]
+            self.misses += 1
+
+        compiled = Compiled_Function(fct, var_names)
+        if self.maxsize == 0:
+            return compiled
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (compiled, [])
+            self._alias(raw, key, self._entries[key][1])
+            self._evict()
+        return compiled
+
+    def _alias(self, raw, key, aliases):
+        if raw in self._aliases:
+            return
+        self._aliases[raw] = key
+        aliases.append(raw)
+        if len(aliases) > self.max_aliases:
+            del self._aliases[aliases.pop(0)]
+
+    def resize(self, maxsize):
+        """Change the maximum size, evicting the least recently used entries if needed.
+         INPUTS
+         =======
+         self: Compile_Cache object
+         maxsize: int/None, the new maximum size
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def _evict(self):
+        while self.maxsize is not None and len(self._entries) > self.maxsize:
+            _, (_, aliases) = self._entries.popitem(last=False)
+            for alias in aliases:
+                del self._aliases[alias]
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """Return the cache statistics.
+         RETURNS
+         ========
+         output: dict with the hits, misses, evictions, current size and maximum size
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return 'Compile_Cache(' + str(self.info()) + ')'
+
+
+# shared by Forward, Reverse and auto_diff
+compile_cache = Compile_Cache()
@@ -0,0 +1,103 @@
+# predicted cost of each step in microseconds, measured on the Forward/Reverse implementations
+# forward: one operation on Variable objects, and one input Variable with its unit derivative array
+FORWARD_OP = 1.5
+FORWARD_LEAF = 2.5
+# reverse: recording one operation on Reverse_Mode objects, one input node (created, searched and
+# read after each sweep), and visiting one node in a sweep
+RECORD_OP = 1.5
+REVERSE_LEAF = 1.7
+SWEEP_NODE = 0.18
+# one array entry (a derivative of a variable, or a point of a batch) of an operation, and of a
+# freshly allocated unit derivative array
+ELEMENT = 0.006
+LEAF_ELEMENT = 0.0005
+
+# bytes of a Reverse_Mode node with its child list and the edge to it, and of one float
+NODE_BYTES = 200
+FLOAT_BYTES = 8
+
+
+class Cost_Model:
+    def __init__(self, expression, num_var, num_points = 1):
+        """Predict the time and memory of the forward and the reverse mode from the expression graph.
+         INPUTS
+         =======
+         self: Cost_Model object
+         expression: Expression, the parsed functions
+         num_var: int, the number of variables
+         num_points: int, the number of points evaluated at once
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Forward creates one input per variable with a unit derivative array, then evaluates each
+         operation once and carries a derivative array with one entry per variable (and point).
+         Reverse records each operation once and then sweeps the inputs and every node that depends
+         on a variable once per function that is not constant. Operations on constants only are
+         recorded but never swept.
+
+         EXAMPLES
+         =========
+         >>> e = Expression(['x * y', 'x + y', 'sin(x)', 'x / y'], {'x': 0, 'y': 1})
+         >>> Cost_Model(e, 2).mode
+         'forward'
+        """
+        self.num_var = num_var
+        self.num_points = num_points
+        self.num_fct = len(expression.roots)
+
+        # variables reaching each node
+        reach = expression.reach()
+
+        self.ops = sum(1 for node in expression.nodes if node[0] not in ('var', 'const'))
+        # the Reverse_Mode graph holds the inputs and the nodes depending on them
+        self.graph_nodes = num_var + sum(1 for node, r in zip(expression.nodes, reach)
+            if r and node[0] != 'var')
+        # the number of operations and the variables of each function
+        self.fct_ops = [sum(1 for idx in expression.cone(i) if expression.nodes[idx][0] not in ('var', 'const'))
+            for i in range(self.num_fct)]
+        self.fct_vars = [len(reach[root]) for root in expression.roots]
+        self.sweeps = sum(1 for num in self.fct_vars if num)
+
+        self.forward_time = self.ops * (FORWARD_OP + ELEMENT * num_var * num_points) + \
+            num_var * (FORWARD_LEAF + LEAF_ELEMENT * num_var * num_points)
+        self.reverse_time = self.ops * (RECORD_OP + ELEMENT * num_points) + num_var * REVERSE_LEAF + \
+            self.sweeps * self.graph_nodes * (SWEEP_NODE + ELEMENT * num_points)
+        # every intermediate Variable stays alive until the end of the evaluation
+        self.forward_memory = (self.ops + num_var) * (num_var + 1) * num_points * FLOAT_BYTES
+        self.reverse_memory = self.graph_nodes * (NODE_BYTES + 2 * num_points * FLOAT_BYTES)
+
+        self.mode = 'forward' if self.forward_time <= self.reverse_time else 'reverse'
+
+    def explain(self):
+        """Report the graph and the predicted cost of each mode.
+         INPUTS
+         =======
+         self: Cost_Model object
+
+         RETURNS
+         ========
+         output: str
+        """
+        output_string = '-- Graph -- \n'
+        output_string = output_string + 'Variables: ' + str(self.num_var) + ', Functions: ' + str(self.num_fct) + \
+            ', Points: ' + str(self.num_points) + '\n'
+        output_string = output_string + 'Operations: ' + str(self.ops) + ', Reverse graph nodes: ' + \
+            str(self.graph_nodes) + '\n'
+        for idx in range(self.num_fct):
+            output_string = output_string + 'Function F' + str(idx + 1) + ': ' + str(self.fct_ops[idx]) + \
+                ' operations, ' + str(self.fct_vars[idx]) + ' of ' + str(self.num_var) + ' variables\n'
+        output_string = output_string + '-- Predicted cost -- \n'
+        output_string = output_string + 'Forward: %.0f us, %.1f kB\n' % (self.forward_time, self.forward_memory / 1e3)
+        output_string = output_string + 'Reverse: %.0f us, %.1f kB (%d sweeps)\n' % (self.reverse_time,
+            self.reverse_memory / 1e3, self.sweeps)
+        output_string = output_string + 'Cheaper mode: ' + self.mode + '\n'
+        return output_string
+
+    def __repr__(self):
+        return self.explain()
+
+    def __str__(self):
+        return self.explain()
@@ -0,0 +1,247 @@
+import os
+import atexit
+import heapq
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from .sparse import Sparse_Jacobian
+
+# the functions are split into about this many chunks per worker, so that the workers that finish
+# their chunks early take the remaining ones
+CHUNKS_PER_WORKER = 4
+
+# a worker evaluates its slice of points this many at a time, which bounds the memory of the
+# derivative arrays of the intermediate results
+POINTS_PER_CALL = 65536
+
+# one persistent pool per number of workers: the processes and their compile caches are reused
+_pools = {}
+
+
+def get_pool(workers):
+    """Returns the persistent process pool with `workers` processes, started on first use."""
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _pools[workers]
+
+
+def shutdown():
+    """Stop the worker processes of every pool."""
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+atexit.register(shutdown)
+
+
+def chunks(costs, num_chunks):
+    """Split the functions into chunks of balanced predicted cost.
+     INPUTS
+     =======
+     costs: list of float, the predicted cost of each function
+     num_chunks: int, the largest number of chunks
+
+     RETURNS
+     ========
+     output: list of chunks, each a sorted list of function indices, the most expensive chunk first
+
+     NOTES
+     =====
+     The functions are assigned from the most expensive down, each to the chunk with the lowest
+     cost so far (longest processing time first). A function is never split, so a huge expression
+     gets a chunk of its own while the small ones fill the others.
+
+     EXAMPLES
+     =========
+     >>> chunks([100, 1, 1, 1, 50, 50], 3)
+     [[0], [1, 3, 4], [2, 5]]
+    """
+    num_chunks = max(1, min(num_chunks, len(costs)))
+    heap = [(0., idx) for idx in range(num_chunks)]
+    members = [[] for _ in range(num_chunks)]
+    for fct_idx in sorted(range(len(costs)), key=lambda i: -costs[i]):
+        load, idx = heapq.heappop(heap)
+        members[idx].append(fct_idx)
+        heapq.heappush(heap, (load + costs[fct_idx], idx))
+    loads = dict((idx, load) for load, idx in heap)
+    order = sorted((idx for idx in range(num_chunks) if members[idx]), key=lambda idx: -loads[idx])
+    return [sorted(members[idx]) for idx in order]
+
+
+def _evaluate_chunk(mode, var, fct, seed, sparse):
+    """Evaluate a chunk of the functions in a worker process, returns (var, der)."""
+    from .apollo_ad import Forward, Reverse
+    if mode == 'forward':
+        out = Forward(var, fct, seed, sparse)
+    else:
+        out = Reverse(var, fct, seed)
+    return out.var, out.der
+
+
+def evaluate(mode, var, fct, seed, workers, sparse=False):
+    """Evaluate the functions and their gradients in chunks on a pool of worker processes.
+     INPUTS
+     =======
+     mode: str, 'forward' or 'reverse'
+     var: dict, variable name: value (or an array of N points)
+     fct: list of str, the functions
+     seed: dict for forward, list with one seed per function for reverse (or None)
+     workers: int, the number of worker processes
+     sparse: bool, whether forward returns the Jacobian as a Sparse_Jacobian
+
+     RETURNS
+     ========
+     values: a Numpy array with the value of each function, as in Forward and Reverse
+     jacobian: a Numpy array (or a Sparse_Jacobian) with the gradient of each function
+
+     NOTES
+     =====
+     The cost of each function is predicted from its number of operations (Cost_Model.fct_ops),
+     the chunks are balanced on it and the most expensive ones are submitted first. The results
+     are put back in the order of `fct`.
+    """
+    from .compiler import compile_cache
+    from .cost import Cost_Model
+    compiled = compile_cache.get(fct, list(var.keys()))
+    # one operation to evaluate even for a constant function
+    costs = [ops + 1 for ops in Cost_Model(compiled.expression, len(var)).fct_ops]
+    parts = chunks(costs, workers * CHUNKS_PER_WORKER)
+
+    pool = get_pool(workers)
+    futures = []
+    for idx in parts:
+        seed_ = [seed[i] for i in idx] if mode == 'reverse' and seed is not None else seed
+        futures.append(pool.submit(_evaluate_chunk, mode, var, [fct[i] for i in idx], seed_, sparse))
+    results = [future.result() for future in futures]
+
+    if sparse:
+        row = np.concatenate([np.array(idx)[der.row] for idx, (_, der) in zip(parts, results)]).astype(int)
+        col = np.concatenate([der.col for _, der in results]).astype(int)
+        data = np.concatenate([der.data for _, der in results]).astype(float)
+        # sorted by row and then by column, as Sparse_Jacobian expects
+        order = np.lexsort((col, row))
+        jacobian = Sparse_Jacobian(row[order], col[order], data[order], (len(fct), len(var)))
+    else:
+        # the points (if any) come first, then the functions
+        shape = results[0][0].shape[:-1]
+        jacobian = np.empty(shape + (len(fct), len(var)))
+        for idx, (_, der) in zip(parts, results):
+            jacobian[..., idx, :] = der
+    shape = results[0][0].shape[:-1]
+    values = np.empty(shape + (len(fct),))
+    for idx, (value, _) in zip(parts, results):
+        values[..., idx] = value
+    return values, jacobian
+
+
+class _Shared_Array:
+    def __init__(self, shape, name=None):
+        """A Numpy array in a shared memory block, created here or attached to by `name`.
+         INPUTS
+         =======
+         self: _Shared_Array object
+         shape: tuple, the shape of the float array
+         name: str, the name of an existing block (default a new block)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         np.asarray(self) is a view of the block whose base is this object, so the block stays
+         mapped as long as a view of it exists, and is closed with the last one. Closing a block
+         that a view still points to would crash the process.
+        """
+        # multiprocessing.shared_memory is only in Python 3.8+, and the package loads this module
+        from multiprocessing import shared_memory
+        size = max(1, int(np.prod(shape))) * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self._array = np.ndarray(shape, buffer=self.shm.buf)
+        self.__array_interface__ = self._array.__array_interface__
+
+    def __del__(self):
+        # the view has to be released before the block is closed (`shm` is missing if the block
+        # could not be created or found)
+        self._array = None
+        if hasattr(self, 'shm'):
+            self.shm.close()
+
+
+def _jacobian_slice(fct, var_names, seed, names, num_points, start, stop):
+    """Evaluate the points start to stop in a worker process and write the results in the shared blocks."""
+    from .compiler import compile_cache
+    compiled = compile_cache.get(fct, var_names)
+    num_var, num_fct = len(var_names), len(fct)
+    points = np.asarray(_Shared_Array((num_var, num_points), names[0]))
+    values = np.asarray(_Shared_Array((num_points, num_fct), names[1]))
+    jacobian = np.asarray(_Shared_Array((num_points, num_fct, num_var), names[2]))
+    for begin in range(start, stop, POINTS_PER_CALL):
+        end = min(stop, begin + POINTS_PER_CALL)
+        values[begin:end], jacobian[begin:end] = compiled(list(points[:, begin:end]), seed)
+
+
+def batch_jacobian(var, fct, workers=None, seed=None):
+    """Evaluate the functions and their Jacobian at many points on a pool of processes sharing memory.
+     INPUTS
+     =======
+     var: dict, variable name: array of N points (or a scalar, repeated at every point)
+     fct: list of str, the functions
+     workers: int, the number of worker processes (default the number of CPUs)
+     seed: dict, variable name: seed (default 1 for every variable)
+
+     RETURNS
+     ========
+     values: a Numpy array of shape (N, num_fct)
+     jacobian: a Numpy array of shape (N, num_fct, num_var)
+
+     NOTES
+     =====
+     The points and the outputs are placed in shared memory blocks, and each worker evaluates a
+     slice of the points in forward mode and writes its values and Jacobians in place: only the
+     block names and the slice bounds are sent to the workers. The returned arrays are views of
+     the output blocks, without a copy; the memory is released with the last view. Shared memory
+     needs Python 3.8+.
+
+     EXAMPLES
+     =========
+     >>> values, jacobian = batch_jacobian({'x': np.linspace(0, 1, 10 ** 6), 'y': 2}, ['x * y', 'sin(x)'], workers=32)
+     >>> jacobian.shape
+     (1000000, 2, 2)
+    """
+    if not isinstance(var, dict):
+        raise TypeError('The variable should be a dictionary!')
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError('The number of workers should be a positive integer.')
+    from .compiler import compile_cache
+    var_names = list(var.keys())
+    compiled = compile_cache.get(fct, var_names)
+    values = compiled.point(var)
+    if not values or not np.ndim(values[0]):
+        raise ValueError('Expected arrays of points.')
+    num_points, num_var, num_fct = values[0].shape[0], len(var_names), len(fct)
+
+    blocks = [_Shared_Array((num_var, num_points)), _Shared_Array((num_points, num_fct)),
+              _Shared_Array((num_points, num_fct, num_var))]
+    futures = []
+    try:
+        np.asarray(blocks[0])[...] = values
+        names = [block.shm.name for block in blocks]
+        # slices of equal size: every point costs the same
+        bounds = np.linspace(0, num_points, min(num_points, workers * CHUNKS_PER_WORKER) + 1).astype(int)
+        pool = get_pool(workers)
+        futures = [pool.submit(_jacobian_slice, fct, var_names, seed, names, num_points, start, stop)
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        for future in futures:
+            future.result()
+    finally:
+        # after an error, the slices still running have to finish before the blocks disappear
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        # the blocks stay mapped while they are used, only their names are removed
+        for block in blocks:
+            block.shm.unlink()
+    return np.asarray(blocks[1]), np.asarray(blocks[2])
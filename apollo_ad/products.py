@@ -0,0 +1,118 @@
+import numpy as np
+from .compiler import compile_cache
+
+
+def _compiled(fct, point):
+    """Returns the cached compiled functions for the variables of `point`."""
+    if isinstance(fct, str):
+        fct = [fct]
+    if not isinstance(point, dict):
+        raise TypeError('The variable should be a dictionary!')
+    return compile_cache.get(fct, list(point.keys()))
+
+
+def jvp(fct, point, V):
+    """Jacobian-vector products J V of the functions at a point, computed in a single forward pass.
+        The Jacobian itself is never formed: each variable carries one row of V as its tangent, so
+        the cost grows with the number of columns of V rather than the number of variables.
+     INPUTS
+     =======
+     fct: str/list of str, the functions
+     point: dict, variable name: value (or an array with the values at N points)
+     V: array of shape (num_var, k), the k tangent directions, with the rows in the order of `point`.
+        A vector of shape (num_var,) is a single direction
+
+     RETURNS
+     ========
+     values: a Numpy array with the value of each function
+     product: a Numpy array of shape (num_fct, k), or (num_fct,) for a single direction. For N points
+        the points come first: (N, num_fct) and (N, num_fct, k)
+
+     EXAMPLES
+     =========
+     >>> values, product = jvp(['x * y', 'x + y'], {'x': 3, 'y': 4}, [[1, 0], [1, 2]])
+     >>> product
+     array([[7., 6.],
+            [2., 2.]])
+    """
+    return _compiled(fct, point).jvp(point, V)
+
+
+def vjp(fct, point, U):
+    """Vector-Jacobian products U J of the functions at a point, computed from one recorded graph and a
+        single reverse sweep whose adjoints hold one entry per row of U. The Jacobian itself is never formed.
+     INPUTS
+     =======
+     fct: str/list of str, the functions
+     point: dict, variable name: value (or an array with the values at N points)
+     U: array of shape (k, num_fct), the k cotangents. A vector of shape (num_fct,) is a single cotangent
+
+     RETURNS
+     ========
+     values: a Numpy array with the value of each function
+     product: a Numpy array of shape (k, num_var), or (num_var,) for a single cotangent, with the columns in
+        the order of `point`. For N points the points come first: (N, num_fct) and (N, k, num_var)
+
+     EXAMPLES
+     =========
+     >>> values, product = vjp(['x * y', 'x + y'], {'x': 3, 'y': 4}, [[1, 0], [1, 2]])
+     >>> product
+     array([[4., 3.],
+            [6., 5.]])
+    """
+    return _compiled(fct, point).vjp(point, U)
+
+
+def colored_jacobian(fct, point, mode = 'auto'):
+    """The sparse Jacobian of the functions at a point, evaluated with one pass per color of its sparsity pattern.
+        The pattern is detected from the parsed functions, the variables (or functions) that never meet are
+        grouped into one color, and the compressed products are decompressed into the structural nonzeros.
+     INPUTS
+     =======
+     fct: str/list of str, the functions
+     point: dict, variable name: value
+     mode: str, 'forward' (column coloring), 'reverse' (row coloring) or 'auto' (the fewer colors)
+
+     RETURNS
+     ========
+     values: a Numpy array with the value of each function
+     jacobian: Sparse_Jacobian, with the columns in the order of `point`
+
+     EXAMPLES
+     =========
+     >>> point = {'x' + str(i): 1. for i in range(1000)}
+     >>> fct = ['x' + str(i - 1) + ' - 2 * x' + str(i) + ' + x' + str(i + 1) for i in range(1, 999)]
+     >>> values, jacobian = colored_jacobian(fct, point)   # 3 forward directions instead of 1000
+     >>> jacobian.nnz
+     2994
+    """
+    return _compiled(fct, point).colored_jacobian(point, mode)
+
+
+def hvp(fct, point, v):
+    """Hessian-vector product H v of a scalar function at a point, computed by forward-over-reverse: the
+        tangent v is pushed forward through the evaluation and through the reverse sweep, so the Hessian
+        itself is never formed and the cost stays a small multiple of one gradient evaluation.
+     INPUTS
+     =======
+     fct: str/list of one str, the function
+     point: dict, variable name: value (or an array with the values at N points)
+     v: array of shape (num_var,), the direction with the entries in the order of `point`, or of shape
+        (num_var, k) for k directions
+
+     RETURNS
+     ========
+     value: the value of the function
+     gradient: a Numpy array of shape (num_var,)
+     product: a Numpy array of shape (num_var,), or (num_var, k) for k directions. For N points the points
+        come first: (N,), (N, num_var) and (N, num_var) or (N, num_var, k)
+
+     EXAMPLES
+     =========
+     >>> value, gradient, product = hvp('x ** 2 * y', {'x': 3, 'y': 4}, [1, 0])
+     >>> gradient
+     array([24.,  9.])
+     >>> product
+     array([8., 6.])
+    """
+    return _compiled(fct, point).hvp(point, v)
@@ -0,0 +1,324 @@
+"""A local gradient-evaluation server that batches concurrent requests.
+
+    python -m apollo_ad.serve --socket /tmp/apollo.sock
+    python -m apollo_ad.serve --port 8765 --window 2
+
+Each message is a 4-byte big-endian length followed by a JSON object. A request is
+{"id": 1, "var": {"x": 0.5, "y": 4}, "fct": ["x * y"], "seed": {"x": 1, "y": 1}} (seed optional),
+the response {"id": 1, "var": [...], "der": [[...]]} or {"id": 1, "error": "ValueError: ..."}.
+"""
+import json
+import struct
+import asyncio
+import argparse
+import numpy as np
+
+from .compiler import compile_cache
+
+_HEADER = struct.Struct('>I')
+
+# the largest message accepted, in bytes
+MAX_MESSAGE = 64 * 2 ** 20
+
+
+async def read_message(reader):
+    """Read one framed JSON message, returns None at the end of the stream."""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    size = _HEADER.unpack(header)[0]
+    if size > MAX_MESSAGE:
+        raise ValueError('The message is too large (' + str(size) + ' bytes).')
+    return json.loads(await reader.readexactly(size))
+
+
+def write_message(writer, message):
+    """Write one framed JSON message."""
+    body = json.dumps(message).encode()
+    writer.write(_HEADER.pack(len(body)) + body)
+
+
+class Gradient_Server:
+    def __init__(self, window = 0.002, max_batch = 4096):
+        """Initiate a server that evaluates functions and their gradients for many clients.
+         INPUTS
+         =======
+         self: Gradient_Server object
+         window: float, the time in seconds a request waits for others with the same functions
+         max_batch: int, the number of points after which a batch is evaluated without waiting
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         The functions stay compiled in compile_cache between requests. The requests at a single
+         point with the same functions, variable names and seed that arrive within `window` of the
+         first one are evaluated together, as one array of points in one vectorized forward pass.
+         If the batch fails (e.g. a point outside the domain of a function), its requests are
+         evaluated one by one so that only the failing ones get an error. The evaluations run in
+         the default executor of the event loop, so the other connections are served meanwhile.
+         `requests` and `batches` count the requests and the evaluations.
+
+         EXAMPLES
+         =========
+         >>> server = Gradient_Server()
+         >>> await server.start(path='/tmp/apollo.sock')
+         >>> await server.serve_forever()
+        """
+        self.window = window
+        self.max_batch = max_batch
+        self.requests = 0
+        self.batches = 0
+        # batch key: list of (values, future)
+        self._pending = {}
+        self._server = None
+
+    async def start(self, path = None, host = '127.0.0.1', port = 0):
+        """Listen on the Unix socket `path`, or on host:port over TCP (port 0 picks a free port).
+            Returns the address: the path, or (host, port)."""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+            return path
+        self._server = await asyncio.start_server(self._handle, host=host, port=port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        """Serve one connection: every request is answered as soon as its batch is evaluated."""
+        tasks = set()
+        # one drain at a time per connection (concurrent drains fail before Python 3.10)
+        lock = asyncio.Lock()
+        try:
+            while True:
+                request = await read_message(reader)
+                if request is None:
+                    break
+                task = asyncio.ensure_future(self._answer(request, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _answer(self, request, writer, lock):
+        if not isinstance(request, dict):
+            response = {'id': None, 'error': 'TypeError: The request should be a JSON object!'}
+        else:
+            try:
+                var, der = await self.evaluate(request['var'], request['fct'], request.get('seed'))
+                response = {'id': request.get('id'), 'var': var.tolist(), 'der': der.tolist()}
+            except Exception as e:
+                response = {'id': request.get('id'), 'error': type(e).__name__ + ': ' + str(e)}
+        if writer.is_closing():
+            return
+        write_message(writer, response)
+        # a slow client holds its responses back instead of filling the buffer of the transport
+        async with lock:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def evaluate(self, var, fct, seed = None):
+        """Evaluate the functions and their gradients at one point, batched with concurrent requests.
+         INPUTS
+         =======
+         self: Gradient_Server object
+         var: dict, variable name: value
+         fct: list of str, the functions
+         seed: dict, variable name: seed (default 1 for every variable)
+
+         RETURNS
+         ========
+         values: a Numpy array of shape (num_fct,)
+         jacobian: a Numpy array of shape (num_fct, num_var)
+        """
+        self.requests += 1
+        if not isinstance(var, dict):
+            raise TypeError('The variable should be a dictionary!')
+        if not isinstance(fct, list):
+            raise TypeError('The functions should be a list of strings!')
+        compiled = compile_cache.get(fct, list(var.keys()))
+        if any(np.ndim(value) for value in var.values()):
+            # already a batch of points
+            self.batches += 1
+            return await asyncio.get_running_loop().run_in_executor(None, compiled, var, seed)
+
+        seed_key = None if seed is None else tuple(sorted(seed.items()))
+        key = (tuple(fct), tuple(var.keys()), seed_key)
+        future = asyncio.get_running_loop().create_future()
+        if key not in self._pending:
+            self._pending[key] = []
+            asyncio.get_running_loop().call_later(self.window, self._flush, key)
+        batch = self._pending[key]
+        batch.append((compiled.point(var), future))
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        """Start the evaluation of the pending requests of one batch."""
+        batch = self._pending.pop(key, None)
+        if batch:
+            asyncio.ensure_future(self._run(key, batch))
+
+    async def _run(self, key, batch):
+        """Evaluate one batch in the default executor and resolve the futures of its requests."""
+        results, evaluations = await asyncio.get_running_loop().run_in_executor(
+            None, self._evaluate_batch, key, [values for values, _ in batch])
+        self.batches += evaluations
+        for (_, future), result in zip(batch, results):
+            # a cancelled request is skipped
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _evaluate_batch(self, key, points):
+        """Evaluate the points of one batch together in a worker thread.
+            Returns the result or the exception of each point, and the number of evaluations."""
+        fct, var_names, seed = list(key[0]), list(key[1]), key[2]
+        seed = None if seed is None else dict(seed)
+        compiled = compile_cache.get(fct, var_names)
+        try:
+            values, jacobian = compiled([np.array(i) for i in zip(*points)], seed)
+        except Exception:
+            # evaluate each point on its own, so that the error goes to the failing requests only
+            results = []
+            for values in points:
+                try:
+                    results.append(compiled(values, seed))
+                except Exception as e:
+                    results.append(e)
+            return results, 1 + len(points)
+        return [(values[idx], jacobian[idx]) for idx in range(len(points))], 1
+
+
+class Gradient_Client:
+    def __init__(self):
+        """Initiate a client of a Gradient_Server, with concurrent requests over one connection.
+         INPUTS
+         =======
+         self: Gradient_Client object
+
+         RETURNS
+         ========
+
+         EXAMPLES
+         =========
+         >>> client = Gradient_Client()
+         >>> await client.connect(path='/tmp/apollo.sock')
+         >>> await client.evaluate({'x': 3, 'y': 4}, ['x * y'])
+         (array([12.]), array([[4., 3.]]))
+         >>> await asyncio.gather(*[client.evaluate({'x': i, 'y': 4}, ['x * y']) for i in range(1000)])
+        """
+        self._reader = None
+        self._writer = None
+        self._futures = {}
+        self._next_id = 0
+        self._listener = None
+
+    async def connect(self, path = None, host = '127.0.0.1', port = None):
+        """Connect to the Unix socket `path`, or to host:port over TCP."""
+        if path is not None:
+            self._reader, self._writer = await asyncio.open_unix_connection(path)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._listener = asyncio.ensure_future(self._listen())
+        return self
+
+    async def _listen(self):
+        """Resolve the pending requests with the responses, in any order."""
+        try:
+            while True:
+                response = await read_message(self._reader)
+                if response is None:
+                    break
+                future = self._futures.pop(response['id'], None)
+                if future is None or future.done():
+                    continue
+                if 'error' in response:
+                    future.set_exception(RuntimeError(response['error']))
+                else:
+                    future.set_result((np.array(response['var']), np.array(response['der'])))
+        finally:
+            for future in self._futures.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('The connection to the server was closed.'))
+            self._futures.clear()
+
+    async def evaluate(self, var, fct, seed = None):
+        """Evaluate the functions and their gradients on the server.
+         INPUTS
+         =======
+         self: Gradient_Client object
+         var: dict, variable name: value (or a list of values at N points)
+         fct: list of str, the functions
+         seed: dict, variable name: seed (default 1 for every variable)
+
+         RETURNS
+         ========
+         values: a Numpy array of shape (num_fct,), or (N, num_fct)
+         jacobian: a Numpy array of shape (num_fct, num_var), or (N, num_fct, num_var)
+
+         NOTES
+         =====
+         An error on the server is raised as a RuntimeError with the type and message of the
+         original exception.
+        """
+        if self._writer is None:
+            raise ConnectionError('The client is not connected.')
+        self._next_id += 1
+        request = {'id': self._next_id, 'var': {name: np.asarray(value).tolist() for name, value in var.items()},
+                   'fct': list(fct)}
+        if seed is not None:
+            request['seed'] = {name: float(value) for name, value in seed.items()}
+        future = asyncio.get_running_loop().create_future()
+        self._futures[self._next_id] = future
+        write_message(self._writer, request)
+        await self._writer.drain()
+        return await future
+
+    async def close(self):
+        self._writer.close()
+        await self._listener
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog='python -m apollo_ad.serve',
+                                     description='Serve function values and gradients with request batching.')
+    parser.add_argument('--socket', help='the path of a Unix socket to listen on')
+    parser.add_argument('--host', default='127.0.0.1', help='the TCP host (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='the TCP port (default 8765)')
+    parser.add_argument('--window', type=float, default=2., help='the batching window in milliseconds (default 2)')
+    parser.add_argument('--max-batch', type=int, default=4096, help='the largest batch of points (default 4096)')
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = Gradient_Server(args.window / 1000, args.max_batch)
+        address = await server.start(args.socket, args.host, args.port)
+        print('apollo_ad serving on ' + str(address))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
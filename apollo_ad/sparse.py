@@ -0,0 +1,216 @@
+import numpy as np
+
+
+# below this number of stored entries, two vectors are merged with a dict rather than numpy calls
+SMALL_MERGE = 64
+
+
+class Sparse_Tangent:
+    # numpy scalars defer to our operators instead of broadcasting over the object
+    __array_ufunc__ = None
+    __slots__ = ('index', 'value', 'size')
+
+    def __init__(self, index, value, size):
+        """Initiate a sparse derivative vector that only stores its nonzero entries.
+         INPUTS
+         =======
+         self: Sparse_Tangent object
+         index: int array, the sorted indices of the stored entries
+         value: float array, the stored entries
+         size: int, the length of the dense vector (the number of variables)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Sparse_Tangent supports the operations Variable applies to its `der`: adding and
+         subtracting another derivative vector (the indices are merged), and multiplying or
+         dividing by a scalar. A Variable with a Sparse_Tangent `der` therefore works unchanged.
+
+         EXAMPLES
+         =========
+         >>> x = Variable(3, Sparse_Tangent.unit(0, 5000))
+         >>> y = Variable(4, Sparse_Tangent.unit(4999, 5000))
+         >>> (x * y).der
+         Sparse_Tangent([0, 4999], [4. 3.], 5000)
+        """
+        self.index = index
+        self.value = value
+        self.size = size
+
+    @staticmethod
+    def unit(idx, size, seed = 1.):
+        """Returns the derivative vector of the variable number `idx`, scaled by `seed`."""
+        return Sparse_Tangent(np.array([idx]), np.array([float(seed)]), size)
+
+    def _merge(self, other, sign):
+        """Returns self + sign * other."""
+        if not isinstance(other, Sparse_Tangent):
+            if isinstance(other, (int, float)) and other == 0:
+                return self
+            return NotImplemented
+        if self.index is other.index:
+            # the same variables, e.g. after multiplying by a scalar
+            return Sparse_Tangent(self.index, self.value + sign * other.value, self.size)
+        if self.index.size == 0:
+            return other if sign > 0 else -other
+        if other.index.size == 0:
+            return self
+        if self.index.size + other.index.size <= SMALL_MERGE:
+            merged = dict(zip(self.index.tolist(), self.value.tolist()))
+            for idx, value in zip(other.index.tolist(), other.value.tolist()):
+                merged[idx] = merged.get(idx, 0.) + sign * value
+            index = sorted(merged)
+            return Sparse_Tangent(np.array(index), np.array([merged[idx] for idx in index]), self.size)
+
+        # sort the entries of both vectors and sum the repeated indices
+        index = np.concatenate((self.index, other.index))
+        value = np.concatenate((self.value, sign * other.value))
+        order = np.argsort(index, kind='stable')
+        index = index[order]
+        value = value[order]
+        first = np.empty(index.shape, dtype=bool)
+        first[0] = True
+        np.not_equal(index[1:], index[:-1], out=first[1:])
+        return Sparse_Tangent(index[first], np.add.reduceat(value, np.flatnonzero(first)), self.size)
+
+    def __add__(self, other):
+        """Dunder method for adding another derivative vector"""
+        return self._merge(other, 1)
+
+    def __radd__(self, other):
+        """Dunder method for adding another derivative vector from left"""
+        return self._merge(other, 1)
+
+    def __sub__(self, other):
+        """Dunder method for subtracting another derivative vector"""
+        return self._merge(other, -1)
+
+    def __rsub__(self, other):
+        """Dunder method for being subtracted from another derivative vector"""
+        return (-self)._merge(other, 1)
+
+    def __mul__(self, other):
+        """Dunder method for multiplying by a scalar"""
+        if not isinstance(other, (int, float)):
+            return NotImplemented
+        return Sparse_Tangent(self.index, self.value * other, self.size)
+
+    def __rmul__(self, other):
+        """Dunder method for multiplying by a scalar from left"""
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        """Dunder method for dividing by a scalar"""
+        if not isinstance(other, (int, float)):
+            return NotImplemented
+        return Sparse_Tangent(self.index, self.value / other, self.size)
+
+    def __neg__(self):
+        """Dunder method for taking the negative"""
+        return Sparse_Tangent(self.index, -self.value, self.size)
+
+    def __eq__(self, other):
+        """Dunder method for checking equality of the dense vectors"""
+        if isinstance(other, Sparse_Tangent):
+            other = other.toarray()
+        return np.array_equal(self.toarray(), other)
+
+    def __ne__(self, other):
+        """Dunder method for checking inequality of the dense vectors"""
+        return not self.__eq__(other)
+
+    def toarray(self):
+        """Returns the dense derivative vector."""
+        dense = np.zeros((self.size,))
+        dense[self.index] = self.value
+        return dense
+
+    def __repr__(self):
+        return 'Sparse_Tangent(' + str(self.index.tolist()) + ', ' + str(self.value) + ', ' + str(self.size) + ')'
+
+    def __str__(self):
+        return self.__repr__()
+
+
+class Sparse_Jacobian:
+    def __init__(self, row, col, data, shape):
+        """Initiate a Jacobian stored in coordinate (COO) format.
+         INPUTS
+         =======
+         self: Sparse_Jacobian object
+         row: int array, the function of each stored entry
+         col: int array, the variable of each stored entry
+         data: float array, the stored entries
+         shape: tuple, (number of functions, number of variables)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         The entries are sorted by row and then by column, so the compressed sparse row (CSR)
+         arrays are obtained without sorting.
+
+         EXAMPLES
+         =========
+         >>> J = Sparse_Jacobian.from_tangents([Sparse_Tangent(np.array([0, 2]), np.array([1., 2.]), 3)], 3)
+         >>> J.tocsr()
+         (array([1., 2.]), array([0, 2]), array([0, 2]))
+         >>> J.toarray()
+         array([[1., 0., 2.]])
+        """
+        self.row = row
+        self.col = col
+        self.data = data
+        self.shape = shape
+
+    @staticmethod
+    def from_tangents(tangents, num_var):
+        """Build the Jacobian from the derivative vector of each function.
+         INPUTS
+         =======
+         tangents: list, the Sparse_Tangent of each function (None for a constant function)
+         num_var: int, the number of variables
+
+         RETURNS
+         ========
+         output: Sparse_Jacobian
+        """
+        tangents = [Sparse_Tangent(np.zeros((0,), dtype=int), np.zeros((0,)), num_var) if i is None else i
+            for i in tangents]
+        counts = [i.index.size for i in tangents]
+        if not tangents:
+            return Sparse_Jacobian(np.zeros((0,), dtype=int), np.zeros((0,), dtype=int), np.zeros((0,)), (0, num_var))
+        row = np.repeat(np.arange(len(tangents)), counts)
+        col = np.concatenate([i.index for i in tangents]).astype(int)
+        data = np.concatenate([i.value for i in tangents]).astype(float)
+        return Sparse_Jacobian(row, col, data, (len(tangents), num_var))
+
+    @property
+    def nnz(self):
+        """The number of stored entries."""
+        return self.data.size
+
+    def tocoo(self):
+        """Returns the coordinate format arrays (row, col, data)."""
+        return self.row, self.col, self.data
+
+    def tocsr(self):
+        """Returns the compressed sparse row arrays (data, indices, indptr), as taken by scipy.sparse.csr_matrix."""
+        indptr = np.zeros((self.shape[0] + 1,), dtype=int)
+        np.cumsum(np.bincount(self.row, minlength=self.shape[0]), out=indptr[1:])
+        return self.data, self.col, indptr
+
+    def toarray(self):
+        """Returns the dense Jacobian."""
+        dense = np.zeros(self.shape)
+        dense[self.row, self.col] = self.data
+        return dense
+
+    def __repr__(self):
+        return 'Sparse_Jacobian(shape=' + str(self.shape) + ', nnz=' + str(self.nnz) + ')'
+
+    def __str__(self):
+        return self.__repr__()
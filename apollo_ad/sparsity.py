@@ -0,0 +1,156 @@
+import numpy as np
+
+
+class Sparsity_Pattern:
+    def __init__(self, row, col, shape):
+        """Initiate the structural sparsity pattern of a Jacobian.
+         INPUTS
+         =======
+         self: Sparsity_Pattern object
+         row: int array, the function of each structural nonzero
+         col: int array, the variable of each structural nonzero
+         shape: tuple, (number of functions, number of variables)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         The entries are sorted by row and then by column, as in Sparse_Jacobian. An entry is
+         structural: the function depends on the variable through the parsed expression, even if
+         the derivative happens to be 0 at a given point (e.g. 'x + y - x').
+
+         EXAMPLES
+         =========
+         >>> e = Expression(['x0 - 2 * x1', 'x1 * x2'], {'x0': 0, 'x1': 1, 'x2': 2})
+         >>> p = Sparsity_Pattern.from_expression(e, 3)
+         >>> p.toarray()
+         array([[ True,  True, False],
+                [False,  True,  True]])
+        """
+        self.row = row
+        self.col = col
+        self.shape = shape
+        self._column_colors = None
+        self._row_colors = None
+
+    @staticmethod
+    def from_expression(expression, num_var):
+        """Detect the pattern from the variables reaching the root of each function.
+         INPUTS
+         =======
+         expression: Expression, the parsed functions
+         num_var: int, the number of variables
+
+         RETURNS
+         ========
+         output: Sparsity_Pattern
+        """
+        reach = expression.reach()
+        cols = [sorted(reach[root]) for root in expression.roots]
+        row = np.repeat(np.arange(len(cols)), [len(i) for i in cols]).astype(int)
+        col = np.array([j for i in cols for j in i], dtype=int)
+        return Sparsity_Pattern(row, col, (len(cols), num_var))
+
+    @property
+    def nnz(self):
+        """The number of structural nonzeros."""
+        return self.col.size
+
+    def toarray(self):
+        """Returns the dense boolean pattern."""
+        dense = np.zeros(self.shape, dtype=bool)
+        dense[self.row, self.col] = True
+        return dense
+
+    def column_colors(self):
+        """Greedy coloring of the columns: two variables get different colors if a function depends on both.
+         INPUTS
+         =======
+         self: Sparsity_Pattern object
+
+         RETURNS
+         ========
+         output: int array with the color of each variable
+
+         NOTES
+         =====
+         The variables of one color never appear in the same function, so a single forward pass
+         seeded with the sum of their unit vectors gives each of their derivatives separately.
+         Columns are visited from the largest number of nonzeros down, and each takes the smallest
+         color unused by the columns it shares a row with. A banded Jacobian of bandwidth b gets
+         2 b + 1 colors whatever its size.
+
+         EXAMPLES
+         =========
+         >>> e = Expression(['x0 + x1', 'x1 * x2', 'x2 - x3'], {'x0': 0, 'x1': 1, 'x2': 2, 'x3': 3})
+         >>> Sparsity_Pattern.from_expression(e, 4).column_colors()
+         array([1, 0, 1, 0])
+        """
+        if self._column_colors is None:
+            self._column_colors = _greedy_coloring(self.row, self.col, self.shape[0], self.shape[1])
+        return self._column_colors
+
+    def row_colors(self):
+        """Greedy coloring of the rows: two functions get different colors if they depend on a common variable.
+         INPUTS
+         =======
+         self: Sparsity_Pattern object
+
+         RETURNS
+         ========
+         output: int array with the color of each function
+
+         NOTES
+         =====
+         The functions of one color never share a variable, so a single reverse sweep from the sum of
+         their outputs gives each of their gradients separately.
+        """
+        if self._row_colors is None:
+            self._row_colors = _greedy_coloring(self.col, self.row, self.shape[1], self.shape[0])
+        return self._row_colors
+
+    def __repr__(self):
+        return 'Sparsity_Pattern(shape=' + str(self.shape) + ', nnz=' + str(self.nnz) + ')'
+
+    def __str__(self):
+        return self.__repr__()
+
+
+def _num_colors(colors):
+    """Returns the number of colors of a coloring."""
+    return int(colors.max()) + 1 if colors.size else 0
+
+
+def _greedy_coloring(row, col, num_row, num_col):
+    """Color the columns so that the columns sharing a row have different colors.
+     INPUTS
+     =======
+     row: int array, the row of each nonzero
+     col: int array, the column of each nonzero
+     num_row: int, the number of rows
+     num_col: int, the number of columns
+
+     RETURNS
+     ========
+     output: int array with the color of each column
+    """
+    cols_of_row = [[] for _ in range(num_row)]
+    rows_of_col = [[] for _ in range(num_col)]
+    for i, j in zip(row.tolist(), col.tolist()):
+        cols_of_row[i].append(j)
+        rows_of_col[j].append(i)
+
+    colors = [-1] * num_col
+    # the stable sort keeps the natural order between columns of the same degree
+    order = sorted(range(num_col), key=lambda j: -len(rows_of_col[j]))
+    for j in order:
+        forbidden = set()
+        for i in rows_of_col[j]:
+            for k in cols_of_row[i]:
+                forbidden.add(colors[k])
+        color = 0
+        while color in forbidden:
+            color += 1
+        colors[j] = color
+    return np.array(colors, dtype=int)
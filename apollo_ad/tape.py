@@ -0,0 +1,641 @@
+import numpy as np
+
+
+# the operation of each node, so that a tape can be evaluated again at new inputs (see Tape.replay)
+INPUT, ADD, ADD_C, SUB, RSUB_C, MUL, MUL_C, DIV, DIV_C, RDIV_C, NEG, ABS, POW, POW_C, RPOW_C, \
+    EXP, LOG, SIN, COS, TAN, ARCSIN, ARCCOS, ARCTAN, SINH, COSH, TANH = range(26)
+
+# value and partial derivatives of a node from the values a, b of its parents and its constant c,
+# the same formulas as Tape_Variable for Numpy scalars as well as for arrays of nodes
+_REPLAY = {
+    ADD: lambda a, b, c: (a + b, 1., 1.),
+    ADD_C: lambda a, b, c: (a + c, 1., 0.),
+    SUB: lambda a, b, c: (a - b, 1., -1.),
+    RSUB_C: lambda a, b, c: (c - a, -1., 0.),
+    MUL: lambda a, b, c: (a * b, b, a),
+    MUL_C: lambda a, b, c: (a * c, c, 0.),
+    DIV: lambda a, b, c: (a / b, 1 / b, -a / b ** 2),
+    DIV_C: lambda a, b, c: (a / c, 1 / c, 0.),
+    RDIV_C: lambda a, b, c: (c / a, -c / a ** 2, 0.),
+    NEG: lambda a, b, c: (-a, -1., 0.),
+    ABS: lambda a, b, c: (abs(a), (a >= 0) * 2. - 1., 0.),
+    POW: lambda a, b, c: (a ** b, b * a ** (b - 1), a ** b * np.log(a)),
+    POW_C: lambda a, b, c: (a ** c, c * a ** (c - 1), 0.),
+    RPOW_C: lambda a, b, c: (c ** a, c ** a * np.log(c), 0.),
+    EXP: lambda a, b, c: (np.exp(a), np.exp(a), 0.),
+    LOG: lambda a, b, c: (np.log(a), 1.0 / a, 0.),
+    SIN: lambda a, b, c: (np.sin(a), np.cos(a), 0.),
+    COS: lambda a, b, c: (np.cos(a), -np.sin(a), 0.),
+    TAN: lambda a, b, c: (np.tan(a), 1 / np.power(np.cos(a), 2), 0.),
+    ARCSIN: lambda a, b, c: (np.arcsin(a), 1 / np.sqrt(1 - a ** 2), 0.),
+    ARCCOS: lambda a, b, c: (np.arccos(a), -1 / np.sqrt(1 - a ** 2), 0.),
+    ARCTAN: lambda a, b, c: (np.arctan(a), 1 / (1 + np.power(a, 2)), 0.),
+    SINH: lambda a, b, c: (np.sinh(a), np.cosh(a), 0.),
+    COSH: lambda a, b, c: (np.cosh(a), np.sinh(a), 0.),
+    TANH: lambda a, b, c: (np.tanh(a), 1 / np.power(np.cosh(a), 2), 0.),
+}
+
+# the comparisons recorded as guards of the control flow
+_COMPARE = [np.less, np.less_equal, np.greater, np.greater_equal, np.equal]
+LT, LE, GT, GE, EQ = range(5)
+
+
+class Tape:
+    # use the level-by-level numpy sweep when the graph is at least this wide on average
+    vectorize_width = 32
+
+    def __init__(self, capacity=1024):
+        """A compact, array-backed computational graph for the reverse mode.
+         INPUTS
+         =======
+         self: Tape object
+         capacity: int, the number of nodes to preallocate (the arrays double when full)
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Every operation on a Tape_Variable appends one node to the tape, in creation order
+         (which is a topological order). A node is stored as its value, at most two parent
+         indices (-1 for none) with the local partial derivative for each, its level
+         (1 + the level of its deepest parent, 0 for an input), its operation and the constant
+         operand of that operation (e.g. 2 in x * 2). That is 53 bytes per node, against several
+         hundred bytes for a Reverse_Mode object with its child list.
+
+         Comparisons between Tape_Variables (or with a constant) are recorded as guards, so
+         that replay() can tell when the recorded function would take another branch.
+
+         EXAMPLES
+         =========
+         >>> t = Tape()
+         >>> x = t.variable(3)
+         >>> y = t.variable(4)
+         >>> f = x * y + Tape_Variable.exp(x)
+         >>> f.derivative([x, y])
+         (32.08553692318767, array([24.08553692,  3.        ]))
+        """
+        self.size = 0
+        self.value = np.empty((capacity,))
+        self.parent1 = np.empty((capacity,), dtype=np.int64)
+        self.parent2 = np.empty((capacity,), dtype=np.int64)
+        self.partial1 = np.empty((capacity,))
+        self.partial2 = np.empty((capacity,))
+        self.level = np.empty((capacity,), dtype=np.int32)
+        self.op = np.empty((capacity,), dtype=np.int8)
+        self.const = np.empty((capacity,))
+        self.inputs = []
+        # guards: left node, right node (-1 for a constant), constant, comparison, recorded result
+        self.guards = []
+        self._schedule = None
+
+    @property
+    def capacity(self):
+        return self.value.shape[0]
+
+    @property
+    def nbytes(self):
+        """The memory used by the tape arrays, in bytes."""
+        return sum(i.nbytes for i in (self.value, self.parent1, self.parent2,
+                                      self.partial1, self.partial2, self.level, self.op, self.const))
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        capacity = 2 * self.capacity
+        for name in ('value', 'parent1', 'parent2', 'partial1', 'partial2', 'level', 'op', 'const'):
+            old = getattr(self, name)
+            new = np.empty((capacity,), dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def record(self, value, parent1=-1, partial1=0., parent2=-1, partial2=0., op=INPUT, const=0.):
+        """Append a node to the tape.
+         INPUTS
+         =======
+         self: Tape object
+         value: float, the value of the node
+         parent1, parent2: int, the indices of the parents (-1 for none)
+         partial1, partial2: float, the partial derivative of the node with respect to each parent
+         op: int, the operation of the node (INPUT for an input)
+         const: float, the constant operand of the operation
+
+         RETURNS
+         ========
+         index: int, the index of the new node
+        """
+        idx = self.size
+        if idx == self.capacity:
+            self._grow()
+        self.value[idx] = value
+        self.parent1[idx] = parent1
+        self.parent2[idx] = parent2
+        self.partial1[idx] = partial1
+        self.partial2[idx] = partial2
+        self.op[idx] = op
+        self.const[idx] = const
+        level = 0
+        if parent1 >= 0:
+            level = self.level[parent1] + 1
+        if parent2 >= 0:
+            level = max(level, self.level[parent2] + 1)
+        self.level[idx] = level
+        self.size = idx + 1
+        return idx
+
+    def variable(self, var):
+        """Create an input variable on this tape.
+         INPUTS
+         =======
+         self: Tape object
+         var: float/int, the value of this variable
+
+         RETURNS
+         ========
+         output: Tape_Variable
+        """
+        if not isinstance(var, (int, float)):
+            raise TypeError('You did not enter a valid integer or float.')
+        self.inputs.append(self.size)
+        return Tape_Variable(self, self.record(var), var)
+
+    def guard(self, left, right, const, compare, result):
+        """Record the result of a comparison the control flow may depend on.
+         INPUTS
+         =======
+         self: Tape object
+         left: int, the node on the left of the comparison
+         right: int, the node on the right (-1 for a constant)
+         const: float, the constant on the right
+         compare: int, LT, LE, GT, GE or EQ
+         result: bool, the result at the recorded values
+
+         RETURNS
+         ========
+         result: bool
+        """
+        self.guards.append((left, right, const, compare, result))
+        return result
+
+    def replay(self, values):
+        """Evaluate the recorded nodes again at new input values, without recording.
+         INPUTS
+         =======
+         self: Tape object
+         values: list of int/float, the new value of each input, in the order of creation
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         The values and the partial derivatives of every node are recomputed from the operation and
+         the constant of each node, level by level with one Numpy call per operation for a wide tape,
+         and node by node otherwise. The next gradient() sweeps the new partial derivatives.
+
+         A ValueError is raised if a recorded comparison gives another result at the new values
+         (the function would take another branch, and the tape does not describe it) or if a node
+         is not defined there. The tape then has to be recorded again, as Taped_Function does.
+         The Tape_Variable handles keep their recorded `var`; derivative() returns the new value.
+
+         EXAMPLES
+         =========
+         >>> t = Tape()
+         >>> x = t.variable(3)
+         >>> f = x * x + Tape_Variable.sin(x)
+         >>> t.replay([1.])
+         >>> f.derivative([x])
+         (1.8414709848078965, array([2.54030231]))
+        """
+        if len(values) != len(self.inputs):
+            raise ValueError('Expected one value per input (' + str(len(self.inputs)) + ').')
+        check = [1 if isinstance(i, (int, float)) else 0 for i in values]
+        if len(check) != sum(check):
+            raise TypeError('You did not enter a valid integer or float.')
+
+        n = self.size
+        if self._schedule is None or self._schedule[0] != n:
+            self._schedule = (n, self._plan(n))
+        plan = self._schedule[1]
+        value, partial1, partial2 = self.value, self.partial1, self.partial2
+        value[self.inputs] = values
+
+        with np.errstate(all='ignore'):
+            if plan[0] == 'levels':
+                for level in plan[1]:
+                    for op, idx in level:
+                        v, d1, d2 = _REPLAY[op](value[self.parent1[idx]], value[self.parent2[idx]], self.const[idx])
+                        value[idx] = v
+                        partial1[idx] = d1
+                        partial2[idx] = d2
+            else:
+                # deep and narrow tape: one node at a time, on Numpy scalars so that a node outside
+                # its domain gives nan or inf like the arrays
+                for idx, op, p1, p2, c in plan[1]:
+                    v, d1, d2 = _REPLAY[op](value[p1], value[p2], c)
+                    value[idx] = v
+                    partial1[idx] = d1
+                    partial2[idx] = d2
+        if not np.all(np.isfinite(value[:n])):
+            raise ValueError('The recorded function is not defined at the new input values.')
+
+        if self.guards:
+            left, right, const, compare, result = (np.array(i) for i in zip(*self.guards))
+            other = np.where(right >= 0, value[right], const)
+            for code, fct in enumerate(_COMPARE):
+                mask = compare == code
+                if np.any(fct(value[left[mask]], other[mask]) != result[mask]):
+                    raise ValueError('A recorded comparison gives another result at the new input values, '
+                                     'the tape has to be recorded again.')
+
+    def _plan(self, n):
+        """Returns the order in which replay() evaluates the first n nodes."""
+        level, op = self.level[:n], self.op[:n]
+        num_level = int(level.max()) + 1 if n else 1
+        if n >= self.vectorize_width * num_level:
+            # the nodes of a level only depend on lower levels: group them by operation
+            order = np.lexsort((op, level))
+            plan = []
+            for lv in range(1, num_level):
+                nodes = order[np.searchsorted(level[order], lv):np.searchsorted(level[order], lv + 1)]
+                ops = op[nodes]
+                plan.append([(int(i), nodes[ops == i]) for i in np.unique(ops)])
+            return ('levels', plan)
+        nodes = np.flatnonzero(op != INPUT)
+        return ('nodes', list(zip(nodes.tolist(), op[nodes].tolist(), self.parent1[nodes].tolist(),
+                                  self.parent2[nodes].tolist(), self.const[nodes].tolist())))
+
+    def gradient(self, output, seed=1.):
+        """Sweep the tape backwards from `output`.
+         INPUTS
+         =======
+         self: Tape object
+         output: int/Tape_Variable, the node to differentiate
+         seed: float, the seed of the output
+
+         RETURNS
+         ========
+         adjoint: a Numpy array with the derivative of the output with respect to every node
+            recorded up to the output
+        """
+        out = getattr(output, 'index', output)
+        n = out + 1
+        parent1, parent2 = self.parent1[:n], self.parent2[:n]
+        partial1, partial2 = self.partial1[:n], self.partial2[:n]
+        level = self.level[:n]
+        num_level = int(level.max()) + 1
+
+        if n >= self.vectorize_width * num_level:
+            # nodes of the same level never depend on each other, so a whole level is
+            # accumulated into its parents at once
+            adjoint = np.zeros((n,))
+            adjoint[out] = seed
+            order = np.argsort(level, kind='stable')
+            bounds = np.searchsorted(level[order], np.arange(num_level + 1))
+            for lv in range(num_level - 1, 0, -1):
+                idx = order[bounds[lv]:bounds[lv + 1]]
+                adj = adjoint[idx]
+                np.add.at(adjoint, parent1[idx], partial1[idx] * adj)
+                mask = parent2[idx] >= 0
+                np.add.at(adjoint, parent2[idx][mask], partial2[idx][mask] * adj[mask])
+            return adjoint
+
+        # deep and narrow graph: one pass over the nodes in reverse creation order
+        adjoint = [0.] * n
+        adjoint[out] = seed
+        p1, p2 = parent1.tolist(), parent2.tolist()
+        d1, d2 = partial1.tolist(), partial2.tolist()
+        for idx in range(out, -1, -1):
+            adj = adjoint[idx]
+            if adj:
+                if p1[idx] >= 0:
+                    adjoint[p1[idx]] += d1[idx] * adj
+                    if p2[idx] >= 0:
+                        adjoint[p2[idx]] += d2[idx] * adj
+        return np.array(adjoint)
+
+
+class Tape_Variable:
+    __slots__ = ('tape', 'index', 'var')
+
+    def __init__(self, tape, index, var):
+        """A handle on a node of a Tape. Operations on it record new nodes on the same tape.
+         INPUTS
+         =======
+         self: Tape_Variable object
+         tape: Tape, the tape the node lives on
+         index: int, the index of the node
+         var: float, the value of the node
+
+         RETURNS
+         ========
+
+         EXAMPLES
+         =========
+         >>> t = Tape()
+         >>> x = t.variable(3)
+         >>> x * 2
+         Value: 6 , Index: 1
+        """
+        self.tape = tape
+        self.index = index
+        self.var = var
+
+    def _unary(self, var, der, op, const=0.):
+        return Tape_Variable(self.tape, self.tape.record(var, self.index, der, op=op, const=const), var)
+
+    def _binary(self, other, var, der_self, der_other, op):
+        if other.tape is not self.tape:
+            raise ValueError('Both variables should be recorded on the same tape.')
+        return Tape_Variable(self.tape, self.tape.record(var, self.index, der_self, other.index, der_other, op), var)
+
+    def _compare(self, other, compare, result):
+        """Record the comparison of self with other (Tape_Variable/int/float) as a guard of the tape."""
+        if isinstance(other, Tape_Variable) and other.tape is self.tape:
+            return self.tape.guard(self.index, other.index, 0., compare, result)
+        return self.tape.guard(self.index, -1, getattr(other, 'var', other), compare, result)
+
+    def derivative(self, inputs, seed=1.):
+        """Calcuate the gradients from this node respect to each input variable.
+          INPUTS
+          =======
+          self: Tape_Variable object
+          inputs: list of Tape_Variable, each individual variable in the function
+          seed: float, the seed of this node
+
+          RETURNS
+          ========
+          value: the value of the computation
+          derivative: a Numpy array that contains the derivative respect to each variable
+
+          EXAMPLES
+          =========
+          >>> t = Tape()
+          >>> x, y = t.variable(3), t.variable(4)
+          >>> f = x * y
+          >>> f.derivative([x, y])
+          (12.0, array([4., 3.]))
+        """
+        adjoint = self.tape.gradient(self, seed)
+        # the value on the tape, which replay() may have changed since `var` was recorded
+        return float(self.tape.value[self.index]), np.array([adjoint[i.index] if i.index < adjoint.shape[0] else 0. for i in inputs])
+
+    def __add__(self, other):
+        """Record self + other."""
+        if isinstance(other, Tape_Variable):
+            return self._binary(other, self.var + other.var, 1., 1., ADD)
+        return self._unary(self.var + other, 1., ADD_C, other)
+
+    def __radd__(self, other):
+        """Record other + self."""
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        """Record self - other."""
+        if isinstance(other, Tape_Variable):
+            return self._binary(other, self.var - other.var, 1., -1., SUB)
+        return self._unary(self.var - other, 1., ADD_C, -other)
+
+    def __rsub__(self, other):
+        """Record other - self."""
+        return self._unary(other - self.var, -1., RSUB_C, other)
+
+    def __mul__(self, other):
+        """Record self * other."""
+        if isinstance(other, Tape_Variable):
+            return self._binary(other, self.var * other.var, other.var, self.var, MUL)
+        return self._unary(self.var * other, other, MUL_C, other)
+
+    def __rmul__(self, other):
+        """Record other * self."""
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        """Record self / other."""
+        if isinstance(other, Tape_Variable):
+            return self._binary(other, self.var / other.var, 1 / other.var, -self.var / other.var ** 2, DIV)
+        return self._unary(self.var / other, 1 / other, DIV_C, other)
+
+    def __rtruediv__(self, other):
+        """Record other / self."""
+        return self._unary(other / self.var, -other / self.var ** 2, RDIV_C, other)
+
+    def __neg__(self):
+        """Record -self."""
+        return self._unary(-self.var, -1., NEG)
+
+    def __abs__(self):
+        """Record abs(self)."""
+        return self._unary(abs(self.var), -1. if self.var < 0 else 1., ABS)
+
+    def __pow__(self, exponent):
+        """Record self ** exponent, the exponent can be a Tape_Variable or int/float."""
+        if isinstance(exponent, Tape_Variable):
+            if self.var <= 0:
+                raise ValueError('Base has to be > 0 when the exponent is a variable')
+            var = self.var ** exponent.var
+            return self._binary(exponent, var, exponent.var * self.var ** (exponent.var - 1), var * np.log(self.var), POW)
+        if self.var <= 0 and exponent < 1:
+            raise ValueError('Base has to be > 0, and the exponent has to be >= 1')
+        return self._unary(self.var ** exponent, exponent * self.var ** (exponent - 1), POW_C, exponent)
+
+    def __rpow__(self, other):
+        """Record other ** self."""
+        if other < 0 and self.var < 1:
+            raise ValueError('Please input a non-negative value for the base. The exponent has to be >= 1')
+        var = other ** self.var
+        return self._unary(var, var * np.log(other), RPOW_C, other)
+
+    def __eq__(self, other):
+        """Compare the values, a scalar is not equal to a variable."""
+        if isinstance(other, Tape_Variable):
+            return self._compare(other, EQ, self.var == other.var)
+        try:
+            return self.var == other.var
+        except AttributeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        """Compare the values, the result is recorded as a guard of the tape."""
+        return self._compare(other, LT, self.var < getattr(other, 'var', other))
+
+    def __le__(self, other):
+        return self._compare(other, LE, self.var <= getattr(other, 'var', other))
+
+    def __gt__(self, other):
+        return self._compare(other, GT, self.var > getattr(other, 'var', other))
+
+    def __ge__(self, other):
+        return self._compare(other, GE, self.var >= getattr(other, 'var', other))
+
+    @staticmethod
+    def sqrt(variable):
+        """Returns the square root of `variable` (Tape_Variable/int/float)."""
+        if variable < 0:
+            raise ValueError('Cannot take sqrt of a negative value')
+        return variable ** (1 / 2)
+
+    @staticmethod
+    def exp(variable):
+        """Returns e to the value (Tape_Variable/int/float)."""
+        try:
+            var = np.exp(variable.var)
+            return variable._unary(var, var, EXP)
+        except AttributeError:
+            return np.exp(variable)
+
+    @staticmethod
+    def log(variable):
+        """Returns the natural log of `variable` (Tape_Variable/int/float)."""
+        if variable <= 0:
+            raise ValueError('Please input a positive number')
+        try:
+            return variable._unary(np.log(variable.var), 1.0 / variable.var, LOG)
+        except AttributeError:
+            return np.log(variable)
+
+    @staticmethod
+    def sin(variable):
+        """Returns the sine of `variable` (Tape_Variable/int/float)."""
+        try:
+            return variable._unary(np.sin(variable.var), np.cos(variable.var), SIN)
+        except AttributeError:
+            return np.sin(variable)
+
+    @staticmethod
+    def cos(variable):
+        """Returns the cosine of `variable` (Tape_Variable/int/float)."""
+        try:
+            return variable._unary(np.cos(variable.var), -np.sin(variable.var), COS)
+        except AttributeError:
+            return np.cos(variable)
+
+    @staticmethod
+    def tan(variable):
+        """Returns the tangent of `variable` (Tape_Variable/int/float)."""
+        try:
+            if variable.var % np.pi == (np.pi / 2):
+                raise ValueError(
+                    'Cannot take the tangent of this value since it is a multiple of pi/2 + (pi * n), where n is a positive integer')
+            return variable._unary(np.tan(variable.var), 1 / np.power(np.cos(variable.var), 2), TAN)
+        except AttributeError:
+            return np.tan(variable)
+
+    @staticmethod
+    def arcsin(variable):
+        """Returns the arcsine of `variable` (Tape_Variable/int/float)."""
+        try:
+            if variable.var > 1 or variable.var < -1:
+                raise ValueError('Please input -1 <= x <=1')
+            return variable._unary(np.arcsin(variable.var), 1 / np.sqrt(1 - variable.var ** 2), ARCSIN)
+        except AttributeError:
+            return np.arcsin(variable)
+
+    @staticmethod
+    def arccos(variable):
+        """Returns the arccosine of `variable` (Tape_Variable/int/float)."""
+        try:
+            if variable.var > 1 or variable.var < -1:
+                raise ValueError('Please input -1 <= x <=1')
+            return variable._unary(np.arccos(variable.var), -1 / np.sqrt(1 - variable.var ** 2), ARCCOS)
+        except AttributeError:
+            return np.arccos(variable)
+
+    @staticmethod
+    def arctan(variable):
+        """Returns the arctangent of `variable` (Tape_Variable/int/float)."""
+        try:
+            return variable._unary(np.arctan(variable.var), 1 / (1 + np.power(variable.var, 2)), ARCTAN)
+        except AttributeError:
+            return np.arctan(variable)
+
+    @staticmethod
+    def sinh(variable):
+        """Returns the hyperbolic sine of `variable` (Tape_Variable/int/float)."""
+        try:
+            return variable._unary(np.sinh(variable.var), np.cosh(variable.var), SINH)
+        except AttributeError:
+            return np.sinh(variable)
+
+    @staticmethod
+    def cosh(variable):
+        """Returns the hyperbolic cosine of `variable` (Tape_Variable/int/float)."""
+        try:
+            return variable._unary(np.cosh(variable.var), np.sinh(variable.var), COSH)
+        except AttributeError:
+            return np.cosh(variable)
+
+    @staticmethod
+    def tanh(variable):
+        """Returns the hyperbolic tangent of `variable` (Tape_Variable/int/float)."""
+        try:
+            return variable._unary(np.tanh(variable.var), 1 / np.power(np.cosh(variable.var), 2), TANH)
+        except AttributeError:
+            return np.tanh(variable)
+
+    def __repr__(self):
+        return 'Value: ' + str(self.var) + ' , Index: ' + str(self.index)
+
+    def __str__(self):
+        return 'Value: ' + str(self.var) + ' , Index: ' + str(self.index)
+
+
+class Taped_Function:
+    def __init__(self, fct):
+        """Record a function on a Tape once, and replay the tape at each new point.
+         INPUTS
+         =======
+         self: Taped_Function object
+         fct: function, takes one Tape_Variable per input and returns a Tape_Variable
+
+         RETURNS
+         ========
+
+         NOTES
+         =====
+         Calling the object with the input values replays the tape recorded at an earlier point,
+         and records it again only when a comparison in `fct` (e.g. `if x < 0:`) gives another
+         result or a node is not defined at the new point. `records` and `replays` count both.
+         Control flow that does not go through the comparisons of Tape_Variable (e.g. on float(x))
+         is not detected.
+
+         EXAMPLES
+         =========
+         >>> f = Taped_Function(lambda x, y: x * y if x < y else x - y)
+         >>> f(1, 2), f(3, 4)
+         ((2.0, array([2., 1.])), (12.0, array([4., 3.])))
+         >>> f(5, 4), f.records, f.replays
+         ((1.0, array([ 1., -1.])), 2, 1)
+        """
+        self.fct = fct
+        self.tape = None
+        self.records = 0
+        self.replays = 0
+
+    def __call__(self, *values):
+        """Returns the value of the function and its gradient at `values`."""
+        if self.tape is not None:
+            try:
+                self.tape.replay(values)
+                self.replays += 1
+                return self._derivative()
+            except ValueError:
+                # another branch: record the function again at this point
+                pass
+        # the new tape is kept only once `fct` has been recorded on it completely
+        tape = Tape()
+        inputs = [tape.variable(i) for i in values]
+        output = self.fct(*inputs)
+        self.tape, self._inputs, self._output = tape, inputs, output
+        self.records += 1
+        return self._derivative()
+
+    def _derivative(self):
+        if not isinstance(self._output, Tape_Variable):
+            # a constant function
+            return self._output, np.zeros((len(self._inputs),))
+        return self._output.derivative(self._inputs)
@@ -0,0 +1,99 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..batch import *
+
+
+class TestBatch:
+
+    def test_stream(self):
+        fct = ['x * y', 'sin(x)']
+        x = np.linspace(0, 1, 10)
+        z = Forward({'x': x, 'y': 2.}, fct)
+        chunks = list(stream(fct, ({'x': i, 'y': 2.} for i in x), chunk=4))
+        assert [values.shape for values, _ in chunks] == [(4, 2), (4, 2), (2, 2)]
+        assert [jacobian.shape for _, jacobian in chunks] == [(4, 2, 2), (4, 2, 2), (2, 2, 2)]
+        assert np.allclose(np.concatenate([values for values, _ in chunks]), z.var)
+        assert np.allclose(np.concatenate([jacobian for _, jacobian in chunks]), z.der)
+
+        # arrays of values in the order of var_names, and a seed
+        chunks = list(stream(fct, np.stack([x, np.full(10, 2.)], axis=1), ['x', 'y'], 100, {'x': 1, 'y': 0}))
+        assert len(chunks) == 1
+        assert np.allclose(chunks[0][1], Forward({'x': x, 'y': 2.}, fct, {'x': 1, 'y': 0}).der)
+        assert list(stream(fct, [])) == []
+
+    def test_lazy(self):
+        consumed = []
+
+        def points():
+            i = 0
+            while True:
+                consumed.append(i)
+                yield {'x': float(i)}
+                i += 1
+
+        # an endless iterator is only read as far as the chunks requested
+        results = stream(['x ** 2'], points(), chunk=3)
+        values, jacobian = next(results)
+        assert np.array_equal(values[:, 0], [0., 1., 4.]) and np.array_equal(jacobian[:, 0, 0], [0., 2., 4.])
+        values, _ = next(results)
+        assert np.array_equal(values[:, 0], [9., 16., 25.])
+        assert len(consumed) <= 7
+
+    def test_errors(self):
+        with pytest.raises(ValueError):
+            next(stream(['x'], [[1.]]))
+        with pytest.raises(ValueError):
+            next(stream(['x'], [{'x': 1}], chunk=0))
+        with pytest.raises(KeyError):
+            next(stream(['x'], [{'x': 1}, {'y': 1}]))
+        with pytest.raises(ValueError):
+            next(stream(['x'], [[1., 2.]], ['x']))
+        with pytest.raises(ValueError, match='Points 5 to 6') as e:
+            list(stream(['log(x)'], [{'x': 1.}] * 5 + [{'x': -1.}], chunk=4))
+        assert isinstance(e.value.__cause__, ValueError)
+        with pytest.raises(ValueError, match='Points 1 to 2: ZeroDivisionError'):
+            list(stream(['1 / 0 + x'], [[1.], [2.]], ['x']))
+        # a None point is not the end of the points
+        with pytest.raises(ValueError, match='Expected 1 variable values'):
+            list(stream(['x'], [[1.], None], ['x']))
+
+    def test_batch_evaluate(self, tmp_path):
+        fct = ['x * y', 'sin(x)', '3']
+        points = np.random.rand(1001, 2)
+        z = Forward({'x': points[:, 0], 'y': points[:, 1]}, fct)
+
+        # in memory
+        values, jacobian = batch_evaluate(fct, points, ['x', 'y'], chunk=100)
+        assert np.allclose(values, z.var) and np.allclose(jacobian, z.der)
+
+        # memory-mapped .npy files in and out
+        np.save(str(tmp_path / 'points.npy'), points)
+        values, jacobian = batch_evaluate(fct, str(tmp_path / 'points.npy'), ['x', 'y'],
+                                          out=(str(tmp_path / 'values.npy'), str(tmp_path / 'jacobian.npy')), chunk=64)
+        assert isinstance(jacobian, np.memmap)
+        assert np.allclose(np.load(str(tmp_path / 'values.npy')), z.var)
+        assert np.allclose(np.load(str(tmp_path / 'jacobian.npy')), z.der)
+
+        # caller-supplied buffers, and a memmap input with the columns of other variables
+        mapped = np.memmap(str(tmp_path / 'raw'), dtype=float, mode='w+', shape=(1001, 2))
+        mapped[:] = points[:, ::-1]
+        out = (np.zeros((1001, 3)), np.zeros((1001, 3, 2)))
+        values, jacobian = batch_evaluate(fct, mapped, ['y', 'x'], out=out, seed={'x': 2, 'y': 1})
+        assert values is out[0] and jacobian is out[1]
+        assert np.allclose(jacobian, Forward({'y': points[:, 1], 'x': points[:, 0]}, fct, {'x': 2, 'y': 1}).der)
+
+    def test_batch_evaluate_errors(self):
+        with pytest.raises(ValueError):
+            batch_evaluate(['x'], np.ones((3, 2)), ['x'])
+        with pytest.raises(ValueError):
+            batch_evaluate(['x'], np.ones(3), ['x'])
+        with pytest.raises(ValueError):
+            batch_evaluate(['x'], np.ones((3, 1)), ['x'], out=(np.zeros((2, 1)), np.zeros((3, 1, 1))))
+        with pytest.raises(ValueError):
+            batch_evaluate(['x'], np.ones((3, 1)), ['x'], chunk=0)
+        with pytest.raises(ValueError, match='Points 3 to 3'):
+            batch_evaluate(['log(x)'], np.array([[1.], [2.], [-1.]]), ['x'], chunk=2)
+        with pytest.raises(ValueError, match='Points 1 to 2: ZeroDivisionError') as e:
+            batch_evaluate(['1 / 0 + x'], np.ones((2, 1)), ['x'])
+        assert isinstance(e.value.__cause__, ZeroDivisionError)
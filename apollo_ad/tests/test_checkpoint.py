@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..checkpoint import *
+from ..checkpoint import _split
+
+
+def unrolled(x, y, a, steps):
+    """The gradient of (x * y, x) after `steps` steps, by finite differences."""
+    def final(point):
+        x, y, a = point
+        for _ in range(steps):
+            x, y = x + 0.01 * y, y - 0.01 * np.sin(x) * a
+        return np.array([x * y, x])
+    point = np.array([x, y, a])
+    return np.array([(final(point + 1e-6 * e) - final(point - 1e-6 * e)) / 2e-6 for e in np.eye(3)]).T
+
+
+class TestCheckpoint:
+
+    step = ['x + 0.01 * y', 'y - 0.01 * sin(x) * a', 'a']
+    fct = ['x * y', 'x']
+
+    def test_split(self):
+        # beta(s, t) = C(s + t, s) steps with s checkpoints and t repetitions
+        assert _split(2, 1) == 1
+        # one checkpoint and at most t repetitions reverse t + 1 steps: the first part has t steps
+        assert _split(4, 1) == 3
+        assert _split(10, 2) == 6
+        for n in range(2, 60):
+            for free in range(1, 6):
+                assert 1 <= _split(n, free) <= n - 1
+
+    def test_taped(self):
+        z = Checkpointed({'x': 1., 'y': 0., 'a': 1.5}, self.step, 200, self.fct)
+        assert z.checkpoints == 0 and z.recomputed == 0 and z.overhead == 1.
+        assert z.der.shape == (2, 3) and z.var.shape == (2,)
+        assert np.array_equal(np.round(z.der, 5), np.round(unrolled(1., 0., 1.5, 200), 5))
+
+    def test_budget(self):
+        full = Checkpointed({'x': 1., 'y': 0., 'a': 1.5}, self.step, 200, self.fct)
+        previous = 0
+        for budget in [full.tape_memory // 4, full.tape_memory // 20, full.tape_memory // 100]:
+            z = Checkpointed({'x': 1., 'y': 0., 'a': 1.5}, self.step, 200, self.fct, budget)
+            assert z.memory <= budget
+            assert 0 < z.checkpoints < 200
+            # less memory, more recomputation
+            assert z.recomputed > previous
+            previous = z.recomputed
+            assert np.array_equal(np.round(z.der, 10), np.round(full.der, 10))
+            assert np.array_equal(np.round(z.var, 10), np.round(full.var, 10))
+        assert 'Checkpoints: ' + str(z.checkpoints) in z.__str__()
+
+        # the default functions are the final state
+        z = Checkpointed({'x': 1., 'y': 0., 'a': 1.5}, self.step, 50, budget=5000)
+        assert z.der.shape == (3, 3)
+        assert np.array_equal(z.der[2], [0., 0., 1.])
+
+    def test_batch(self):
+        x = np.array([1., 0.5])
+        full = Checkpointed({'x': x, 'y': 0., 'a': 1.5}, self.step, 100, self.fct)
+        z = Checkpointed({'x': x, 'y': 0., 'a': 1.5}, self.step, 100, self.fct, full.tape_memory // 10)
+        assert z.der.shape == (2, 2, 3) and z.var.shape == (2, 2)
+        assert np.array_equal(np.round(z.der, 10), np.round(full.der, 10))
+        assert np.array_equal(np.round(z.der[1], 5), np.round(unrolled(0.5, 0., 1.5, 100), 5))
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            Checkpointed({'x': 1., 'y': 0., 'a': 1.5}, self.step, 100, self.fct, budget=100)
+        with pytest.raises(ValueError):
+            Checkpointed({'x': 1., 'y': 0.}, self.step, 100)
+        with pytest.raises(ValueError):
+            Checkpointed({'x': 1., 'y': 0., 'a': 1.5}, self.step, 0)
+        with pytest.raises(TypeError):
+            Checkpointed([1., 0., 1.5], self.step, 100)
@@ -0,0 +1,106 @@
+import io
+import json
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..cli import *
+
+
+class TestCLI:
+
+    def test_run(self):
+        spec = {'variables': ['x', 'y'], 'functions': ['x * y', 'sin(x)']}
+        z = Forward({'x': np.array([0.5, 1., 2.]), 'y': np.array([4., 4., 5.])}, spec['functions'])
+
+        # the columns can be in any order, the batches are smaller than the input
+        output = io.StringIO()
+        assert run(spec, io.StringIO('y,x\n4,0.5\n4,1\n5,2\n'), output, 'csv', 'jsonl', batch=2) == 3
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert len(lines) == 3
+        assert np.allclose([line['var'] for line in lines], z.var)
+        assert np.allclose([line['der'] for line in lines], z.der)
+
+        output = io.StringIO()
+        source = io.StringIO('{"x": 0.5, "y": 4}\n\n{"x": 1, "y": 4}\n{"y": 5, "x": 2}\n')
+        run(spec, source, output, 'jsonl', 'csv')
+        rows = output.getvalue().splitlines()
+        assert rows[0] == 'F1,F2,dF1/dx,dF1/dy,dF2/dx,dF2/dy'
+        table = np.array([[float(i) for i in row.split(',')] for row in rows[1:]])
+        assert np.allclose(table[:, :2], z.var) and np.allclose(table[:, 2:], z.der.reshape(3, -1))
+
+        # defaults and seeds
+        spec = {'variables': {'x': None, 'y': 4}, 'functions': ['x * y'], 'seed': {'x': 2, 'y': 0}}
+        output = io.StringIO()
+        run(spec, io.StringIO('x\n1\n'), output, 'csv', 'jsonl')
+        assert json.loads(output.getvalue()) == {'var': [4.], 'der': [[8., 0.]]}
+
+    def test_errors(self):
+        spec = {'variables': ['x'], 'functions': ['log(x)']}
+        with pytest.raises(ValueError):
+            run({'functions': ['x']}, io.StringIO('x\n1\n'), io.StringIO())
+        with pytest.raises(TypeError):
+            run({'variables': ['x'], 'functions': [1]}, io.StringIO('x\n1\n'), io.StringIO())
+        with pytest.raises(ValueError):
+            run(spec, io.StringIO('y\n1\n'), io.StringIO())
+        with pytest.raises(KeyError):
+            run(spec, io.StringIO('{"y": 1}\n'), io.StringIO(), 'jsonl')
+        with pytest.raises(ValueError):
+            run(spec, io.StringIO('x\n1\n'), io.StringIO(), 'xml')
+        with pytest.raises(ValueError):
+            run(spec, io.StringIO('x\n1\n'), io.StringIO(), output_format='xml')
+        output = io.StringIO()
+        with pytest.raises(ValueError):
+            run(spec, io.StringIO('x\n1\n'), output, output_format='csv', batch=0)
+        assert output.getvalue() == ''
+        # a JSON line that is not an object
+        with pytest.raises(ValueError, match='Line 2'):
+            run(spec, io.StringIO('{"x": 1}\n[1, 2]\n'), io.StringIO(), 'jsonl')
+        with pytest.raises(ValueError, match='Line 1'):
+            run(spec, io.StringIO('3\n'), io.StringIO(), 'jsonl')
+        # a row without a value for each column
+        with pytest.raises(ValueError, match='Line 3'):
+            run({'variables': ['x', 'y'], 'functions': ['x * y']}, io.StringIO('x,y\n1,2\n3\n'), io.StringIO())
+        # the error gives the points of the failing batch
+        with pytest.raises(ValueError, match='Points 3 to 4'):
+            run(spec, io.StringIO('x\n1\n2\n3\n-1\n'), io.StringIO(), batch=2)
+
+    def test_main(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with open('job.json', 'w') as f:
+            json.dump({'variables': ['x', 'y'], 'functions': ['x * y', 'x + 2 * y']}, f)
+        points = np.random.rand(1001, 2)
+        np.savetxt('points.csv', points, delimiter=',', header='x,y', comments='')
+
+        assert main(['--spec', 'job.json', '-i', 'points.csv', '-o', 'out.npy', '-b', '100']) == 0
+        values, jacobian = np.load('out_values.npy'), np.load('out_jacobian.npy')
+        assert values.shape == (1001, 2) and jacobian.shape == (1001, 2, 2)
+        assert np.allclose(values[:, 0], points[:, 0] * points[:, 1])
+        assert np.allclose(jacobian[:, 0, 0], points[:, 1]) and np.allclose(jacobian[:, 1], [1., 2.])
+
+        assert main(['-f', 'x * y', '-v', 'x, y', '-i', 'points.csv', '-o', 'out.csv']) == 0
+        with open('out.csv') as f:
+            assert len(f.read().splitlines()) == 1002
+
+        assert main(['-f', 'log(x)', '-v', 'x', '-i', 'job.json', '--input-format', 'jsonl']) == 1
+        assert 'apollo_ad: ' in capsys.readouterr().err
+        # a malformed function, and missing input and spec files
+        assert main(['-f', 'x +* y', '-v', 'x,y', '-i', 'points.csv']) == 1
+        assert capsys.readouterr().err.startswith('apollo_ad: ')
+        assert main(['--spec', 'job.json', '-i', 'missing.csv']) == 1
+        assert 'missing.csv' in capsys.readouterr().err
+        assert main(['--spec', 'missing.json', '-i', 'points.csv']) == 1
+        assert 'missing.json' in capsys.readouterr().err
+        # no output is created for an invalid batch size
+        assert main(['--spec', 'job.json', '-i', 'points.csv', '-o', 'bad.npy', '-b', '0']) == 1
+        assert 'batch size' in capsys.readouterr().err and not (tmp_path / 'bad_values.npy').exists()
+        # a short row, and a constant subexpression that cannot be evaluated
+        with open('short.csv', 'w') as f:
+            f.write('x,y\n1,2\n3\n')
+        assert main(['-f', 'x * y', '-v', 'x,y', '-i', 'short.csv']) == 1
+        assert 'Line 3' in capsys.readouterr().err
+        assert main(['-f', '1 / 0 + x', '-v', 'x,y', '-i', 'points.csv']) == 1
+        assert 'ZeroDivisionError' in capsys.readouterr().err
+        with pytest.raises(SystemExit):
+            main(['-i', 'points.csv'])
+        with pytest.raises(SystemExit):
+            main(['--spec', 'job.json', '--output-format', 'npy'])
@@ -0,0 +1,190 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..compiler import *
+
+
+class TestCompiler:
+
+    def test_expression_nodes(self):
+        e = Expression('x * y', {'x': 0, 'y': 1})
+        assert e.nodes == [('var', 0, None), ('var', 1, None), ('mul', 0, 1)]
+        assert e.roots == [2]
+
+        e = Expression(' -x + np.pi ', {'x': 0})
+        assert e.nodes == [('var', 0, None), ('neg', 0, None), ('const', np.pi, None), ('add', 1, 2)]
+
+    def test_common_subexpressions(self):
+        fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', 'y**2 + cos(x)']
+        e = Expression(fcts, {'x': 0, 'y': 1})
+        # sqrt(x)/3 is shared by F2 and F3, the whole of F1 is reused by F4
+        assert e.roots[3] == e.roots[0]
+        assert e.roots[2] in e.cone(1)
+        assert len(e.nodes) == 12
+        assert [op for op, a, b in e.nodes].count('sqrt') == 1
+        assert [op for op, a, b in e.nodes].count('var') == 2
+
+        # 2 and 2.0 stay distinct constants
+        e = Expression(['x ** 2', 'x ** 2.0', 'x * y * z', 'z * (y * x)'], {'x': 0, 'y': 1, 'z': 2})
+        assert len(set(e.roots)) == 3
+
+    def test_shared_nodes_evaluated_once(self):
+        calls = []
+
+        class Counting(Variable):
+            @staticmethod
+            def sqrt(variable):
+                calls.append(variable)
+                return Variable.sqrt(variable)
+
+        e = Expression(['2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', 'sqrt(x) * y'], {'x': 0, 'y': 1})
+        leaves = [Variable(4., np.array([1., 0.])), Variable(2., np.array([0., 1.]))]
+        out = e.evaluate(leaves, Counting)
+        assert len(calls) == 1
+        assert out[1].var == 2 / 3 and out[2].var == 4
+        assert np.array_equal(out[2].der, np.array([0.5, 2.]))
+
+        # a single function only evaluates its own nodes
+        calls.clear()
+        out = e.evaluate(leaves, Counting, [2])
+        assert len(calls) == 1 and len(out) == 1 and out[0].var == 4
+
+    def test_compile_matches_forward(self):
+        vars = {'x': 0.5, 'y': 4}
+        fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', '3 * sinh(x) - 4 * arcsin(x) + 5']
+        f = compile(fcts, ['x', 'y'])
+        z = Forward(vars, fcts)
+
+        values, jacobian = f(vars)
+        assert np.array_equal(values, z.var)
+        assert np.array_equal(jacobian, z.der)
+
+        # the same compiled function at a new point, given as a list
+        values, jacobian = f([0.2, 3])
+        z = Forward({'x': 0.2, 'y': 3}, fcts)
+        assert np.array_equal(values, z.var)
+        assert np.array_equal(jacobian, z.der)
+
+    def test_compile_seed(self):
+        f = compile(['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3'], ['x', 'y'])
+        values, jacobian = f({'x': 3, 'y': 4}, {'x': 1, 'y': 2})
+        assert np.array_equal(np.around(jacobian, 4), np.array([[-0.1411, 16.], [-0.0962, 1.]]))
+
+    def test_compile_single_and_constant(self):
+        f = compile('x * abs(y) + 2 ** x', ['x', 'y'])
+        values, jacobian = f([1, 2])
+        assert values[0] == 4
+        assert np.array_equal(np.around(jacobian, 4), np.array([[3.3863, 1.]]))
+
+        f = compile(['3 + 4', 'x'], ['x'])
+        values, jacobian = f([2])
+        assert np.array_equal(values, np.array([7., 2.]))
+        assert np.array_equal(jacobian, np.array([[0.], [1.]]))
+
+    def test_compile_batch(self):
+        f = compile(['x * y + sin(x)', 'log(y) / x', '3'], ['x', 'y'])
+        xs = np.array([0.5, 1., 2.])
+        values, jacobian = f({'x': xs, 'y': 4})
+        assert values.shape == (3, 3) and jacobian.shape == (3, 3, 2)
+        for i in range(3):
+            value, jac = f({'x': xs[i], 'y': 4})
+            assert np.array_equal(np.round(values[i], 8), np.round(value, 8))
+            assert np.array_equal(np.round(jacobian[i], 8), np.round(jac, 8))
+
+        with pytest.raises(ValueError):
+            f({'x': xs, 'y': np.array([1., 2.])})
+        with pytest.raises(ValueError):
+            f({'x': np.ones((2, 2)), 'y': 1})
+
+    def test_compile_invalid(self):
+        with pytest.raises(TypeError):
+            compile([5, 'x'], ['x'])
+
+        with pytest.raises(NameError):
+            compile(['x + z'], ['x'])
+
+        with pytest.raises(ValueError):
+            compile(['x % 2'], ['x'])
+
+        with pytest.raises(ValueError):
+            compile(['max(x)'], ['x'])
+
+        with pytest.raises(ValueError):
+            compile(['"x"'], ['x'])
+
+        f = compile(['x + y'], ['x', 'y'])
+        with pytest.raises(KeyError):
+            f({'x': 1})
+        with pytest.raises(ValueError):
+            f([1])
+
+    def test_reverse_uses_compiled(self):
+        vars = {'x': 1, 'y': 2}
+        z = Reverse(vars, ['x * y + exp(x * y)', 'x + 3 * y', '5'])
+        assert np.array_equal(np.around(z.var, 4), np.array([9.3891, 7., 5.]))
+        assert np.array_equal(np.around(z.der, 4), np.array([[16.7781, 8.3891], [1., 3.], [0., 0.]]))
+
+
+class TestCompileCache:
+
+    def test_canonicalize(self):
+        assert canonicalize('x*y') == canonicalize('y * x')
+        assert canonicalize(' y * x + 2') == '((x * y) + 2.0)'
+        assert canonicalize('2 + +x') == canonicalize('x+2.0')
+        assert canonicalize('x - y') != canonicalize('y - x')
+        assert canonicalize('x / y') != canonicalize('y / x')
+        assert canonicalize('sin(y * x)') == 'sin((x * y))'
+
+    def test_hits_misses(self):
+        cache = Compile_Cache(maxsize=4)
+        f = cache.get(['x*y'], ['x', 'y'])
+        assert cache.get(['y * x'], ['x', 'y']) is f
+        assert cache.get(['x*y'], ['x', 'y']) is f
+        assert cache.info() == {'hits': 2, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': 4}
+
+        # the variable order is part of the key
+        assert cache.get(['x*y'], ['y', 'x']) is not f
+        assert cache.misses == 2
+
+        # same floats as compiling the other spelling
+        values, jacobian = cache.get(['y * x + 3 * sin(x)'], ['x', 'y'])([2, 5])
+        values_, jacobian_ = compile(['3 * sin(x) + x*y'], ['x', 'y'])([2, 5])
+        assert np.array_equal(values, values_) and np.array_equal(jacobian, jacobian_)
+
+        with pytest.raises(TypeError):
+            cache.get([5], ['x'])
+
+    def test_lru_eviction(self):
+        cache = Compile_Cache(maxsize=2)
+        a = cache.get(['x + 1'], ['x'])
+        b = cache.get(['x + 2'], ['x'])
+        assert cache.get(['x + 1'], ['x']) is a
+        c = cache.get(['x + 3'], ['x'])
+
+        # 'x + 2' was the least recently used
+        assert cache.evictions == 1 and len(cache) == 2
+        assert cache.get(['1 + x'], ['x']) is a
+        assert cache.get(['x + 2'], ['x']) is not b
+
+        cache.resize(1)
+        assert len(cache) == 1 and cache.evictions == 3
+
+        cache.clear()
+        assert cache.info() == {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 1}
+
+        cache = Compile_Cache(maxsize=0)
+        cache.get(['x'], ['x'])
+        cache.get(['x'], ['x'])
+        assert cache.misses == 2 and len(cache) == 0
+
+    def test_auto_diff_hits_cache(self):
+        compile_cache.clear()
+        auto_diff({'x': 1, 'y': 2}, ['x*y', 'x + y'], mode='forward')
+        z = auto_diff({'x': 3, 'y': 4}, ['y * x', 'y+x'], {'x': 1, 'y': 1})
+        assert compile_cache.hits == 1 and compile_cache.misses == 1
+        assert np.array_equal(z.der, np.array([[4., 3.], [1., 1.]]))
+        # the cost model is only looked up when it chooses the mode
+        auto_diff({'x': 3, 'y': 4}, ['y * x', 'y+x'], hessian=True)
+        assert compile_cache.hits == 2
+        auto_diff({'x': 3, 'y': 4}, ['y * x', 'y+x'])
+        assert compile_cache.hits == 4
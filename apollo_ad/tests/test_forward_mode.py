@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
 from ..apollo_ad import *
+from ..products import jvp
 
 
 class TestForward:
@@ -392,34 +393,99 @@ class TestForward:
     def test_arccos(self):
         x = Variable(0)
         f = Variable.arccos(x)
-        assert f.var == 0.0
+        assert f.var == np.pi / 2
         assert f.der == [-1.]
 
+        # the value is the arccosine in every entry point
+        f = Variable.arccos(Variable(0.5))
+        assert np.round(f.var, 8) == np.round(np.arccos(0.5), 8)
+        assert np.round(f.der[0], 8) == np.round(-1 / np.sqrt(0.75), 8)
+        z = Forward({'x': 0.5}, ['arccos(x)'])
+        assert np.round(z.var[0], 8) == np.round(np.arccos(0.5), 8)
+        assert np.round(jvp(['arccos(x)'], {'x': 0.5}, np.ones((1, 1)))[0][0], 8) == np.round(np.arccos(0.5), 8)
+
         with pytest.raises(ValueError):
             x = Variable(2)
             f=Variable.arccos(x)
 
         assert Variable.arccos(0.5) == np.arccos(0.5)
 
+    def test_batch(self):
+        x = Variable(np.array([0.2, 0.5]), [1, 0])
+        y = Variable(np.array([2., 3.]), [0, 1])
+        assert x.der.shape == (2, 2)
+        f = Variable.arcsin(x) * y + Variable.exp(x) / y - x ** 2 + 2 ** y - abs(x - y)
+        for i in range(2):
+            x1 = Variable(float(x.var[i]), [1, 0])
+            y1 = Variable(float(y.var[i]), [0, 1])
+            f1 = Variable.arcsin(x1) * y1 + Variable.exp(x1) / y1 - x1 ** 2 + 2 ** y1 - abs(x1 - y1)
+            assert np.round(f.var[i], 8) == np.round(f1.var, 8)
+            assert np.array_equal(np.round(f.der[i], 8), np.round(f1.der, 8))
+        assert f == f
+        assert (x < y).all()
+
+        # the domain is checked at every point
+        with pytest.raises(ValueError):
+            Variable.log(Variable(np.array([1., -1.])))
+        with pytest.raises(TypeError):
+            Variable(np.ones((2, 2)))
+
+    def test_forward_batch(self):
+        vars = {'x': np.array([0.5, 0.25]), 'y': 4}
+        fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', '3 * sinh(x) - 4 * arcsin(x) + 5']
+        z = auto_diff(vars, fcts)
+        assert z.var.shape == (2, 4) and z.der.shape == (2, 4, 2)
+        assert np.array_equal(np.around(z.var[0], 4), np.array([16.8776, 2.5369, 0.2357, 4.4689]))
+        assert np.array_equal(np.around(z.der[0], 4), np.array([[-0.4794,  8. ], [-0.2357, 0.5], [0.2357, 0.], [-1.2359, 0.]]))
+        assert isinstance(z.__str__(), str)
+
     def test_autodiff(self):
         vars = {'x': 0.5, 'y': 4}
         fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', '3 * sinh(x) - 4 * arcsin(x) + 5']
         z = auto_diff(vars, fcts)
 
         assert np.array_equal(np.around(z.var, 4), np.array([16.8776, 2.5369, 0.2357, 4.4689]))
-        assert np.array_equal(np.around(z.der, 4), np.array([[-0.4794,  8. ], [-0.2357, 0.5], [0.2357, 0.], [-1.2359, -4.6188]]))
+        assert np.array_equal(np.around(z.der, 4), np.array([[-0.4794,  8. ], [-0.2357, 0.5], [0.2357, 0.], [-1.2359, 0.]]))
 
         with pytest.raises(AttributeError):
             var = {'x': 3, 'y': 4}
             seed = [1, 2]
             fct = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3']
-            z = auto_diff(var, fct, seed)
+            z = auto_diff(var, fct, seed, mode = 'forward')
 
         with pytest.raises(AttributeError):
             var = {'x': 3, 'y': 2}
             seed = {'x': 2, 'y': 2}
             fct = ['cos(x) + y ** 2']
-            z = auto_diff(var, fct, seed)
+            z = auto_diff(var, fct, seed, mode = 'reverse')
+
+        with pytest.raises(ValueError):
+            z = auto_diff({'x': 3}, ['x'], mode = 'backward')
+
+    def test_autodiff_mode(self):
+        # the seed picks the mode
+        var = {'x': 3, 'y': 4}
+        fct = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3']
+        assert auto_diff(var, fct, [1, 2]).mode == 'reverse'
+        assert auto_diff(var, fct, {'x': 1, 'y': 2}).mode == 'forward'
+
+        # 3 functions of 2 out of 1000 variables: forward builds 1000 derivative arrays of 1000
+        # entries, reverse sweeps the graph 3 times
+        var = {'x' + str(i): 1. for i in range(1000)}
+        fct = ['x0 * x1', 'sin(x0)', 'x1 + 2']
+        z = auto_diff(var, fct)
+        assert z.mode == 'reverse' and z.cost.sweeps == 3 and z.cost.fct_vars == [2, 1, 1]
+        assert np.array_equal(z.der, Forward(var, fct).der)
+
+        # a long function of one variable: forward carries a single derivative
+        z = auto_diff({'x': 0.5, 'y': 1}, [' + '.join(['sin(x * ' + str(i) + ')' for i in range(50)])])
+        assert z.mode == 'forward'
+        assert 'Cheaper mode: forward' in z.explain() and 'Used mode: forward' in z.explain()
+
+        z = auto_diff({'x': 0.5, 'y': 1}, ['x * y'], mode = 'forward')
+        assert z.mode == 'forward'
+        z = auto_diff({'x': 0.5, 'y': 1}, ['x * y'], mode = 'reverse')
+        assert z.mode == 'reverse'
 
     def test_forward(self):
         vars = {'x': 0.5, 'y': 4}
@@ -427,7 +493,7 @@ class TestForward:
         z = Forward(vars, fcts)
 
         assert np.array_equal(np.around(z.var, 4), np.array([16.8776, 2.5369, 0.2357, 4.4689]))
-        assert np.array_equal(np.around(z.der, 4), np.array([[-0.4794,  8. ], [-0.2357, 0.5], [0.2357, 0.], [-1.2359, -4.6188]]))
+        assert np.array_equal(np.around(z.der, 4), np.array([[-0.4794,  8. ], [-0.2357, 0.5], [0.2357, 0.], [-1.2359, 0.]]))
 
         with pytest.raises(TypeError):
             vars = {'x': 0.5, 'y': 4}
@@ -447,3 +513,14 @@ class TestForward:
         z = auto_diff(vars, fcts)
         assert isinstance(z.__str__(), str) 
         assert isinstance(z.__repr__(), str) 
+
+    def test_slots(self):
+        x = Variable(3, [1, 0])
+        f = x * x + 1
+        assert not hasattr(f, '__dict__')
+        with pytest.raises(AttributeError):
+            f.other = 1
+        y = Variable._new(2.0, np.array([0., 1.]))
+        assert y.var == 2.0 and (y.der == [0., 1.]).all()
+        z = x * y
+        assert z.var == 6.0 and (z.der == [2., 3.]).all()
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+
+
+class TestHessian:
+
+    def test_hyper_dual(self):
+        x = Hyper_Dual(3, [1, 0])
+        y = Hyper_Dual(4, [0, 1])
+        f = x ** 2 * y - y / x + 3 * x - 2
+        assert f.var == 36 - 4 / 3 + 7
+        assert np.array_equal(np.round(f.der, 8), np.round([24 + 4 / 9 + 3, 9 - 1 / 3], 8))
+        assert np.array_equal(np.round(f.hes, 8), np.round([[8 - 8 / 27, 6 + 1 / 9], [6 + 1 / 9, 0]], 8))
+        assert f.hes.shape == (2, 2)
+        assert Hyper_Dual(3, 1).__slots__ == ('var', 'der', 'hes')
+        assert x == Hyper_Dual(3, [1, 0]) and x != y and x != 3
+        assert x < y and x <= 3 and y > x and y >= 4
+
+        # numpy scalars and inputs that are not variables
+        assert np.array_equal((np.float64(2) * x).der, [2., 0.])
+        assert Hyper_Dual.exp(0) == 1 and Hyper_Dual.sin(0) == 0
+
+        with pytest.raises(TypeError):
+            Hyper_Dual('3')
+        with pytest.raises(ValueError):
+            Hyper_Dual.log(Hyper_Dual(-1))
+        with pytest.raises(ValueError):
+            Hyper_Dual.arcsin(Hyper_Dual(2))
+        with pytest.raises(ValueError):
+            Hyper_Dual(-1) ** 0.5
+        with pytest.raises(ZeroDivisionError):
+            1 / Hyper_Dual(0)
+
+    def test_elementary_functions(self):
+        # second derivatives of each function at u = 0.3
+        u = 0.3
+        cases = [(Hyper_Dual.exp, np.exp(u)), (Hyper_Dual.log, -1 / u ** 2), (Hyper_Dual.sqrt, -0.25 * u ** -1.5),
+                 (Hyper_Dual.sin, -np.sin(u)), (Hyper_Dual.cos, -np.cos(u)),
+                 (Hyper_Dual.tan, 2 * np.tan(u) / np.cos(u) ** 2), (Hyper_Dual.arcsin, u / (1 - u ** 2) ** 1.5),
+                 (Hyper_Dual.arccos, -u / (1 - u ** 2) ** 1.5), (Hyper_Dual.arctan, -2 * u / (1 + u ** 2) ** 2),
+                 (Hyper_Dual.sinh, np.sinh(u)), (Hyper_Dual.cosh, np.cosh(u)),
+                 (Hyper_Dual.tanh, -2 * np.tanh(u) / np.cosh(u) ** 2), (lambda x: 2 ** x, np.log(2) ** 2 * 2 ** u),
+                 (lambda x: x ** x, u ** u * ((np.log(u) + 1) ** 2 + 1 / u)), (abs, 0)]
+        for fct, d2 in cases:
+            assert np.round(fct(Hyper_Dual(u, 1)).hes[0, 0], 8) == np.round(d2, 8)
+        assert Hyper_Dual.arccos(Hyper_Dual(u, 1)).var == np.arccos(u)
+
+    def test_hessian(self):
+        vars = {'x': 0.5, 'y': 4, 'z': 2}
+        fcts = ['x ** 2 * y + sin(x * z) - exp(y) / z', '3', 'x + y']
+        z = Hessian(vars, fcts)
+        x, y, z_ = 0.5, 4., 2.
+        H = np.array([[2 * y - z_ ** 2 * np.sin(x * z_), 2 * x, np.cos(x * z_) - x * z_ * np.sin(x * z_)],
+                      [2 * x, -np.exp(y) / z_, np.exp(y) / z_ ** 2],
+                      [np.cos(x * z_) - x * z_ * np.sin(x * z_), np.exp(y) / z_ ** 2,
+                       -x ** 2 * np.sin(x * z_) - 2 * np.exp(y) / z_ ** 3]])
+        out = Forward(vars, fcts)
+        assert z.hes.shape == (3, 3, 3)
+        assert np.array_equal(np.round(z.hes[0], 8), np.round(H, 8))
+        assert np.array_equal(z.hes[1:], np.zeros((2, 3, 3)))
+        assert np.array_equal(np.round(z.var, 8), np.round(out.var, 8))
+        assert np.array_equal(np.round(z.der, 8), np.round(out.der, 8))
+        assert z.__str__().split('-- Hessians -- \n')[0] == out.__str__()
+
+        # a batch of points
+        z = Hessian({'x': np.array([0.5, 1.]), 'y': 4, 'z': 2}, fcts)
+        assert z.hes.shape == (2, 3, 3, 3)
+        assert np.array_equal(np.round(z.hes[0, 0], 8), np.round(H, 8))
+
+    def test_autodiff_hessian(self):
+        z = auto_diff({'x': 3, 'y': 4}, ['x ** 2 * y'], hessian=True)
+        assert z.mode == 'forward'
+        assert np.array_equal(z.hes, [[[8., 6.], [6., 0.]]])
+        z = auto_diff({'x': 3, 'y': 4}, ['x ** 2 * y'], {'x': 1, 'y': 2}, hessian=True)
+        assert np.array_equal(z.hes, [[[8., 12.], [12., 0.]]])
+        assert not hasattr(auto_diff({'x': 3, 'y': 4}, ['x ** 2 * y']), 'hes')
+
+        with pytest.raises(ValueError):
+            auto_diff({'x': 3, 'y': 4}, ['x ** 2 * y'], mode='reverse', hessian=True)
+        with pytest.raises(AttributeError):
+            auto_diff({'x': 3, 'y': 4}, ['x ** 2 * y'], [1], hessian=True)
+        with pytest.raises(TypeError):
+            Hessian([3, 4], ['x ** 2 * y'])
@@ -0,0 +1,81 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..parallel import *
+from .. import parallel
+
+
+class TestParallel:
+
+    def test_chunks(self):
+        assert chunks([100, 1, 1, 1, 50, 50], 3) == [[0], [1, 3, 4], [2, 5]]
+        assert chunks([1, 2], 8) == [[1], [0]]
+        assert chunks([3, 3, 3, 3], 1) == [[0, 1, 2, 3]]
+        # every function is in one chunk
+        parts = chunks(list(range(1, 51)), 8)
+        assert len(parts) == 8 and sorted(i for part in parts for i in part) == list(range(50))
+
+    def test_forward_reverse(self):
+        var = {'x': 0.5, 'y': 4, 'z': 2}
+        fct = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', '3', 'x * y * z + exp(z)', 'sinh(x) * z']
+        for seed in [None, {'x': 1, 'y': 2, 'z': 0}]:
+            z1 = Forward(var, fct, seed)
+            z2 = Forward(var, fct, seed, workers=2)
+            assert np.allclose(z1.var, z2.var) and np.allclose(z1.der, z2.der)
+        for seed in [None, [1, 2, 3, 4, 5]]:
+            z1 = Reverse(var, fct, seed)
+            z2 = Reverse(var, fct, seed, workers=2)
+            assert np.allclose(z1.var, z2.var) and np.allclose(z1.der, z2.der)
+
+        z1 = Forward(var, fct, sparse=True)
+        z2 = Forward(var, fct, sparse=True, workers=2)
+        assert np.array_equal(z1.der.row, z2.der.row) and np.array_equal(z1.der.col, z2.der.col)
+        assert np.allclose(z1.der.data, z2.der.data)
+
+        # N points
+        var = {'x': np.array([0.5, 1., 2.]), 'y': 4, 'z': 2}
+        z1 = Reverse(var, fct[:2] + fct[4:])
+        z2 = auto_diff(var, fct[:2] + fct[4:], mode='reverse', workers=2)
+        assert z2.der.shape == (3, 3, 3)
+        assert np.allclose(z1.var, z2.var) and np.allclose(z1.der, z2.der)
+        shutdown()
+
+    def test_workers(self):
+        with pytest.raises(ValueError):
+            Forward({'x': 1}, ['x'], workers=0)
+        with pytest.raises(ValueError):
+            Reverse({'x': 1}, ['x'], workers=1.5)
+        with pytest.raises(ValueError):
+            auto_diff({'x': 1}, ['x'], hessian=True, workers=2)
+        # a single process or a single function does not start a pool
+        assert np.array_equal(Forward({'x': 1}, ['2 * x'], workers=4).der, np.array([[2.]]))
+        assert Reverse({'x': 1}, ['2 * x', 'x'], workers=1).der[1, 0] == 1
+        assert 4 not in parallel._pools
+
+    def test_batch_jacobian(self):
+        var = {'x': np.linspace(0.1, 1, 1001), 'y': np.linspace(1, 2, 1001), 'z': 2.}
+        fct = ['sin(x * y) + exp(z * x)', 'x * y * z', 'log(y) / x', '3']
+        v1, j1 = Forward(var, fct).var, Forward(var, fct).der
+        for workers in [1, 3]:
+            v2, j2 = batch_jacobian(var, fct, workers)
+            assert v2.shape == (1001, 4) and j2.shape == (1001, 4, 3)
+            assert np.allclose(v1, v2) and np.allclose(j1, j2)
+        # the arrays are views of the shared memory and stay valid on their own
+        assert isinstance(j2.base, parallel._Shared_Array)
+        j = j2[10:20]
+        del v2, j2
+        assert np.allclose(j, j1[10:20])
+
+        seed = {'x': 1, 'y': 0, 'z': 2}
+        assert np.allclose(batch_jacobian(var, fct, 2, seed)[1], Forward(var, fct, seed).der)
+
+        with pytest.raises(ValueError):
+            batch_jacobian({'x': 1, 'y': 2}, ['x * y'], 2)
+        with pytest.raises(TypeError):
+            batch_jacobian([np.ones(3)], ['x'], 2)
+        with pytest.raises(ValueError):
+            batch_jacobian({'x': np.ones(3)}, ['x'], 0)
+        # an error in a worker is raised here
+        with pytest.raises(KeyError):
+            batch_jacobian({'x': np.ones(3)}, ['x'], 2, {'y': 1})
+        shutdown()
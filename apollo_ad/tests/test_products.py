@@ -0,0 +1,126 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..products import *
+
+
+class TestProducts:
+
+    def test_jvp(self):
+        vars = {'x': 0.5, 'y': 4}
+        fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', '3 * sinh(x) - 4 * arcsin(x) + 5']
+        V = np.array([[1., 0., 2.], [0., 1., -1.]])
+        values, product = jvp(fcts, vars, V)
+        z = Forward(vars, fcts)
+        assert product.shape == (4, 3)
+        assert np.array_equal(np.round(values, 8), np.round(z.var, 8))
+        assert np.array_equal(np.round(product, 8), np.round(z.der @ V, 8))
+
+        # a single direction
+        values, product = jvp(fcts, vars, V[:, 2])
+        assert product.shape == (4,)
+        assert np.array_equal(np.round(product, 8), np.round(z.der @ V[:, 2], 8))
+
+    def test_jvp_batch(self):
+        vars = {'x': np.array([0.5, 0.25]), 'y': 4}
+        fcts = ['x * y + exp(x)', '3']
+        V = np.array([[1., 2.], [3., 4.]])
+        values, product = jvp(fcts, vars, V)
+        z = Forward(vars, fcts)
+        assert product.shape == (2, 2, 2)
+        assert np.array_equal(np.round(product, 8), np.round(z.der @ V, 8))
+
+    def test_jvp_invalid(self):
+        with pytest.raises(ValueError):
+            jvp(['x * y'], {'x': 1, 'y': 2}, np.ones((3, 2)))
+        with pytest.raises(TypeError):
+            jvp(['x * y'], [1, 2], np.ones((2, 2)))
+
+    def test_vjp(self):
+        vars = {'x': 0.5, 'y': 4, 'z': 2}
+        fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3 + x * y', 'x * y', '3']
+        U = np.array([[1., 0., 2., 5.], [0., 1., -1., 0.], [1., 1., 1., 1.]])
+        values, product = vjp(fcts, vars, U)
+        z = Forward(vars, fcts)
+        assert product.shape == (3, 3)
+        assert np.array_equal(np.round(values, 8), np.round(z.var, 8))
+        assert np.array_equal(np.round(product, 8), np.round(U @ z.der, 8))
+
+        # a single cotangent
+        values, product = vjp(fcts, vars, U[1])
+        assert product.shape == (3,)
+        assert np.array_equal(np.round(product, 8), np.round(U[1] @ z.der, 8))
+
+    def test_vjp_single_sweep(self, monkeypatch):
+        calls = []
+        sweep = Reverse_Mode.sweep
+        monkeypatch.setattr(Reverse_Mode, 'sweep', staticmethod(lambda graph: calls.append(1) or sweep(graph)))
+        vjp(['x * y', 'x + y', 'sin(x)'], {'x': 1, 'y': 2}, np.ones((4, 3)))
+        assert len(calls) == 1
+
+    def test_vjp_batch(self):
+        vars = {'x': np.array([0.5, 0.25, 2.]), 'y': 4}
+        fcts = ['x * y + exp(x)', '3', 'y']
+        U = np.array([[1., 2., 3.], [3., 4., 0.]])
+        values, product = vjp(fcts, vars, U)
+        z = Forward(vars, fcts)
+        assert values.shape == (3, 3) and product.shape == (3, 2, 2)
+        assert np.array_equal(np.round(values, 8), np.round(z.var, 8))
+        assert np.array_equal(np.round(product, 8), np.round(U @ z.der, 8))
+
+        # the adjoint of x first gets one entry for all the points (from x + y), then one per point
+        values, product = vjp(['x + y', 'x * y'], {'x': np.array([0.5, 2.]), 'y': np.array([3., 4.])}, [1., 1.])
+        assert np.array_equal(product, [[4., 1.5], [5., 3.]])
+
+    def test_vjp_invalid(self):
+        with pytest.raises(ValueError):
+            vjp(['x * y'], {'x': 1, 'y': 2}, np.ones((3, 2)))
+        values, product = vjp(['3'], {'x': 1, 'y': 2}, np.ones((2, 1)))
+        assert np.array_equal(product, np.zeros((2, 2)))
+
+    def test_hvp(self):
+        vars = {'x': 0.5, 'y': 4, 'z': 2}
+        fct = 'x ** 2 * y + sin(x * z) - exp(y) / z + 2 ** z * log(y) + abs(x - y) ** 3'
+        x, y, z = 0.5, 4., 2.
+        # the analytical Hessian
+        H = np.array([[2 * y - z ** 2 * np.sin(x * z) + 6 * (y - x), 2 * x - 6 * (y - x),
+                       np.cos(x * z) - x * z * np.sin(x * z)],
+                      [2 * x - 6 * (y - x), -np.exp(y) / z - 2 ** z / y ** 2 + 6 * (y - x),
+                       np.exp(y) / z ** 2 + 2 ** z * np.log(2) / y],
+                      [np.cos(x * z) - x * z * np.sin(x * z), np.exp(y) / z ** 2 + 2 ** z * np.log(2) / y,
+                       -x ** 2 * np.sin(x * z) - 2 * np.exp(y) / z ** 3 + 2 ** z * np.log(2) ** 2 * np.log(y)]])
+        V = np.array([[1., 0.], [0., 2.], [-1., 1.]])
+        value, gradient, product = hvp(fct, vars, V)
+        out = Forward(vars, [fct])
+        assert np.round(value, 8) == np.round(out.var[0], 8)
+        assert np.array_equal(np.round(gradient, 8), np.round(out.der[0], 8))
+        assert product.shape == (3, 2)
+        assert np.array_equal(np.round(product, 8), np.round(H @ V, 8))
+
+        # a single direction
+        value, gradient, product = hvp([fct], vars, V[:, 1])
+        assert np.array_equal(np.round(product, 8), np.round(H @ V[:, 1], 8))
+
+        # variables that do not appear and constant functions
+        assert np.array_equal(hvp('x * y', {'x': 1, 'y': 2, 'z': 3}, [1, 1, 1])[2], [1., 1., 0.])
+        assert np.array_equal(hvp('x + 3', {'x': 1, 'y': 2}, [1, 1])[2], [0., 0.])
+        assert np.array_equal(hvp('3', {'x': 1, 'y': 2}, [1, 1])[1], [0., 0.])
+
+    def test_hvp_batch(self):
+        fct = 'sin(x) * y ** 3 + tanh(x * y)'
+        x = np.array([0.5, 0.25, 1.])
+        value, gradient, product = hvp(fct, {'x': x, 'y': 2}, [1, -1])
+        assert value.shape == (3,) and gradient.shape == (3, 2) and product.shape == (3, 2)
+        for i in range(3):
+            value_, gradient_, product_ = hvp(fct, {'x': x[i], 'y': 2}, [1, -1])
+            assert np.round(value[i], 8) == np.round(value_, 8)
+            assert np.array_equal(np.round(gradient[i], 8), np.round(gradient_, 8))
+            assert np.array_equal(np.round(product[i], 8), np.round(product_, 8))
+
+    def test_hvp_invalid(self):
+        with pytest.raises(ValueError):
+            hvp(['x * y', 'x'], {'x': 1, 'y': 2}, [1, 1])
+        with pytest.raises(ValueError):
+            hvp('x * y', {'x': 1, 'y': 2}, [1, 1, 1])
+        with pytest.raises(TypeError):
+            hvp('x * y', [1, 2], [1, 1])
@@ -128,7 +128,7 @@ class TestReverse:
         f = abs(x)
         value, grads = f.derivative(inputs)
         assert value == 3
-        assert grads[0] == 1
+        assert grads[0] == -1
 
     def test_pow(self):
         # test Variable raise to a constant
@@ -279,9 +279,16 @@ class TestReverse:
         x = Reverse_Mode(0)
         f = Reverse_Mode.arccos(x)
         v, g = f.derivative([x])
-        assert v == 0.0
+        assert v == np.pi / 2
         assert g == [-1.]
 
+        x = Reverse_Mode(0.5)
+        v, g = Reverse_Mode.arccos(x).derivative([x])
+        assert np.round(v, 8) == np.round(np.arccos(0.5), 8)
+        assert np.round(g[0], 8) == np.round(-1 / np.sqrt(0.75), 8)
+        z = Reverse({'x': 0.5}, ['arccos(x)'])
+        assert np.round(z.var[0], 8) == np.round(np.arccos(0.5), 8)
+
         with pytest.raises(ValueError):
             x = Reverse_Mode(2)
             f = Reverse_Mode.arccos(x)
@@ -345,3 +352,111 @@ class TestReverse:
         z = Reverse(vars, fcts)
         assert isinstance(z.__str__(), str) 
         assert isinstance(z.__repr__(), str) 
+
+    def test_graph(self):
+        x = Reverse_Mode(3)
+        y = Reverse_Mode(4)
+        f = x * y + x
+        g = Reverse_Mode.exp(y)
+        nodes = Reverse_Mode.graph([x, y])
+        assert len(nodes) == 5
+        assert any(node is f for node in nodes) and any(node is g for node in nodes)
+
+    def test_reverse_single_forward_pass(self, monkeypatch):
+        calls = []
+        exp = Reverse_Mode.exp
+
+        def counting_exp(variable):
+            calls.append(variable)
+            return exp(variable)
+
+        monkeypatch.setattr(Reverse_Mode, 'exp', staticmethod(counting_exp))
+        vars = {'x': 1, 'y': 2, 'z': 3}
+        fcts = ['x * y + exp(x * y)', 'exp(y * x) / z', 'z']
+        z = Reverse(vars, fcts, [1, 2, 3])
+        assert len(calls) == 1
+
+        assert np.array_equal(np.around(z.var, 4), np.array([9.3891, 2.463, 3.]))
+        assert np.array_equal(np.around(z.der, 4), np.array([[16.7781, 8.3891, 0.], [9.8521, 4.926, -1.642], [0., 0., 3.]]))
+
+    def test_deep_graph(self):
+        # far deeper than the recursion limit
+        x = Reverse_Mode(0.5)
+        f = Reverse_Mode(1.0)
+        x_ = Variable(0.5, 1)
+        f_ = Variable(1.0, 0)
+        for i in range(5000):
+            f = f * x + 0.1
+            f_ = f_ * x_ + 0.1
+        value, check = f.derivative([x])
+        assert np.round(value, 8) == np.round(f_.var, 8)
+        assert np.round(check[0], 8) == np.round(f_.der[0], 8)
+
+        # a long chain of nodes hanging off one input
+        x = Reverse_Mode(1.0)
+        f = x
+        for i in range(20000):
+            f = f + x
+        value, check = f.derivative([x])
+        assert value == 20001 and check[0] == 20001
+
+    def test_graph_topological_sweep(self):
+        x = Reverse_Mode(2)
+        y = Reverse_Mode(3)
+        a = x * y
+        f = a + Reverse_Mode.sin(a)
+        g = a * x
+        order = Reverse_Mode.graph([x, y])
+        position = {id(node): i for i, node in enumerate(order)}
+        for node in order:
+            for _, child in node.child:
+                assert position[id(node)] < position[id(child)]
+
+        # the same graph swept for two different outputs
+        g.der = 1
+        Reverse_Mode.sweep(order)
+        assert x.der == 12 and y.der == 4
+        for node in order:
+            node.der = None
+        f.der = 1
+        Reverse_Mode.sweep(order)
+        assert np.round(x.der, 4) == np.round(3 + 3 * np.cos(6), 4)
+
+    def test_reverse_batch(self):
+        xs = np.array([0.2, 0.5, 0.7])
+        ys = np.array([2., 3., 1.])
+        x = Reverse_Mode(xs)
+        y = Reverse_Mode(ys)
+        f = Reverse_Mode.arcsin(x) * y + Reverse_Mode.exp(x) / y - x ** 2 + 2 ** y - abs(x - y)
+        value, grads = f.derivative([x, y])
+        assert grads.shape == (3, 2)
+        for i in range(3):
+            x1 = Reverse_Mode(float(xs[i]))
+            y1 = Reverse_Mode(float(ys[i]))
+            f1 = Reverse_Mode.arcsin(x1) * y1 + Reverse_Mode.exp(x1) / y1 - x1 ** 2 + 2 ** y1 - abs(x1 - y1)
+            value1, grads1 = f1.derivative([x1, y1])
+            assert np.round(value[i], 8) == np.round(value1, 8)
+            assert np.array_equal(np.round(grads[i], 8), np.round(grads1, 8))
+
+        with pytest.raises(ValueError):
+            Reverse_Mode.log(Reverse_Mode(np.array([1., -1.])))
+
+        vars = {'x': xs, 'y': ys}
+        fcts = ['x * y + exp(x * y)', 'x + 3 * y', '2', 'sin(x)']
+        z = Reverse(vars, fcts)
+        w = Forward(vars, fcts)
+        assert z.var.shape == (3, 4) and z.der.shape == (3, 4, 2)
+        assert np.array_equal(np.round(z.var, 8), np.round(w.var, 8))
+        assert np.array_equal(np.round(z.der, 8), np.round(w.der, 8))
+        assert isinstance(z.__str__(), str)
+
+    def test_slots(self):
+        x = Reverse_Mode(3)
+        f = x * x + 1
+        assert not hasattr(f, '__dict__')
+        with pytest.raises(AttributeError):
+            f.other = 1
+        y = Reverse_Mode._new(2.0)
+        assert y.var == 2.0 and y.child == [] and y.der is None
+        z = x * y
+        assert z.derivative([x, y])[1].tolist() == [2.0, 3.0]
@@ -0,0 +1,72 @@
+import os
+import asyncio
+import tempfile
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..serve import *
+
+
+class TestServe:
+
+    def test_batching(self):
+        async def run():
+            server = Gradient_Server(window=0.05)
+            host, port = await server.start()
+            client = await Gradient_Client().connect(port=port)
+            fct = ['cos(x) + y ** 2', 'x * y * exp(x)']
+            results = await asyncio.gather(*[client.evaluate({'x': 0.1 * i, 'y': 4}, fct) for i in range(100)])
+            # one vectorized evaluation for the 100 requests
+            assert server.requests == 100 and server.batches == 1
+            z = Forward({'x': 0.7, 'y': 4}, fct)
+            assert np.allclose(results[7][0], z.var) and np.allclose(results[7][1], z.der)
+
+            # a seed and another order of the variables are other batches
+            results = await asyncio.gather(client.evaluate({'x': 1, 'y': 2}, fct, {'x': 2, 'y': 0}),
+                                           client.evaluate({'y': 2, 'x': 1}, fct))
+            assert np.allclose(results[0][1], Forward({'x': 1, 'y': 2}, fct, {'x': 2, 'y': 0}).der)
+            assert np.allclose(results[1][1], Forward({'y': 2, 'x': 1}, fct).der)
+            assert server.batches == 3
+
+            # only the failing request of a batch gets the error
+            results = await asyncio.gather(client.evaluate({'x': 1.}, ['log(x)']),
+                                           client.evaluate({'x': -1.}, ['log(x)']), return_exceptions=True)
+            assert np.allclose(results[0][1], [[1.]])
+            assert isinstance(results[1], RuntimeError) and 'ValueError' in str(results[1])
+            with pytest.raises(RuntimeError):
+                await client.evaluate({'x': 1.}, ['x + q'])
+
+            # a batch of points in one request
+            values, jacobian = await client.evaluate({'x': np.array([1., 2., 3.]), 'y': 4}, fct)
+            assert values.shape == (3, 2) and jacobian.shape == (3, 2, 2)
+            await client.close()
+            await server.close()
+        asyncio.run(run())
+
+    def test_unix_socket(self):
+        async def run():
+            path = os.path.join(tempfile.mkdtemp(), 'apollo.sock')
+            server = Gradient_Server(max_batch=10)
+            assert await server.start(path=path) == path
+            client = await Gradient_Client().connect(path=path)
+            results = await asyncio.gather(*[client.evaluate({'x': i}, ['x ** 2']) for i in range(25)])
+            assert [r[1][0, 0] for r in results] == [2. * i for i in range(25)]
+            # full batches do not wait for the window
+            assert server.batches == 3
+
+            # the raw framing: a 4-byte length and a JSON object
+            reader, writer = await asyncio.open_unix_connection(path)
+            write_message(writer, {'id': 'a', 'var': {'x': 3}, 'fct': ['x * 2']})
+            assert await read_message(reader) == {'id': 'a', 'var': [6.], 'der': [[2.]]}
+            write_message(writer, {'id': 'b', 'var': [3], 'fct': ['x']})
+            assert 'TypeError' in (await read_message(reader))['error']
+            # a request that is not an object is answered without an id
+            write_message(writer, [1, 2])
+            assert await read_message(reader) == {'id': None, 'error': 'TypeError: The request should be a JSON object!'}
+            writer.close()
+
+            await client.close()
+            with pytest.raises(ConnectionError):
+                await Gradient_Client().evaluate({'x': 1}, ['x'])
+            await server.close()
+        asyncio.run(run())
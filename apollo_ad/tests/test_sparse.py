@@ -0,0 +1,71 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..sparse import *
+from .. import compiler
+from ..compiler import compile
+
+
+class TestSparse:
+
+    def test_tangent_operations(self):
+        a = Sparse_Tangent(np.array([0, 3]), np.array([1., 2.]), 5)
+        b = Sparse_Tangent(np.array([3, 4]), np.array([5., 6.]), 5)
+        assert np.array_equal((a + b).toarray(), [1., 0., 0., 7., 6.])
+        assert np.array_equal((a - b).toarray(), [1., 0., 0., -3., -6.])
+        assert np.array_equal((2 * a).toarray(), [2., 0., 0., 4., 0.])
+        assert np.array_equal((np.float64(2) * a / 4).toarray(), [0.5, 0., 0., 1., 0.])
+        assert np.array_equal((-a).toarray(), [-1., 0., 0., -2., 0.])
+        assert (a + 0) is a
+        assert a == a.toarray() and a != b
+
+        # merging many entries
+        a = Sparse_Tangent(np.arange(0, 200, 2), np.ones(100), 300)
+        b = Sparse_Tangent(np.arange(0, 300, 3), np.ones(100) * 2, 300)
+        assert np.array_equal((a - b).toarray(), a.toarray() - b.toarray())
+
+    def test_variable(self):
+        x = Variable(0.5, Sparse_Tangent.unit(0, 4))
+        y = Variable(4., Sparse_Tangent.unit(3, 4))
+        f = Variable.exp(x * y) + abs(x - y) / y - 2 ** x + x ** y + Variable.arcsin(x) * Variable.tanh(y)
+        x_ = Variable(0.5, np.array([1., 0., 0., 0.]))
+        y_ = Variable(4., np.array([0., 0., 0., 1.]))
+        f_ = Variable.exp(x_ * y_) + abs(x_ - y_) / y_ - 2 ** x_ + x_ ** y_ + Variable.arcsin(x_) * Variable.tanh(y_)
+        assert f.var == f_.var
+        assert np.array_equal(f.der.index, [0, 3])
+        assert np.array_equal(np.round(f.der.toarray(), 8), np.round(f_.der, 8))
+
+    def test_jacobian(self):
+        f = compile(['x0 * x1', 'sin(x2)', '3', 'x1 + x0 - x0'], ['x0', 'x1', 'x2'])
+        values, jacobian = f.sparse_jacobian([1, 2, 0])
+        values_, jacobian_ = f([1, 2, 0], sparse=False)
+        assert np.array_equal(values, values_)
+        assert np.array_equal(jacobian.toarray(), jacobian_)
+        row, col, data = jacobian.tocoo()
+        assert np.array_equal(row, [0, 0, 1, 3, 3]) and np.array_equal(col, [0, 1, 2, 0, 1])
+        data, indices, indptr = jacobian.tocsr()
+        assert np.array_equal(indptr, [0, 2, 3, 3, 5]) and np.array_equal(indices, col)
+        assert jacobian.nnz == 5 and jacobian.shape == (4, 3)
+
+        with pytest.raises(ValueError):
+            f.sparse_jacobian([np.ones(2), 2, 0])
+
+    def test_forward(self, monkeypatch):
+        vars = {'x': 0.5, 'y': 4}
+        fcts = ['cos(x) + y ** 2', '2 * log(y) - sqrt(x)/3', 'sqrt(x)/3', '3 * sinh(x) - 4 * arcsin(x) + 5']
+        z = Forward(vars, fcts, {'x': 1, 'y': 2}, sparse=True)
+        z_ = Forward(vars, fcts, {'x': 1, 'y': 2})
+        assert isinstance(z.der, Sparse_Jacobian)
+        assert np.array_equal(np.round(z.der.toarray(), 8), np.round(z_.der, 8))
+        assert z.__str__() == z_.__str__()
+
+        # sparse derivative vectors are picked automatically for many variables
+        calls = []
+        sparse = compiler.Compiled_Function._sparse
+        monkeypatch.setattr(compiler.Compiled_Function, '_sparse', lambda *args: calls.append(1) or sparse(*args))
+        vars = {'x' + str(i): 1. + i for i in range(compiler.SPARSE_THRESHOLD)}
+        z = Forward(vars, ['x0 * x999', 'log(x5)'])
+        assert len(calls) == 1
+        assert z.der.shape == (2, 1000)
+        assert z.der[0, 0] == 1000. and z.der[0, 999] == 1. and z.der[1, 5] == 1 / 6.
+        assert np.count_nonzero(z.der) == 3
@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..sparsity import *
+from ..sparse import Sparse_Jacobian
+from ..products import colored_jacobian
+from ..compiler import compile, Expression
+
+
+class TestSparsity:
+
+    def test_pattern(self):
+        e = Expression(['x0 - 2 * x1', 'x1 * x2', '3', 'x1 + x0 - x0'], {'x0': 0, 'x1': 1, 'x2': 2})
+        p = Sparsity_Pattern.from_expression(e, 3)
+        assert p.shape == (4, 3) and p.nnz == 6
+        assert np.array_equal(p.row, [0, 0, 1, 1, 3, 3])
+        assert np.array_equal(p.col, [0, 1, 1, 2, 0, 1])
+        assert np.array_equal(p.toarray(), [[1, 1, 0], [0, 1, 1], [0, 0, 0], [1, 1, 0]])
+        assert p.__repr__() == 'Sparsity_Pattern(shape=(4, 3), nnz=6)'
+
+    def test_coloring(self):
+        n = 50
+        names = ['x' + str(i) for i in range(n)]
+        fct = [names[i - 1] + ' - 2 * ' + names[i] + ' + ' + names[i + 1] for i in range(1, n - 1)]
+        p = compile(fct, names).sparsity()
+        column_colors, row_colors = p.column_colors(), p.row_colors()
+        assert column_colors.max() + 1 == 3
+        assert row_colors.max() + 1 == 3
+        # the columns (rows) of one color never share a row (column)
+        dense = p.toarray()
+        for color in range(3):
+            assert dense[:, column_colors == color].sum(axis=1).max() <= 1
+        for color in range(3):
+            assert dense[row_colors == color].sum(axis=0).max() <= 1
+
+    def test_colored_jacobian(self):
+        n = 30
+        names = ['x' + str(i) for i in range(n)]
+        fct = ['sin(' + names[i] + ') * ' + names[i + 1] + ' + exp(' + names[i + 2] + ')' for i in range(n - 2)]
+        fct += ['x0 * x29', '2']
+        f = compile(fct, names)
+        point = list(np.linspace(0.1, 2., n))
+        values_, jacobian_ = f(point)
+        for mode in ['auto', 'forward', 'reverse']:
+            values, jacobian = f.colored_jacobian(point, mode)
+            assert isinstance(jacobian, Sparse_Jacobian)
+            assert np.array_equal(values, values_)
+            assert np.array_equal(np.round(jacobian.toarray(), 10), np.round(jacobian_, 10))
+
+        values, jacobian = colored_jacobian(['x * y', 'sin(z)'], {'x': 1, 'y': 2, 'z': 0})
+        assert np.array_equal(jacobian.toarray(), [[2., 1., 0.], [0., 0., 1.]])
+
+        with pytest.raises(ValueError):
+            f.colored_jacobian(point, 'both')
+        with pytest.raises(ValueError):
+            f.colored_jacobian([np.ones(2)] + point[1:])
+        with pytest.raises(TypeError):
+            colored_jacobian(['x * y'], [1, 2])
@@ -0,0 +1,220 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+from ..tape import *
+
+
+class TestTape:
+
+    def test_initializer(self):
+        t = Tape()
+        with pytest.raises(TypeError):
+            x = t.variable('hello')
+
+        x = t.variable(3)
+        assert x.var == 3 and x.index == 0 and len(t) == 1
+
+    def test_arithmetic(self):
+        t = Tape()
+        x = t.variable(3)
+        y = t.variable(4)
+        f = 4 + x * y - y / x + 2 / x - 3 - x + (-y) * 2 + abs(y - x)
+        v, g = f.derivative([x, y])
+
+        x_ = Reverse_Mode(3)
+        y_ = Reverse_Mode(4)
+        f_ = 4 + x_ * y_ - y_ / x_ + 2 / x_ - 3 - x_ + (-y_) * 2 + abs(y_ - x_)
+        v_, g_ = f_.derivative([x_, y_])
+        assert np.round(v, 8) == np.round(v_, 8)
+        assert np.array_equal(np.round(g, 8), np.round(g_, 8))
+
+        v, g = abs(x - y).derivative([x, y])
+        assert v == 1 and np.array_equal(g, np.array([-1., 1.]))
+
+    def test_pow(self):
+        t = Tape()
+        x = t.variable(3)
+        y = t.variable(2)
+        v, g = (x ** 2).derivative([x])
+        assert v == 9 and g[0] == 6
+        v, g = (2 ** x).derivative([x])
+        assert v == 8 and np.round(g[0], 4) == np.round(8 * np.log(2), 4)
+        v, g = (x ** y).derivative([x, y])
+        assert v == 9 and g[0] == 6 and np.round(g[1], 4) == np.round(9 * np.log(3), 4)
+
+        with pytest.raises(ValueError):
+            t.variable(-1) ** 0.5
+        with pytest.raises(ValueError):
+            t.variable(-1) ** y
+        with pytest.raises(ValueError):
+            (-2) ** t.variable(0.5)
+
+    def test_elementary_functions(self):
+        for name in ['sqrt', 'exp', 'log', 'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh']:
+            t = Tape()
+            x = t.variable(0.3)
+            v, g = getattr(Tape_Variable, name)(x).derivative([x])
+            f = getattr(Variable, name)(Variable(0.3, 1))
+            assert np.round(g[0], 8) == np.round(f.der[0], 8)
+            assert np.round(v, 8) == np.round(f.var, 8)
+            assert getattr(Tape_Variable, name)(0.3) == getattr(np, name)(0.3)
+        assert Tape_Variable.arccos(Tape().variable(0.3)).var == np.arccos(0.3)
+
+        with pytest.raises(ValueError):
+            Tape_Variable.sqrt(Tape().variable(-1))
+        with pytest.raises(ValueError):
+            Tape_Variable.log(Tape().variable(0))
+        with pytest.raises(ValueError):
+            Tape_Variable.arcsin(Tape().variable(2))
+        with pytest.raises(ValueError):
+            Tape_Variable.arccos(Tape().variable(-2))
+
+    def test_comparisons(self):
+        t = Tape()
+        x = t.variable(3)
+        y = t.variable(4)
+        assert x < y and x <= 3 and y > x and y >= 4 and x != y
+        assert not (x == 3) and x == t.variable(3)
+
+    def test_different_tapes(self):
+        with pytest.raises(ValueError):
+            Tape().variable(1) + Tape().variable(2)
+
+    def test_growth_and_memory(self):
+        t = Tape(capacity=4)
+        x = t.variable(0.5)
+        f = x
+        for i in range(1000):
+            f = f * x + 0.1
+        assert len(t) == 2001 and t.capacity == 2048
+        assert t.nbytes == 53 * 2048
+
+        # deep graph, swept node by node
+        x_ = Variable(0.5, 1)
+        f_ = x_
+        for i in range(1000):
+            f_ = f_ * x_ + 0.1
+        v, g = f.derivative([x])
+        assert np.round(v, 10) == np.round(f_.var, 10)
+        assert np.round(g[0], 10) == np.round(f_.der[0], 10)
+
+    def test_wide_graph_vectorized(self):
+        values = np.linspace(0.1, 1, 200)
+        t = Tape()
+        xs = [t.variable(float(i)) for i in values]
+        f = 0
+        for x in xs:
+            f = f + Tape_Variable.sin(x) * x
+        f = f * f
+        # the loop and the level by level sweep give the same gradient
+        Tape.vectorize_width = 1
+        g1 = t.gradient(f)
+        Tape.vectorize_width = 10 ** 9
+        g2 = t.gradient(f)
+        Tape.vectorize_width = 32
+        assert np.allclose(g1, g2)
+
+        s = np.sum(np.sin(values) * values)
+        expected = 2 * s * (np.cos(values) * values + np.sin(values))
+        assert np.allclose(f.derivative(xs)[1], expected)
+
+        # inputs recorded after the output do not depend on it
+        z = t.variable(1)
+        assert f.derivative([xs[0], z])[1][1] == 0
+
+    def test_compiled_expression(self):
+        from ..compiler import Expression
+        e = Expression(['x * y + exp(x * y)', 'x + 3 * y'], {'x': 0, 'y': 1})
+        t = Tape()
+        inputs = [t.variable(1), t.variable(2)]
+        f1, f2 = e.evaluate(inputs, Tape_Variable)
+        assert np.array_equal(np.round(f1.derivative(inputs)[1], 4), np.array([16.7781, 8.3891]))
+        assert np.array_equal(f2.derivative(inputs)[1], np.array([1., 3.]))
+
+    def test_replay(self):
+        def fct(x, y):
+            f = 4 + x * y - y / x + 2 / x - 3 - x + (-y) * 2 + abs(y - x) + x ** y + 2 ** x + y ** 3
+            for name in ['sqrt', 'exp', 'log', 'sin', 'cos', 'tan', 'arctan', 'sinh', 'cosh', 'tanh']:
+                f = f + getattr(Tape_Variable, name)(x * y)
+            return f + Tape_Variable.arcsin(x / 10) + Tape_Variable.arccos(y / 10) + x / 5
+
+        t = Tape()
+        x, y = t.variable(1.5), t.variable(2)
+        f = fct(x, y)
+        for width in [1, 10 ** 9]:
+            # level by level and node by node
+            Tape.vectorize_width = width
+            t.replay([1.2, 0.7])
+            s = Tape()
+            x_, y_ = s.variable(1.2), s.variable(0.7)
+            v, g = fct(x_, y_).derivative([x_, y_])
+            v_new, g_new = f.derivative([x, y])
+            assert np.round(v_new, 8) == np.round(v, 8)
+            assert np.array_equal(np.round(g_new, 8), np.round(g, 8))
+        Tape.vectorize_width = 32
+
+        with pytest.raises(ValueError):
+            t.replay([1.2])
+        with pytest.raises(TypeError):
+            t.replay(['a', 1])
+        # log of a negative value
+        with pytest.raises(ValueError):
+            t.replay([-1., 0.5])
+
+    def test_replay_guards(self):
+        t = Tape()
+        x = t.variable(1.)
+        y = t.variable(2.)
+        f = x * y if x < y else x - y
+        t.replay([3., 4.])
+        assert f.derivative([x, y])[0] == 12
+        with pytest.raises(ValueError):
+            t.replay([4., 3.])
+
+        t = Tape()
+        x = t.variable(1.)
+        f = x * 2 if x >= 0.5 and x == x else -x
+        assert len(t.guards) == 2
+        t.replay([0.6])
+        with pytest.raises(ValueError):
+            t.replay([0.4])
+        # sqrt checks its domain with a comparison
+        t = Tape()
+        x = t.variable(4.)
+        f = Tape_Variable.sqrt(x)
+        t.replay([9.])
+        assert f.derivative([x]) == (3., np.array([1 / 6]))
+        with pytest.raises(ValueError):
+            t.replay([-1.])
+
+    def test_taped_function(self):
+        f = Taped_Function(lambda x, y: x * y if x < y else x - y)
+        assert f(1, 2)[0] == 2
+        v, g = f(3, 4)
+        assert v == 12 and np.array_equal(g, np.array([4., 3.]))
+        v, g = f(5, 4)
+        assert v == 1 and np.array_equal(g, np.array([1., -1.]))
+        assert f.records == 2 and f.replays == 1
+        assert f(6, 1)[0] == 5 and f.replays == 2
+
+        f = Taped_Function(lambda x: Tape_Variable.log(x))
+        f(1.)
+        with pytest.raises(ValueError):
+            f(-1.)
+        assert Taped_Function(lambda x: 3.)(1.) == (3., np.array([0.]))
+
+    def test_taped_function_failed_record(self):
+        # a failed record keeps the last complete tape
+        g = Taped_Function(lambda x, y: x / y)
+        assert g(1., 2.)[0] == 0.5
+        with pytest.raises(ZeroDivisionError):
+            g(1., 0.)
+        v, d = g(6., 3.)
+        assert v == 2. and np.array_equal(np.round(d, 8), np.round([1 / 3, -2 / 3], 8))
+
+        f = Taped_Function(lambda x: x ** 0.5)
+        assert f(4.)[0] == 2.
+        with pytest.raises(ValueError):
+            f(-1.)
+        v, d = f(9.)
+        assert v == 3. and np.round(d[0], 8) == np.round(1 / 6, 8)
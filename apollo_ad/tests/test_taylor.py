@@ -0,0 +1,113 @@
+import pytest
+import numpy as np
+from ..apollo_ad import *
+
+
+def coef_equal(a, b):
+    a = a.coef if isinstance(a, Taylor_Variable) else a
+    b = b.coef if isinstance(b, Taylor_Variable) else b
+    return np.array_equal(np.round(a, 8), np.round(b, 8))
+
+
+class TestTaylor:
+
+    def test_series(self):
+        x = Taylor_Variable(0, 5)
+        assert coef_equal(Taylor_Variable.exp(x), [1, 1, 1 / 2, 1 / 6, 1 / 24, 1 / 120])
+        assert coef_equal(Taylor_Variable.sin(x), [0, 1, 0, -1 / 6, 0, 1 / 120])
+        assert coef_equal(Taylor_Variable.cos(x), [1, 0, -1 / 2, 0, 1 / 24, 0])
+        assert coef_equal(Taylor_Variable.sinh(x), [0, 1, 0, 1 / 6, 0, 1 / 120])
+        assert coef_equal(Taylor_Variable.arctan(x), [0, 1, 0, -1 / 3, 0, 1 / 5])
+        assert coef_equal(Taylor_Variable.arcsin(x), [0, 1, 0, 1 / 6, 0, 3 / 40])
+        assert coef_equal(Taylor_Variable.tan(x), [0, 1, 0, 1 / 3, 0, 2 / 15])
+        assert coef_equal(Taylor_Variable.tanh(x), [0, 1, 0, -1 / 3, 0, 2 / 15])
+        assert coef_equal(Taylor_Variable.log(1 + x), [0, 1, -1 / 2, 1 / 3, -1 / 4, 1 / 5])
+        assert coef_equal(1 / (1 - x), [1, 1, 1, 1, 1, 1])
+        assert coef_equal((1 + x) ** 0.5, [1, 1 / 2, -1 / 8, 1 / 16, -5 / 128, 7 / 256])
+        assert coef_equal(x ** 3, [0, 0, 0, 1, 0, 0])
+        assert coef_equal(2 ** x, [np.log(2) ** j / np.prod(np.arange(1, j + 1)) for j in range(6)])
+        assert coef_equal(abs(x - 1), 1 - x)
+        assert Taylor_Variable.exp(x).derivatives()[-1] == 1.
+
+    def test_identities(self):
+        u = Taylor_Variable(0.3, 10) * 1.7 + Taylor_Variable(0.3, 10) ** 2
+        one = 1 + 0 * u
+        assert coef_equal(Taylor_Variable.exp(Taylor_Variable.log(u)), u)
+        assert coef_equal(Taylor_Variable.sin(u) ** 2 + Taylor_Variable.cos(u) ** 2, one)
+        assert coef_equal(Taylor_Variable.cosh(u) ** 2 - Taylor_Variable.sinh(u) ** 2, one)
+        assert coef_equal(Taylor_Variable.arcsin(Taylor_Variable.sin(u)), u)
+        assert coef_equal(Taylor_Variable.arccos(Taylor_Variable.cos(u)), u)
+        assert coef_equal(Taylor_Variable.tan(Taylor_Variable.arctan(u)), u)
+        assert coef_equal(Taylor_Variable.sqrt(u) * Taylor_Variable.sqrt(u), u)
+        assert coef_equal(u ** u, Taylor_Variable.exp(u * Taylor_Variable.log(u)))
+        assert coef_equal(u - u / u, u - 1)
+        assert u == u and u != one and u > 0.5 and u >= 0.5 and u < 1 and u <= one
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            Taylor_Variable(1, -1)
+        with pytest.raises(TypeError):
+            Taylor_Variable('1', 2)
+        with pytest.raises(ValueError):
+            Taylor_Variable.log(Taylor_Variable(0, 2))
+        with pytest.raises(ValueError):
+            Taylor_Variable.arcsin(Taylor_Variable(2, 2))
+        with pytest.raises(ValueError):
+            Taylor_Variable(-1, 2) ** 0.5
+        with pytest.raises(ZeroDivisionError):
+            1 / Taylor_Variable(0, 2)
+        with pytest.raises(ValueError):
+            Taylor({'x': 1}, ['x'], 0)
+        with pytest.raises(TypeError):
+            Taylor([1], ['x'], 2)
+
+    def test_zero_base(self):
+        # a non-integer exponent >= 1 at a zero base, as Forward and Reverse
+        z = Taylor({'x': 0.}, ['x ** 1.5'], 1)
+        assert np.array_equal(z.der, Forward({'x': 0.}, ['x ** 1.5']).der)
+        assert np.array_equal(z.der, Reverse({'x': 0.}, ['x ** 1.5']).der)
+        assert coef_equal(Taylor_Variable(0, 2) ** 2.5, [0, 0, 0])
+        z = Taylor({'x': np.array([0., 4.])}, ['x ** 1.5'], 1)
+        assert np.array_equal(z.der, [[[0.]], [[3.]]])
+        # a zero base to a positive power is the zero series
+        assert coef_equal(0 ** Taylor_Variable(1., 2), [0, 0, 0])
+        with pytest.raises(ValueError):
+            0 ** Taylor_Variable(0., 2)
+        # the second derivative of x ** 1.5 does not exist at 0
+        with pytest.raises(ValueError):
+            Taylor({'x': 0.}, ['x ** 1.5'], 2)
+
+    def test_taylor(self):
+        vars = {'x': 0.5, 'y': 2}
+        fcts = ['x ** 2 * y + sin(x * y)', 'exp(x) / y', '3']
+        z = Taylor(vars, fcts, 3, {'x': 1, 'y': 0})
+        assert z.coef.shape == (3, 4) and z.der.shape == (3, 3)
+        assert np.array_equal(np.round(z.der[0], 8), np.round([2 * 0.5 * 2 + 2 * np.cos(1), 2 * 2 - 4 * np.sin(1),
+            -8 * np.cos(1)], 8))
+        assert np.array_equal(np.round(z.der[1], 8), np.round([np.exp(0.5) / 2] * 3, 8))
+        assert np.array_equal(z.der[2], [0., 0., 0.])
+        assert np.array_equal(z.var, Forward(vars, fcts).var)
+
+        # the first two orders match the forward mode and the Hessian
+        z = Taylor(vars, fcts, 2, {'x': 1, 'y': -1})
+        h = Hessian(vars, fcts)
+        v = np.array([1., -1.])
+        assert np.array_equal(np.round(z.der[:, 0], 8), np.round(h.der @ v, 8))
+        assert np.array_equal(np.round(z.der[:, 1], 8), np.round(h.hes @ v @ v, 8))
+
+        # a batch of points
+        z = Taylor({'x': np.array([0.5, 1.]), 'y': 2}, fcts, 3)
+        assert z.der.shape == (2, 3, 3)
+        assert np.array_equal(np.round(z.der[1], 8), np.round(Taylor({'x': 1., 'y': 2}, fcts, 3).der, 8))
+
+    def test_autodiff_taylor(self):
+        z = auto_diff({'x': 0, 'y': 1}, ['exp(x * y)'], {'x': 1, 'y': 0}, taylor=4)
+        assert z.mode == 'forward'
+        assert np.array_equal(z.der, [[1., 1., 1., 1.]])
+        assert z.coef.shape == (1, 5)
+        with pytest.raises(ValueError):
+            auto_diff({'x': 0}, ['exp(x)'], taylor=4, hessian=True)
+        with pytest.raises(ValueError):
+            auto_diff({'x': 0}, ['exp(x)'], mode='reverse', taylor=4)
+        with pytest.raises(AttributeError):
+            auto_diff({'x': 0}, ['exp(x)'], [1], taylor=4)
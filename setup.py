@@ -26,6 +26,7 @@ setup(
   url = 'https://github.com/West-Coast-Quaranteam/cs107-FinalProject',
   keywords = ['Auto-diff'],
   install_requires=requirements,
+  entry_points={'console_scripts': ['apollo_ad = apollo_ad.cli:main']},
   classifiers=[
     'Development Status :: 3 - Alpha',
     'Intended Audience :: Developers',